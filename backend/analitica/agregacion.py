@@ -0,0 +1,187 @@
+"""
+Mantenimiento y consulta de los resúmenes de ventas.
+
+`agregar_lote` toma las ventas nuevas desde la marca (Venta.id), las agrega
+por hora en SQL sobre ese rango de ids, suma los deltas a los resúmenes por
+hora y por día y mueve la marca, todo en una transacción: cada venta entra
+una sola vez aunque corran dos procesos a la vez (la marca se bloquea).
+
+Las ventas más recientes que ANALITICA_MARGEN_SEGUNDOS se dejan para la
+próxima pasada, por si una compra con un id menor todavía no hizo commit.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from carrito.models import DetalleVenta, Venta
+from productos.models import Categoria, Producto
+from .models import CATEGORIA, DIA, HORA, METODO_PAGO, PRODUCTO, MarcaAgregacion, ResumenVentas
+
+MARCA_VENTAS = 'ventas'
+
+CAMPOS_DIMENSION = {
+    PRODUCTO: 'producto_id',
+    CATEGORIA: 'producto__categoria_id',
+    METODO_PAGO: 'venta__metodo_pago',
+}
+
+IMPORTE = ExpressionWrapper(
+    F('cantidad') * F('precio_unitario'),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+def agregar_lote(lote=None, ahora=None):
+    """Agrega hasta `lote` ventas nuevas. Devuelve cuántas procesó."""
+    lote = lote or settings.ANALITICA_LOTE
+    corte = (ahora or timezone.now()) - timedelta(seconds=settings.ANALITICA_MARGEN_SEGUNDOS)
+
+    with transaction.atomic():
+        marca, _ = MarcaAgregacion.objects.select_for_update().get_or_create(nombre=MARCA_VENTAS)
+        ids = list(
+            Venta.objects.filter(id__gt=marca.ultimo_id, creado_en__lt=corte)
+            .order_by('id')
+            .values_list('id', flat=True)[:lote]
+        )
+        if not ids:
+            return 0
+
+        deltas = _deltas(marca.ultimo_id, ids[-1])
+        _sumar(deltas)
+        marca.ultimo_id = ids[-1]
+        marca.save(update_fields=['ultimo_id', 'actualizado_en'])
+    return len(ids)
+
+
+def agregar_pendientes(lote=None, progreso=None):
+    total = 0
+    while procesadas := agregar_lote(lote):
+        total += procesadas
+        if progreso:
+            progreso(total)
+    return total
+
+
+def reiniciar():
+    """Borra los resúmenes y la marca para reconstruir desde la primera venta."""
+    with transaction.atomic():
+        ResumenVentas.objects.all().delete()
+        MarcaAgregacion.objects.filter(nombre=MARCA_VENTAS).delete()
+
+
+def _deltas(desde_id, hasta_id):
+    detalles = DetalleVenta.objects.filter(venta_id__gt=desde_id, venta_id__lte=hasta_id)
+    deltas = defaultdict(lambda: [Decimal('0'), 0, 0])
+    for dimension, campo in CAMPOS_DIMENSION.items():
+        filas = (
+            detalles.annotate(hora=TruncHour('venta__creado_en'))
+            .values('hora', campo)
+            .annotate(ingresos=Sum(IMPORTE), unidades=Sum('cantidad'), ventas=Count('venta_id', distinct=True))
+            .order_by()
+        )
+        for fila in filas:
+            hora = fila['hora']
+            dia = datetime.combine(timezone.localtime(hora).date(), time.min, tzinfo=timezone.get_current_timezone())
+            for periodo, inicio in ((HORA, hora), (DIA, dia)):
+                acumulado = deltas[(periodo, dimension, str(fila[campo]), inicio)]
+                acumulado[0] += fila['ingresos']
+                acumulado[1] += fila['unidades']
+                acumulado[2] += fila['ventas']
+    return deltas
+
+
+def _sumar(deltas):
+    # Un solo escritor (la marca está bloqueada), así que leer, sumar y
+    # escribir con upsert es seguro.
+    existentes = {
+        (r.periodo, r.dimension, r.clave, r.inicio): r
+        for r in ResumenVentas.objects.filter(
+            inicio__in={clave[3] for clave in deltas},
+            clave__in={clave[2] for clave in deltas},
+        )
+    }
+    filas = []
+    for (periodo, dimension, clave, inicio), (ingresos, unidades, ventas) in deltas.items():
+        actual = existentes.get((periodo, dimension, clave, inicio))
+        if actual is not None:
+            ingresos += actual.ingresos
+            unidades += actual.unidades
+            ventas += actual.ventas
+        filas.append(ResumenVentas(
+            periodo=periodo, dimension=dimension, clave=clave, inicio=inicio,
+            ingresos=ingresos, unidades=unidades, ventas=ventas,
+        ))
+    ResumenVentas.objects.bulk_create(
+        filas,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['periodo', 'dimension', 'clave', 'inicio'],
+        update_fields=['ingresos', 'unidades', 'ventas'],
+    )
+
+
+# --- consultas para los paneles -------------------------------------------
+
+def _rango(desde, hasta):
+    zona = timezone.get_current_timezone()
+    return (
+        datetime.combine(desde, time.min, tzinfo=zona),
+        datetime.combine(hasta + timedelta(days=1), time.min, tzinfo=zona),
+    )
+
+
+def ranking(dimension, desde, hasta, limite):
+    """Claves con más ingresos entre las fechas `desde` y `hasta` (inclusive)."""
+    inicio, fin = _rango(desde, hasta)
+    filas = list(
+        ResumenVentas.objects.filter(periodo=DIA, dimension=dimension, inicio__gte=inicio, inicio__lt=fin)
+        .values('clave')
+        .annotate(ingresos=Sum('ingresos'), unidades=Sum('unidades'), ventas=Sum('ventas'))
+        .order_by('-ingresos', 'clave')[:limite]
+    )
+    nombres = _nombres(dimension, [fila['clave'] for fila in filas])
+    for fila in filas:
+        fila['nombre'] = nombres.get(fila['clave'])
+    return filas
+
+
+def serie(periodo, desde, hasta, dimension=METODO_PAGO, clave=None):
+    """
+    Ingresos por hora o día. Sin `clave` da el total de la tienda, que se
+    toma de la dimensión método de pago (cada venta cuenta una sola vez).
+    """
+    inicio, fin = _rango(desde, hasta)
+    filas = ResumenVentas.objects.filter(periodo=periodo, inicio__gte=inicio, inicio__lt=fin)
+    if clave is None:
+        filas = filas.filter(dimension=METODO_PAGO)
+    else:
+        filas = filas.filter(dimension=dimension, clave=clave)
+    return list(
+        filas.values('inicio')
+        .annotate(ingresos=Sum('ingresos'), unidades=Sum('unidades'), ventas=Sum('ventas'))
+        .order_by('inicio')
+    )
+
+
+def _nombres(dimension, claves):
+    if dimension == METODO_PAGO:
+        return {clave: clave for clave in claves}
+    modelo = Producto if dimension == PRODUCTO else Categoria
+    ids = [int(clave) for clave in claves if clave.isdigit()]
+    return {str(pk): nombre for pk, nombre in modelo.objects.filter(pk__in=ids).values_list('pk', 'nombre')}
+
+
+def estado():
+    marca = MarcaAgregacion.objects.filter(nombre=MARCA_VENTAS).first()
+    ultimo_id = marca.ultimo_id if marca else 0
+    return {
+        'ultima_venta_agregada': ultimo_id,
+        'ventas_pendientes': Venta.objects.filter(id__gt=ultimo_id).count(),
+        'actualizado_en': marca.actualizado_en if marca else None,
+    }
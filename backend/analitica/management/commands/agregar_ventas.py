@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from analitica import agregacion
+
+
+class Command(BaseCommand):
+    help = "Agrega las ventas nuevas (desde la marca) a los resúmenes por hora y por día"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=settings.ANALITICA_LOTE,
+                            help="Ventas por transacción.")
+        parser.add_argument('--continuo', type=float, metavar='SEGUNDOS',
+                            help="Repite cada SEGUNDOS en lugar de terminar.")
+        parser.add_argument('--reconstruir', action='store_true',
+                            help="Borra los resúmenes y vuelve a agregar todas las ventas.")
+
+    def handle(self, *args, **options):
+        if options['reconstruir']:
+            agregacion.reiniciar()
+            self.stdout.write(self.style.WARNING("Resúmenes borrados; se reconstruyen desde la primera venta."))
+
+        while True:
+            inicio = time.perf_counter()
+            total = agregacion.agregar_pendientes(options['lote'])
+            if total or not options['continuo']:
+                segundos = time.perf_counter() - inicio
+                self.stdout.write(self.style.SUCCESS(
+                    f"Ventas agregadas: {total} en {segundos:.1f}s"
+                ))
+            if not options['continuo']:
+                return
+            time.sleep(options['continuo'])
+            close_old_connections()
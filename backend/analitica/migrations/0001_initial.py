@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaAgregacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.CharField(choices=[('hora', 'Hora'), ('dia', 'Día')], max_length=4)),
+                ('dimension', models.CharField(choices=[('producto', 'Producto'), ('categoria', 'Categoría'), ('metodo_pago', 'Método de pago')], max_length=12)),
+                ('clave', models.CharField(max_length=50)),
+                ('inicio', models.DateTimeField()),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unidades', models.BigIntegerField(default=0)),
+                ('ventas', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['periodo', 'dimension', 'inicio'], name='resumen_ventas_rango_idx')],
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'dimension', 'clave', 'inicio'), name='resumen_ventas_unico')],
+            },
+        ),
+    ]
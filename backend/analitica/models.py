@@ -0,0 +1,48 @@
+from django.db import models
+
+HORA = 'hora'
+DIA = 'dia'
+PERIODOS = ((HORA, 'Hora'), (DIA, 'Día'))
+
+PRODUCTO = 'producto'
+CATEGORIA = 'categoria'
+METODO_PAGO = 'metodo_pago'
+DIMENSIONES = ((PRODUCTO, 'Producto'), (CATEGORIA, 'Categoría'), (METODO_PAGO, 'Método de pago'))
+
+
+class ResumenVentas(models.Model):
+    """
+    Ventas agregadas por periodo (hora o día) y dimensión. `clave` es el id
+    del producto o de la categoría, o el método de pago. Lo mantiene
+    analitica.agregacion; los paneles leen solo de aquí.
+    """
+    periodo = models.CharField(max_length=4, choices=PERIODOS)
+    dimension = models.CharField(max_length=12, choices=DIMENSIONES)
+    clave = models.CharField(max_length=50)
+    inicio = models.DateTimeField()
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unidades = models.BigIntegerField(default=0)
+    ventas = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['periodo', 'dimension', 'clave', 'inicio'], name='resumen_ventas_unico'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['periodo', 'dimension', 'inicio'], name='resumen_ventas_rango_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.periodo} {self.inicio:%Y-%m-%d %H:%M} {self.dimension}={self.clave}"
+
+
+class MarcaAgregacion(models.Model):
+    """Hasta qué Venta.id ya está incluido en los resúmenes."""
+    nombre = models.CharField(max_length=50, unique=True)
+    ultimo_id = models.BigIntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.nombre}: {self.ultimo_id}"
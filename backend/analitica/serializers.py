@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import DIA, DIMENSIONES, PERIODOS, PRODUCTO
+
+
+class FiltroVentasSerializer(serializers.Serializer):
+    """Parámetros de los paneles; por defecto, los últimos 30 días."""
+    dimension = serializers.ChoiceField(choices=DIMENSIONES, default=PRODUCTO)
+    periodo = serializers.ChoiceField(choices=PERIODOS, default=DIA)
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+    clave = serializers.CharField(required=False, max_length=50)
+    limite = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, datos):
+        datos.setdefault('hasta', timezone.localdate())
+        datos.setdefault('desde', datos['hasta'] - timedelta(days=29))
+        if datos['desde'] > datos['hasta']:
+            raise serializers.ValidationError("'desde' no puede ser posterior a 'hasta'.")
+        if (datos['hasta'] - datos['desde']).days > 366:
+            raise serializers.ValidationError("El rango máximo es de un año.")
+        return datos
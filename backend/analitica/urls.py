@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('ventas/ranking/', views.ranking_ventas, name='ranking_ventas'),
+    path('ventas/serie/', views.serie_ventas, name='serie_ventas'),
+    path('ventas/estado/', views.estado_agregacion, name='estado_agregacion'),
+]
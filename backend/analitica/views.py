@@ -0,0 +1,53 @@
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from usuarios.authentication import JWTSinConsultaAuthentication
+from usuarios.permissions import EsAdmin
+from . import agregacion
+from .serializers import FiltroVentasSerializer
+
+
+def _filtros(request):
+    serializer = FiltroVentasSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+# Los paneles leen solo de ResumenVentas (ver `manage.py agregar_ventas`).
+@api_view(['GET'])
+@authentication_classes([JWTSinConsultaAuthentication])
+@permission_classes([IsAuthenticated, EsAdmin])
+def ranking_ventas(request):
+    filtros = _filtros(request)
+    return Response({
+        'dimension': filtros['dimension'],
+        'desde': filtros['desde'],
+        'hasta': filtros['hasta'],
+        'resultados': agregacion.ranking(
+            filtros['dimension'], filtros['desde'], filtros['hasta'], filtros['limite']
+        ),
+    })
+
+
+@api_view(['GET'])
+@authentication_classes([JWTSinConsultaAuthentication])
+@permission_classes([IsAuthenticated, EsAdmin])
+def serie_ventas(request):
+    filtros = _filtros(request)
+    return Response({
+        'periodo': filtros['periodo'],
+        'desde': filtros['desde'],
+        'hasta': filtros['hasta'],
+        'resultados': agregacion.serie(
+            filtros['periodo'], filtros['desde'], filtros['hasta'],
+            filtros['dimension'], filtros.get('clave'),
+        ),
+    })
+
+
+@api_view(['GET'])
+@authentication_classes([JWTSinConsultaAuthentication])
+@permission_classes([IsAuthenticated, EsAdmin])
+def estado_agregacion(request):
+    return Response(agregacion.estado())
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from carrito.reservas import liberar_vencidas
+
+
+class Command(BaseCommand):
+    help = "Devuelve al stock disponible las reservas de carrito vencidas, en lotes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=settings.RESERVA_LIBERAR_LOTE,
+                            help="Ítems por transacción.")
+        parser.add_argument('--continuo', type=float, metavar='SEGUNDOS',
+                            help="Repite cada SEGUNDOS en lugar de terminar.")
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while liberados := liberar_vencidas(options['lote']):
+                total += liberados
+            if total or not options['continuo']:
+                self.stdout.write(self.style.SUCCESS(f"Reservas liberadas: {total}"))
+            if not options['continuo']:
+                return
+            time.sleep(options['continuo'])
+            close_old_connections()
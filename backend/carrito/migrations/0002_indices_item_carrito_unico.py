@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def eliminar_items_duplicados(apps, schema_editor):
+    # get_or_create podía crear dos ítems del mismo producto en un carrito;
+    # se conserva el más reciente, que es el que la vista actualizaba.
+    ItemCarrito = apps.get_model('carrito', 'ItemCarrito')
+    duplicados = (
+        ItemCarrito.objects.values('carrito', 'producto')
+        .annotate(ultimo=Max('id'), total=models.Count('id'))
+        .filter(total__gt=1)
+    )
+    for grupo in duplicados.iterator():
+        ItemCarrito.objects.filter(
+            carrito=grupo['carrito'], producto=grupo['producto'], id__lt=grupo['ultimo']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrito', '0001_initial'),
+        ('productos', '0004_producto_producto_categoria_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_items_duplicados, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['usuario', '-creado_en'], name='venta_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['creado_en'], name='venta_fecha_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='itemcarrito',
+            constraint=models.UniqueConstraint(fields=('carrito', 'producto'), name='item_carrito_unico'),
+        ),
+    ]
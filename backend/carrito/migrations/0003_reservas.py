@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrito', '0002_indices_item_carrito_unico'),
+        ('productos', '0005_producto_reservado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemcarrito',
+            name='reservado',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='itemcarrito',
+            name='reservado_hasta',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='itemcarrito',
+            index=models.Index(condition=models.Q(('reservado__gt', 0)), fields=['reservado_hasta'], name='item_reserva_activa_idx'),
+        ),
+    ]
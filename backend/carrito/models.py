@@ -1,13 +1,61 @@
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from productos.models import Producto
 
 User = settings.AUTH_USER_MODEL
 
+SUBTOTAL_SQL = ExpressionWrapper(
+    F('cantidad') * F('producto__precio'),
+    output_field=DecimalField(max_digits=12, decimal_places=2),
+)
+
+
+class CarritoQuerySet(models.QuerySet):
+    def para_lectura(self):
+        """
+        Carrito listo para serializar en dos consultas, sin importar cuántos
+        ítems tenga: el carrito con su total calculado en SQL y los ítems con
+        su producto y subtotal.
+        """
+        total = (
+            ItemCarrito.objects.filter(carrito=OuterRef('pk'))
+            .values('carrito')
+            .annotate(total=Sum(SUBTOTAL_SQL))
+            .values('total')
+        )
+        return self.select_related('usuario').annotate(
+            total=Coalesce(
+                Subquery(total),
+                Value(0),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        ).prefetch_related(
+            Prefetch('items', queryset=ItemCarrito.objects.con_subtotal().order_by('id')),
+        )
+
+
+class ItemCarritoQuerySet(models.QuerySet):
+    def con_subtotal(self):
+        return self.select_related('producto').annotate(subtotal_calculado=SUBTOTAL_SQL)
+
+
+class VentaQuerySet(models.QuerySet):
+    def con_detalles(self):
+        return self.prefetch_related(detalles_con_producto())
+
+
+def detalles_con_producto():
+    return Prefetch('detalles', queryset=DetalleVenta.objects.select_related('producto').order_by('id'))
+
+
 class Carrito(models.Model):
     usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name="carrito")
     creado_en = models.DateTimeField(auto_now_add=True)
 
+    objects = CarritoQuerySet.as_manager()
+
     def __str__(self):
         return f"Carrito de {self.usuario.username}"
 
@@ -16,6 +64,24 @@ class ItemCarrito(models.Model):
     carrito = models.ForeignKey(Carrito, on_delete=models.CASCADE, related_name="items")
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
     cantidad = models.PositiveIntegerField(default=1)
+    # Unidades que este ítem tiene sumadas en Producto.reservado y hasta cuándo.
+    reservado = models.PositiveIntegerField(default=0)
+    reservado_hasta = models.DateTimeField(null=True, blank=True)
+
+    objects = ItemCarritoQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['carrito', 'producto'], name='item_carrito_unico'),
+        ]
+        indexes = [
+            # Barrido de reservas vencidas (liberar_reservas).
+            models.Index(
+                fields=['reservado_hasta'],
+                condition=models.Q(reservado__gt=0),
+                name='item_reserva_activa_idx',
+            ),
+        ]
 
     @property
     def subtotal(self):
@@ -31,6 +97,14 @@ class Venta(models.Model):
     metodo_pago = models.CharField(max_length=50)
     creado_en = models.DateTimeField(auto_now_add=True)
 
+    objects = VentaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', '-creado_en'], name='venta_usuario_fecha_idx'),
+            models.Index(fields=['creado_en'], name='venta_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Venta #{self.id} - {self.usuario.username}"
 
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from core.outbox import encolar_correo
+
+User = get_user_model()
+
+
+def encolar_notificaciones_venta(usuario, venta, detalles):
+    # Se llama dentro de la transacción de la venta (ver core.outbox).
+    detalles_texto = "\n".join(
+        f"- {d.producto.nombre} ({d.producto.categoria.nombre}) x{d.cantidad} = ${d.subtotal()}"
+        for d in detalles
+    )
+
+    cuerpo_cliente = (
+        f"Hola {usuario.username}, gracias por tu compra.\n\n"
+        f"Total: ${venta.total}\n"
+        f"Método de pago: {venta.metodo_pago}\n\n"
+        "Detalles:\n"
+        f"{detalles_texto}"
+    )
+
+    encolar_correo(
+        asunto="Factura de tu compra",
+        cuerpo=cuerpo_cliente,
+        destinatarios=[usuario.email],
+    )
+
+    superusers = User.objects.filter(is_superuser=True).values_list("email", flat=True)
+    admin_emails = [e for e in superusers if e]
+
+    if not admin_emails:
+        fallback_admin = getattr(settings, "ADMIN_EMAIL", None) or settings.EMAIL_HOST_USER
+        admin_emails = [fallback_admin]
+
+    cuerpo_admin = (
+        "Nueva venta realizada:\n\n"
+        f"Cliente: {usuario.email}\n"
+        f"Total: ${venta.total}\n"
+        f"Método de pago: {venta.metodo_pago}\n\n"
+        "Detalles:\n"
+        f"{detalles_texto}"
+    )
+
+    encolar_correo(
+        asunto="Nueva venta en tu tienda",
+        cuerpo=cuerpo_admin,
+        destinatarios=admin_emails,
+    )
@@ -0,0 +1,92 @@
+"""
+Reservas de stock de los carritos.
+
+Cada ítem guarda cuántas unidades tiene retenidas (`reservado`) y hasta
+cuándo; Producto.reservado es la suma de esas retenciones, mantenida con
+UPDATE condicionales, así que el disponible (stock - reservado) se lee sin
+agregar nada. Al agregar al carrito se ajusta la reserva del ítem con un
+solo UPDATE que falla si no alcanza el disponible.
+
+Orden de bloqueo en todas las rutas: el carrito (al agregar, ver
+bloquear_carrito), los ítems y después los productos (por id cuando son
+varios), igual que finalizar_compra. Las reservas no invalidan el
+catálogo cacheado: el disponible no se guarda en la caché (ver
+productos.cache.completar_disponible).
+Las reservas vencidas se siguen contando hasta que `liberar_vencidas`
+(manage.py liberar_reservas) las devuelve.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from productos.models import Producto
+from .models import ItemCarrito
+from .services import StockInsuficiente, _cantidad_por_producto, vencimiento_reserva
+
+
+def reservar(carrito, producto_id, cantidad):
+    """
+    Fija la cantidad de un producto en el carrito y renueva su reserva.
+    Lanza Producto.DoesNotExist o StockInsuficiente. Debe llamarse dentro
+    de una transacción, con el carrito bloqueado (bloquear_carrito): si no,
+    dos altas del mismo producto reservan las dos y una choca con
+    item_carrito_unico.
+    """
+    item = ItemCarrito.objects.select_for_update().filter(carrito=carrito, producto_id=producto_id).first()
+    delta = cantidad - (item.reservado if item else 0)
+
+    if delta:
+        productos = Producto.objects.filter(id=producto_id)
+        if delta > 0:
+            productos = productos.filter(stock__gte=F('reservado') + delta)
+        if not productos.update(reservado=F('reservado') + delta):
+            # Solo en el camino de error: distinguir producto inexistente de falta de stock.
+            raise StockInsuficiente(Producto.objects.only('nombre').get(id=producto_id))
+
+    if item is None:
+        return ItemCarrito.objects.create(
+            carrito=carrito, producto_id=producto_id, cantidad=cantidad,
+            reservado=cantidad, reservado_hasta=vencimiento_reserva(),
+        )
+    item.cantidad = cantidad
+    item.reservado = cantidad
+    item.reservado_hasta = vencimiento_reserva()
+    item.save(update_fields=['cantidad', 'reservado', 'reservado_hasta'])
+    return item
+
+
+def liberar(reservas):
+    """Descuenta de Producto.reservado un {producto_id: unidades}, con los productos bloqueados por id."""
+    reservas = {producto_id: unidades for producto_id, unidades in reservas.items() if unidades}
+    if not reservas:
+        return
+    list(Producto.objects.select_for_update().filter(id__in=reservas).order_by('id').values_list('id'))
+    liberado = _cantidad_por_producto(reservas)
+    Producto.objects.filter(id__in=reservas).update(reservado=F('reservado') - liberado)
+
+
+def liberar_vencidas(lote=None, ahora=None):
+    """
+    Devuelve al disponible las reservas vencidas, hasta `lote` ítems por
+    transacción. Los ítems bloqueados (alguien está comprando o editando ese
+    carrito) se saltean y quedan para la próxima pasada.
+    """
+    lote = lote or settings.RESERVA_LIBERAR_LOTE
+    with transaction.atomic():
+        vencidos = list(
+            ItemCarrito.objects.select_for_update(skip_locked=True)
+            .filter(reservado__gt=0, reservado_hasta__lt=ahora or timezone.now())
+            .values_list('id', 'producto_id', 'reservado')[:lote]
+        )
+        if not vencidos:
+            return 0
+
+        reservas = defaultdict(int)
+        for _, producto_id, reservado in vencidos:
+            reservas[producto_id] += reservado
+        liberar(reservas)
+        ItemCarrito.objects.filter(id__in=[v[0] for v in vencidos]).update(reservado=0, reservado_hasta=None)
+    return len(vencidos)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Carrito, ItemCarrito, Venta, DetalleVenta
 from productos.models import Producto
@@ -5,7 +6,7 @@ from productos.models import Producto
 class ItemCarritoSerializer(serializers.ModelSerializer):
     producto_nombre = serializers.ReadOnlyField(source='producto.nombre')
     precio = serializers.ReadOnlyField(source='producto.precio')
-    subtotal = serializers.ReadOnlyField()
+    subtotal = serializers.ReadOnlyField(source='subtotal_calculado')
 
     class Meta:
         model = ItemCarrito
@@ -15,10 +16,12 @@ class ItemCarritoSerializer(serializers.ModelSerializer):
 class CarritoSerializer(serializers.ModelSerializer):
     usuario = serializers.ReadOnlyField(source='usuario.username')
     items = ItemCarritoSerializer(many=True, read_only=True)
+    total = serializers.ReadOnlyField()
 
     class Meta:
+        # Espera un carrito de Carrito.objects.para_lectura()
         model = Carrito
-        fields = ['id', 'usuario', 'items']
+        fields = ['id', 'usuario', 'items', 'total']
 
 
 class AgregarItemSerializer(serializers.Serializer):
@@ -26,7 +29,25 @@ class AgregarItemSerializer(serializers.Serializer):
     cantidad = serializers.IntegerField(min_value=1)
 
 
+class OperacionCarritoSerializer(serializers.Serializer):
+    producto_id = serializers.IntegerField()
+    cantidad = serializers.IntegerField(min_value=0)  # 0 = quitar del carrito
+
+
+class LoteCarritoSerializer(serializers.Serializer):
+    operaciones = OperacionCarritoSerializer(many=True, allow_empty=False)
+
+    def validate_operaciones(self, operaciones):
+        if len(operaciones) > settings.CARRITO_LOTE_MAX:
+            raise serializers.ValidationError(f"Máximo {settings.CARRITO_LOTE_MAX} operaciones por lote.")
+        ids = [op['producto_id'] for op in operaciones]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Cada producto puede aparecer una sola vez.")
+        return operaciones
+
+
 class VentaSerializer(serializers.ModelSerializer):
+    # Usar con Venta.objects.con_detalles() para no consultar el producto de cada detalle.
     detalles = serializers.SerializerMethodField()
 
     class Meta:
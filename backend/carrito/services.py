@@ -0,0 +1,184 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.http import Http404
+from django.utils import timezone
+
+from productos.alertas import registrar_transiciones
+from productos.cache import invalidar_categorias
+from productos.models import Producto
+from .models import Carrito, ItemCarrito, Venta, DetalleVenta
+
+
+class CarritoVacio(Exception):
+    pass
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, producto):
+        self.producto = producto
+        super().__init__(f"Stock insuficiente para {producto.nombre}")
+
+
+class ProductosInexistentes(Exception):
+    def __init__(self, ids):
+        self.ids = sorted(ids)
+        super().__init__(f"Productos no encontrados: {self.ids}")
+
+
+def vencimiento_reserva():
+    return timezone.now() + timedelta(minutes=settings.RESERVA_MINUTOS)
+
+
+def bloquear_carrito(usuario_id):
+    """
+    Carrito del usuario (lo crea si no existe) con la fila bloqueada hasta el
+    fin de la transacción. Serializa los cambios de un mismo carrito: dos
+    altas simultáneas del mismo producto no pueden reservar las dos.
+    """
+    carrito, _ = Carrito.objects.select_for_update().get_or_create(usuario_id=usuario_id)
+    return carrito
+
+
+def _cantidad_por_producto(cantidades):
+    return Case(
+        *[When(id=producto_id, then=Value(cantidad)) for producto_id, cantidad in cantidades.items()],
+        output_field=PositiveIntegerField(),
+    )
+
+
+def finalizar_compra(usuario, metodo_pago):
+    """
+    Convierte el carrito del usuario en una Venta de forma atómica.
+
+    Bloquea los productos del carrito en una sola consulta (ordenados por id
+    para evitar deadlocks entre compras concurrentes), valida el stock en
+    memoria y descuenta con un único UPDATE condicional. El número de
+    consultas es constante respecto a la cantidad de líneas.
+    Devuelve la venta y sus detalles con `producto` ya cargado.
+    """
+    with transaction.atomic():
+        items = list(
+            ItemCarrito.objects.select_for_update(of=('self',))
+            .filter(carrito__usuario=usuario)
+            .values_list('carrito_id', 'producto_id', 'cantidad', 'reservado')
+        )
+        if not items:
+            if not Carrito.objects.filter(usuario=usuario).exists():
+                raise Http404("No Carrito matches the given query.")
+            raise CarritoVacio()
+
+        carrito_id = items[0][0]
+        cantidades = defaultdict(int)
+        reservas = defaultdict(int)
+        for _, producto_id, cantidad, reservado in items:
+            cantidades[producto_id] += cantidad
+            reservas[producto_id] += reservado
+
+        productos = list(
+            Producto.objects.select_for_update(of=('self',))
+            .select_related('categoria')
+            .filter(id__in=cantidades)
+            .order_by('id')
+        )
+        for producto in productos:
+            # Lo reservado por este carrito cuenta como propio.
+            if producto.stock - producto.reservado + reservas[producto.id] < cantidades[producto.id]:
+                raise StockInsuficiente(producto)
+
+        total = sum(producto.precio * cantidades[producto.id] for producto in productos)
+        venta = Venta.objects.create(usuario=usuario, total=total, metodo_pago=metodo_pago)
+        detalles = DetalleVenta.objects.bulk_create([
+            DetalleVenta(
+                venta=venta,
+                producto=producto,
+                cantidad=cantidades[producto.id],
+                precio_unitario=producto.precio,
+            )
+            for producto in productos
+        ])
+
+        pedido = _cantidad_por_producto(cantidades)
+        liberado = _cantidad_por_producto(reservas)
+        actualizados = (
+            Producto.objects.filter(id__in=cantidades, stock__gte=pedido)
+            .update(stock=F('stock') - pedido, reservado=F('reservado') - liberado)
+        )
+        if actualizados != len(productos):
+            # Solo ocurre en motores sin SELECT ... FOR UPDATE: otra compra
+            # descontó stock entre la lectura y el UPDATE.
+            faltante = Producto.objects.filter(id__in=cantidades, stock__lt=pedido).first()
+            raise StockInsuficiente(faltante or productos[0])
+
+        for producto in productos:
+            producto.stock -= cantidades[producto.id]
+        registrar_transiciones(
+            (producto, producto.stock + cantidades[producto.id]) for producto in productos
+        )
+        # El UPDATE masivo no dispara señales: el catálogo se invalida a mano.
+        invalidar_categorias(*{producto.categoria_id for producto in productos})
+
+        ItemCarrito.objects.filter(carrito_id=carrito_id).delete()
+
+    return venta, detalles
+
+
+def aplicar_lote(usuario_id, cantidades):
+    """
+    Fija la cantidad de varios productos del carrito a la vez; cantidad 0
+    quita el producto. Ajusta las reservas de stock de todos los productos
+    (ver carrito.reservas) y escribe con un upsert y un DELETE, en una
+    transacción: o entra el lote entero o nada. El número de consultas no
+    depende de la cantidad de líneas.
+    """
+    with transaction.atomic():
+        carrito = bloquear_carrito(usuario_id)
+        previas = dict(
+            ItemCarrito.objects.select_for_update()
+            .filter(carrito=carrito, producto_id__in=cantidades)
+            .values_list('producto_id', 'reservado')
+        )
+        deltas = {
+            producto_id: cantidad - previas.get(producto_id, 0)
+            for producto_id, cantidad in cantidades.items()
+        }
+        deltas = {producto_id: delta for producto_id, delta in deltas.items() if delta}
+        fijar = {producto_id: cantidad for producto_id, cantidad in cantidades.items() if cantidad > 0}
+        quitar = [producto_id for producto_id, cantidad in cantidades.items() if cantidad == 0]
+
+        if fijar or deltas:
+            productos = {
+                p.id: p
+                for p in Producto.objects.select_for_update()
+                .filter(id__in=set(fijar) | set(deltas))
+                .order_by('id')
+                .only('id', 'nombre', 'stock', 'reservado')
+            }
+            if len(productos) < len(set(fijar) | set(deltas)):
+                raise ProductosInexistentes((set(fijar) | set(deltas)) - set(productos))
+            for producto_id, delta in sorted(deltas.items()):
+                producto = productos[producto_id]
+                if delta > 0 and producto.stock - producto.reservado < delta:
+                    raise StockInsuficiente(producto)
+
+        if deltas:
+            ajuste = _cantidad_por_producto(deltas)
+            Producto.objects.filter(id__in=deltas).update(reservado=F('reservado') + ajuste)
+
+        if fijar:
+            hasta = vencimiento_reserva()
+            ItemCarrito.objects.bulk_create(
+                [ItemCarrito(carrito=carrito, producto_id=producto_id, cantidad=cantidad,
+                             reservado=cantidad, reservado_hasta=hasta)
+                 for producto_id, cantidad in fijar.items()],
+                update_conflicts=True,
+                unique_fields=['carrito', 'producto'],
+                update_fields=['cantidad', 'reservado', 'reservado_hasta'],
+            )
+
+        if quitar:
+            ItemCarrito.objects.filter(carrito=carrito, producto_id__in=quitar).delete()
+    return carrito
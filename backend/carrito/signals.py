@@ -0,0 +1,19 @@
+from collections import defaultdict
+
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import Carrito, ItemCarrito
+from .reservas import liberar
+
+
+@receiver(pre_delete, sender=Carrito)
+def liberar_reservas_carrito(sender, instance, **kwargs):
+    # Al borrar un usuario sus ítems se borran en cascada sin pasar por las
+    # vistas; sus reservas se devuelven antes.
+    reservas = defaultdict(int)
+    for producto_id, reservado in ItemCarrito.objects.filter(
+        carrito=instance, reservado__gt=0
+    ).values_list('producto_id', 'reservado'):
+        reservas[producto_id] += reservado
+    liberar(reservas)
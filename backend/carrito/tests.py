@@ -0,0 +1,419 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import CorreoSaliente
+from core.cache import version
+from core.pruebas import ConsultasConstantesMixin, PlanConsultaMixin, solo_postgres
+from productos.cache import BUSQUEDA, acompletar_disponible, version_categoria
+from productos.models import Categoria, Producto
+from .models import Carrito, DetalleVenta, ItemCarrito, Venta
+from .reservas import liberar_vencidas, reservar
+from .serializers import VentaSerializer
+from .services import StockInsuficiente, aplicar_lote, bloquear_carrito, finalizar_compra
+
+Usuario = get_user_model()
+
+
+def crear_usuario(nombre, **extra):
+    return Usuario.objects.create_user(username=nombre, email=f"{nombre}@example.com", password="x", **extra)
+
+
+def crear_producto(categoria, nombre, stock, precio='10.00'):
+    return Producto.objects.create(categoria=categoria, nombre=nombre, precio=precio, stock=stock)
+
+
+def llenar_carrito(usuario, cantidades):
+    """Carrito con ítems sin reserva, como los que había antes de carrito.reservas."""
+    carrito, _ = Carrito.objects.get_or_create(usuario=usuario)
+    ItemCarrito.objects.bulk_create(
+        ItemCarrito(carrito=carrito, producto=producto, cantidad=cantidad)
+        for producto, cantidad in cantidades.items()
+    )
+    return carrito
+
+
+class FinalizarCompraTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario('cliente')
+        cls.categoria = Categoria.objects.create(nombre='Calzado')
+        cls.zapatilla = crear_producto(cls.categoria, 'Zapatilla', stock=5, precio='30.00')
+        cls.media = crear_producto(cls.categoria, 'Media', stock=10, precio='2.50')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_compra_descuenta_stock_y_encola_los_correos(self):
+        llenar_carrito(self.usuario, {self.zapatilla: 2, self.media: 4})
+
+        respuesta = self.client.post('/api/carrito/finalizar-compra/', {'metodo_pago': 'tarjeta'}, format='json')
+
+        self.assertEqual(respuesta.status_code, 200)
+        venta = respuesta.json()['venta']
+        self.assertEqual(venta['total'], '70.00')
+        self.assertEqual(len(venta['detalles']), 2)
+        self.assertEqual(
+            dict(Producto.objects.values_list('nombre', 'stock')),
+            {'Zapatilla': 3, 'Media': 6},
+        )
+        self.assertFalse(ItemCarrito.objects.exists())
+        # Los correos quedan en la outbox; nada se envía dentro de la petición.
+        self.assertEqual(CorreoSaliente.objects.count(), 2)
+        self.assertEqual(mail.outbox, [])
+
+    def test_sin_stock_no_cambia_nada(self):
+        llenar_carrito(self.usuario, {self.zapatilla: 6, self.media: 1})
+
+        respuesta = self.client.post('/api/carrito/finalizar-compra/', {}, format='json')
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('Zapatilla', respuesta.json()['detail'])
+        self.assertEqual(dict(Producto.objects.values_list('nombre', 'stock')), {'Zapatilla': 5, 'Media': 10})
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(ItemCarrito.objects.count(), 2)
+        self.assertFalse(CorreoSaliente.objects.exists())
+
+    def test_carrito_vacio(self):
+        Carrito.objects.create(usuario=self.usuario)
+        respuesta = self.client.post('/api/carrito/finalizar-compra/', {}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_update_que_no_alcanza_a_todas_las_filas_revierte_la_compra(self):
+        # Simula otra compra que descuenta stock entre la validación y el UPDATE
+        # condicional: el conteo de filas actualizadas tiene que detectarlo.
+        llenar_carrito(self.usuario, {self.zapatilla: 2, self.media: 1})
+        crear_venta = Venta.objects.create
+
+        def vender_antes(**kwargs):
+            Producto.objects.filter(pk=self.zapatilla.pk).update(stock=1)
+            return crear_venta(**kwargs)
+
+        with mock.patch.object(Venta.objects, 'create', side_effect=vender_antes):
+            with self.assertRaises(StockInsuficiente):
+                with transaction.atomic():
+                    finalizar_compra(self.usuario, 'efectivo')
+
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(ItemCarrito.objects.count(), 2)
+        self.assertEqual(Producto.objects.get(pk=self.media.pk).stock, 10)
+
+
+class ReservasCatalogoTests(TestCase):
+    """
+    Reservar o liberar stock cambia el disponible del catálogo y de la
+    búsqueda sin invalidar sus páginas cacheadas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario('cliente')
+        cls.categoria = Categoria.objects.create(nombre='Calzado')
+        cls.zapatilla = crear_producto(cls.categoria, 'Zapatilla', stock=5)
+        cls.url_catalogo = f'/api/productos/publico/categorias/{cls.categoria.id}/productos/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def catalogo(self, **cabeceras):
+        return self.client.get(self.url_catalogo, **cabeceras)
+
+    def disponible(self, respuesta):
+        producto, = respuesta.json()['productos']
+        return producto['disponible']
+
+    def busqueda(self):
+        producto, = self.client.get('/api/productos/publico/buscar/', {'q': 'zapatilla'}).json()['productos']
+        return producto['disponible']
+
+    def cambiar_reservas(self, metodo, *args, **kwargs):
+        # Ninguna versión de caché cambia: las páginas cacheadas siguen sirviendo.
+        versiones = (version_categoria(self.categoria.id), version(BUSQUEDA))
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = metodo(*args, **kwargs)
+        self.assertEqual((version_categoria(self.categoria.id), version(BUSQUEDA)), versiones)
+        return resultado
+
+    def test_agregar_y_quitar_del_carrito(self):
+        antes = self.catalogo()
+        self.assertEqual(self.disponible(antes), 5)
+        self.assertEqual(self.busqueda(), 5)
+        self.assertEqual(self.catalogo(HTTP_IF_NONE_MATCH=antes['ETag']).status_code, 304)
+
+        respuesta = self.cambiar_reservas(
+            self.client.post, '/api/carrito/carrito/', {'producto_id': self.zapatilla.id, 'cantidad': 2}, format='json',
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        despues = self.catalogo(HTTP_IF_NONE_MATCH=antes['ETag'])
+        self.assertEqual(despues.status_code, 200)
+        self.assertNotEqual(despues['ETag'], antes['ETag'])
+        self.assertEqual(self.disponible(despues), 3)
+        self.assertEqual(self.busqueda(), 3)
+
+        self.cambiar_reservas(
+            self.client.delete, '/api/carrito/carrito/', {'producto_id': self.zapatilla.id}, format='json',
+        )
+        self.assertEqual(self.disponible(self.catalogo()), 5)
+        self.assertEqual(self.busqueda(), 5)
+
+    def test_lote(self):
+        self.assertEqual(self.disponible(self.catalogo()), 5)
+        self.cambiar_reservas(aplicar_lote, self.usuario.id, {self.zapatilla.id: 4})
+        self.assertEqual(self.disponible(self.catalogo()), 1)
+
+    def test_reservas_vencidas(self):
+        with transaction.atomic():
+            reservar(bloquear_carrito(self.usuario.id), self.zapatilla.id, 2)
+        self.assertEqual(self.disponible(self.catalogo()), 3)
+        self.cambiar_reservas(liberar_vencidas, ahora=timezone.now() + timedelta(days=1))
+        self.assertEqual(self.disponible(self.catalogo()), 5)
+
+    async def test_completar_disponible_async(self):
+        # El camino de productos_por_categoria_async (VISTAS_ASYNC).
+        datos = {'productos': [{'id': self.zapatilla.id, 'disponible': None}, {'id': 0, 'disponible': None}]}
+        completos = await acompletar_disponible(datos)
+        self.assertEqual([p['disponible'] for p in completos['productos']], [5, 0])
+        self.assertIsNone(datos['productos'][0]['disponible'])
+
+    def test_pagina_cacheada_hace_una_consulta(self):
+        self.catalogo()
+        # La página sale de la caché; solo se leen stock y reservado por id.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.disponible(self.catalogo()), 5)
+
+
+class ConsultasCarritoTests(ConsultasConstantesMixin, TestCase):
+    """Los endpoints del carrito hacen las mismas consultas con 1 o con 20 líneas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario('cliente')
+        cls.categorias = [Categoria.objects.create(nombre=f"Categoría {i}") for i in range(3)]
+        cls.productos = [
+            crear_producto(cls.categorias[i % 3], f"Producto {i}", stock=100) for i in range(20)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def preparar_carrito(self, n):
+        ItemCarrito.objects.filter(carrito__usuario=self.usuario).delete()
+        llenar_carrito(self.usuario, {producto: 2 for producto in self.productos[:n]})
+
+    def test_ver_carrito(self):
+        def ver():
+            respuesta = self.client.get('/api/carrito/carrito/')
+            self.assertEqual(respuesta.status_code, 200)
+
+        # carrito con total + ítems con producto
+        self.assertConsultasConstantes(2, self.preparar_carrito, ver)
+
+    def test_agregar(self):
+        def preparar(n):
+            self.preparar_carrito(n)
+            Producto.objects.update(reservado=0)
+            self.nuevo = crear_producto(self.categorias[0], f"Nuevo {n}", stock=10)
+
+        def agregar():
+            respuesta = self.client.post(
+                '/api/carrito/carrito/', {'producto_id': self.nuevo.id, 'cantidad': 1}, format='json',
+            )
+            self.assertEqual(respuesta.status_code, 200)
+
+        # SAVEPOINT, carrito FOR UPDATE, ítem FOR UPDATE, UPDATE de reservado,
+        # INSERT del ítem y RELEASE: ni una consulta más por el catálogo.
+        self.assertConsultasConstantes(6, preparar, agregar)
+
+    def test_lote(self):
+        def preparar(n):
+            Carrito.objects.get_or_create(usuario=self.usuario)
+            ItemCarrito.objects.filter(carrito__usuario=self.usuario).delete()
+            Producto.objects.update(reservado=0)
+            self.operaciones = [{'producto_id': p.id, 'cantidad': 1} for p in self.productos[:n]]
+
+        def aplicar():
+            respuesta = self.client.post('/api/carrito/carrito/lote/', {'operaciones': self.operaciones}, format='json')
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(len(respuesta.json()['items']), len(self.operaciones))
+
+        # SAVEPOINT, carrito, reservas previas, productos, UPDATE de reservado,
+        # upsert de ítems, RELEASE y la lectura del carrito (2)
+        self.assertConsultasConstantes(9, preparar, aplicar)
+
+    def test_finalizar_compra(self):
+        def comprar():
+            respuesta = self.client.post('/api/carrito/finalizar-compra/', {}, format='json')
+            self.assertEqual(respuesta.status_code, 200)
+
+        self.assertConsultasConstantes(14, self.preparar_carrito, comprar)
+
+    def test_serializar_venta(self):
+        def preparar(n):
+            self.preparar_carrito(n)
+            with transaction.atomic():
+                self.venta, _ = finalizar_compra(self.usuario, 'efectivo')
+
+        def serializar():
+            venta = Venta.objects.con_detalles().get(pk=self.venta.pk)
+            self.assertTrue(VentaSerializer(venta).data['detalles'])
+
+        self.assertConsultasConstantes(2, preparar, serializar)
+
+
+@solo_postgres
+class PlanesCarritoTests(PlanConsultaMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        usuarios = Usuario.objects.bulk_create(
+            Usuario(username=f"u{i}", email=f"u{i}@example.com") for i in range(2000)
+        )
+        categoria = Categoria.objects.create(nombre='Calzado')
+        productos = Producto.objects.bulk_create(
+            Producto(categoria=categoria, nombre=f"Producto {i}", precio='1.00', stock=10) for i in range(500)
+        )
+        carritos = Carrito.objects.bulk_create(Carrito(usuario=usuario) for usuario in usuarios)
+        ItemCarrito.objects.bulk_create(
+            ItemCarrito(carrito=carrito, producto=productos[(i * 7 + j) % 500], cantidad=1)
+            for i, carrito in enumerate(carritos) for j in range(5)
+        )
+        ahora = timezone.now()
+        ventas = Venta.objects.bulk_create(
+            Venta(usuario=usuarios[i % 2000], total='1.00', metodo_pago='efectivo') for i in range(20000)
+        )
+        # creado_en es auto_now_add: las fechas se corren hacia atrás después de crear las ventas.
+        for i, venta in enumerate(ventas):
+            venta.creado_en = ahora - timedelta(minutes=30 * i)
+        Venta.objects.bulk_update(ventas, ['creado_en'], batch_size=5000)
+        cls.usuario, cls.carrito, cls.producto, cls.ahora = usuarios[42], carritos[42], productos[42 * 7 % 500], ahora
+
+    def setUp(self):
+        self.analizar()
+
+    def test_item_por_carrito_y_producto(self):
+        item = ItemCarrito.objects.filter(carrito=self.carrito, producto=self.producto)
+        self.assertUsaIndice(item, 'item_carrito_unico')
+
+    def test_ventas_del_usuario_por_fecha(self):
+        historial = Venta.objects.filter(usuario=self.usuario).order_by('-creado_en')[:20]
+        self.assertUsaIndice(historial, 'venta_usuario_fecha_idx')
+
+    def test_ventas_por_rango_de_fechas(self):
+        dia = Venta.objects.filter(creado_en__gte=self.ahora - timedelta(days=1), creado_en__lt=self.ahora)
+        self.assertUsaIndice(dia, 'venta_fecha_idx')
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class CompraConcurrenteTests(TransactionTestCase):
+    """Compras en paralelo por las últimas unidades (necesita SELECT ... FOR UPDATE)."""
+
+    compradores = 8
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Calzado')
+        self.ultimas = crear_producto(categoria, 'Últimas', stock=3)
+        self.otro = crear_producto(categoria, 'Otro', stock=100)
+        self.usuarios = [crear_usuario(f"cliente{i}") for i in range(self.compradores)]
+        for i, usuario in enumerate(self.usuarios):
+            # Órdenes de líneas distintos: las compras tienen que bloquear por id igual.
+            llenar_carrito(usuario, {self.otro: 1, self.ultimas: 1} if i % 2 else {self.ultimas: 1, self.otro: 1})
+
+    def test_no_se_vende_mas_de_lo_que_hay(self):
+        barrera = threading.Barrier(self.compradores)
+        resultados = []
+        errores = []
+
+        def comprar(usuario):
+            try:
+                barrera.wait()
+                with transaction.atomic():
+                    finalizar_compra(usuario, 'efectivo')
+                resultados.append(usuario.pk)
+            except StockInsuficiente:
+                pass
+            except Exception as e:  # deadlocks o cualquier otro error hacen fallar la prueba
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=comprar, args=(usuario,)) for usuario in self.usuarios]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(len(resultados), 3)
+        self.ultimas.refresh_from_db()
+        self.otro.refresh_from_db()
+        self.assertEqual(self.ultimas.stock, 0)
+        self.assertEqual(self.otro.stock, 97)
+        self.assertEqual(Venta.objects.count(), 3)
+        vendido = DetalleVenta.objects.filter(producto=self.ultimas).aggregate(total=Sum('cantidad'))['total']
+        self.assertEqual(vendido, 3)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ReservaConcurrenteTests(TransactionTestCase):
+    """Altas simultáneas del mismo producto nuevo en el mismo carrito."""
+
+    hilos = 6
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Calzado')
+        self.producto = crear_producto(categoria, 'Zapatilla', stock=10)
+        self.usuario = crear_usuario('cliente')
+
+    def en_paralelo(self, agregar):
+        barrera = threading.Barrier(self.hilos)
+        errores = []
+
+        def correr():
+            try:
+                barrera.wait()
+                agregar()
+            except Exception as e:  # IntegrityError, deadlocks: la prueba falla
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=correr) for _ in range(self.hilos)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+
+    def assertReservado(self, cantidad):
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.reservado, cantidad)
+        item = ItemCarrito.objects.get(carrito__usuario=self.usuario, producto=self.producto)
+        self.assertEqual((item.cantidad, item.reservado), (cantidad, cantidad))
+
+    def test_reservar(self):
+        def agregar():
+            with transaction.atomic():
+                reservar(bloquear_carrito(self.usuario.id), self.producto.id, 2)
+
+        self.en_paralelo(agregar)
+        self.assertReservado(2)
+
+    def test_lote(self):
+        self.en_paralelo(lambda: aplicar_lote(self.usuario.id, {self.producto.id: 3}))
+        self.assertReservado(3)
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from .views import CarritoView, FinalizarCompraView
+from .views import CarritoLoteView, CarritoView, FinalizarCompraView, carrito_async
 
 urlpatterns = [
-    path('carrito/', CarritoView.as_view(), name='carrito'),
+    path('carrito/', carrito_async if settings.VISTAS_ASYNC else CarritoView.as_view(), name='carrito'),
+    path('carrito/lote/', CarritoLoteView.as_view(), name='carrito_lote'),
     path('finalizar-compra/', FinalizarCompraView.as_view(), name='finalizar_compra'),
 ]
@@ -0,0 +1,407 @@
+"""
+Caché de dos niveles para el proyecto.
+
+`CacheDosNiveles` es un backend de Django: un LRU en memoria del proceso
+(con TTL corto y tamaño acotado) delante de una caché compartida (Redis en
+producción, LocMemCache en desarrollo). Si la compartida falla, sigue
+funcionando solo con el nivel local hasta que vuelva.
+
+Los datos derivados de modelos se cachean con claves versionadas: cambiar un
+modelo solo cambia su versión (guardada únicamente en la compartida), y las
+entradas viejas dejan de leerse y expiran solas.
+"""
+import asyncio
+import logging
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_FALTA = object()
+
+
+class LRULocal:
+    """LRU con TTL por entrada, acotado por cantidad de entradas y por bytes."""
+
+    def __init__(self, max_entradas, max_bytes):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, clave, defecto=None):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return defecto
+            expira, datos = entrada
+            if expira is not None and expira <= time.monotonic():
+                self._quitar(clave)
+                return defecto
+            self._datos.move_to_end(clave)
+        return pickle.loads(datos)
+
+    def set(self, clave, valor, timeout):
+        datos = pickle.dumps(valor, pickle.HIGHEST_PROTOCOL)
+        if len(datos) > self.max_bytes:
+            self.delete(clave)
+            return
+        expira = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._quitar(clave)
+            self._datos[clave] = (expira, datos)
+            self._bytes += len(datos)
+            while len(self._datos) > self.max_entradas or self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._datos)))
+
+    def incr(self, clave, delta):
+        """Suma `delta` al número guardado sin tocar su vencimiento; KeyError si no está."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                raise KeyError(clave)
+            expira, datos = entrada
+            if expira is not None and expira <= time.monotonic():
+                self._quitar(clave)
+                raise KeyError(clave)
+            valor = pickle.loads(datos) + delta
+            nuevos = pickle.dumps(valor, pickle.HIGHEST_PROTOCOL)
+            self._datos[clave] = (expira, nuevos)
+            self._bytes += len(nuevos) - len(datos)
+            self._datos.move_to_end(clave)
+        return valor
+
+    def delete(self, clave):
+        with self._lock:
+            return self._quitar(clave)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def _quitar(self, clave):
+        entrada = self._datos.pop(clave, None)
+        if entrada is None:
+            return False
+        self._bytes -= len(entrada[1])
+        return True
+
+
+class CacheDosNiveles(BaseCache):
+    """
+    OPTIONS:
+        COMPARTIDO: alias de CACHES usado como nivel compartido.
+        LOCAL_TTL: segundos máximos que una entrada vive en el nivel local.
+        LOCAL_MAX_ENTRADAS / LOCAL_MAX_BYTES: límites del nivel local.
+        REINTENTO_COMPARTIDO: segundos sin usar la compartida tras un error.
+
+    Mientras la compartida está caída, add/incr/decr trabajan sobre el nivel
+    local con el timeout pedido: los contadores siguen funcionando, pero cada
+    proceso cuenta por su cuenta.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        opciones = params.get('OPTIONS', {})
+        self._alias_compartido = opciones.get('COMPARTIDO', 'compartido')
+        self._ttl_local = opciones.get('LOCAL_TTL', 5)
+        self._reintento = opciones.get('REINTENTO_COMPARTIDO', 10)
+        self._caida_hasta = 0.0
+        self.local = LRULocal(
+            opciones.get('LOCAL_MAX_ENTRADAS', 1000),
+            opciones.get('LOCAL_MAX_BYTES', 16 * 1024 * 1024),
+        )
+
+    @property
+    def compartido(self):
+        return caches[self._alias_compartido]
+
+    def _disponible(self):
+        return time.monotonic() >= self._caida_hasta
+
+    def _fallo(self, operacion, error):
+        self._caida_hasta = time.monotonic() + self._reintento
+        _metricas['errores_compartido'] += 1
+        logger.warning("Caché compartida no disponible (%s): %s", operacion, error)
+
+    def _ttl_para_local(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return self._ttl_local if timeout is None else min(timeout, self._ttl_local)
+
+    def _ttl_contador(self, timeout):
+        # Sin la compartida, lo creado con add (contadores de ventana, candados)
+        # vive lo pedido y no LOCAL_TTL: si no, cada ventana duraría LOCAL_TTL.
+        # Lo que no vence (versiones) sigue acotado para volver a leer la compartida.
+        timeout = self.get_backend_timeout(timeout)
+        return self._ttl_local if timeout is None else timeout
+
+    def get(self, key, default=None, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        valor = self.local.get(clave, _FALTA)
+        if valor is not _FALTA:
+            _metricas['aciertos_local'] += 1
+            return valor
+
+        if self._disponible():
+            try:
+                valor = self.compartido.get(key, _FALTA, version=version)
+            except Exception as e:
+                self._fallo('get', e)
+            else:
+                if valor is _FALTA:
+                    _metricas['fallos'] += 1
+                    return default
+                _metricas['aciertos_compartido'] += 1
+                self.local.set(clave, valor, self._ttl_local)
+                return valor
+
+        _metricas['fallos'] += 1
+        return default
+
+    async def aget(self, key, default=None, version=None):
+        # Los aciertos locales se resuelven sin salir del event loop.
+        clave = self.make_and_validate_key(key, version=version)
+        valor = self.local.get(clave, _FALTA)
+        if valor is not _FALTA:
+            _metricas['aciertos_local'] += 1
+            return valor
+        return await sync_to_async(self.get, thread_sensitive=False)(key, default, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        self.local.set(clave, value, self._ttl_para_local(timeout))
+        if self._disponible():
+            try:
+                self.compartido.set(key, value, timeout, version=version)
+            except Exception as e:
+                self._fallo('set', e)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        if self._disponible():
+            try:
+                agregado = self.compartido.add(key, value, timeout, version=version)
+            except Exception as e:
+                self._fallo('add', e)
+            else:
+                if agregado:
+                    self.local.set(clave, value, self._ttl_para_local(timeout))
+                return agregado
+        if self.local.get(clave, _FALTA) is not _FALTA:
+            return False
+        self.local.set(clave, value, self._ttl_contador(timeout))
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        if self._disponible():
+            try:
+                return self.compartido.touch(key, timeout, version=version)
+            except Exception as e:
+                self._fallo('touch', e)
+        return False
+
+    def delete(self, key, version=None):
+        clave = self.make_and_validate_key(key, version=version)
+        borrado = self.local.delete(clave)
+        if self._disponible():
+            try:
+                borrado = self.compartido.delete(key, version=version) or borrado
+            except Exception as e:
+                self._fallo('delete', e)
+        return borrado
+
+    def incr(self, key, delta=1, version=None):
+        # Los contadores viven en la compartida; el local solo se usa si está caída.
+        clave = self.make_and_validate_key(key, version=version)
+        if self._disponible():
+            try:
+                valor = self.compartido.incr(key, delta, version=version)
+            except ValueError:
+                raise
+            except Exception as e:
+                self._fallo('incr', e)
+            else:
+                self.local.delete(clave)
+                return valor
+        try:
+            return self.local.incr(clave, delta)
+        except KeyError:
+            raise ValueError("Key '%s' not found" % key)
+
+    def clear(self):
+        self.local.clear()
+        if self._disponible():
+            try:
+                self.compartido.clear()
+            except Exception as e:
+                self._fallo('clear', e)
+
+
+# --- métricas -------------------------------------------------------------
+
+_metricas = Counter()
+
+
+def estadisticas():
+    datos = dict(_metricas)
+    consultas = datos.get('aciertos_local', 0) + datos.get('aciertos_compartido', 0) + datos.get('fallos', 0)
+    aciertos = datos.get('aciertos_local', 0) + datos.get('aciertos_compartido', 0)
+    datos['tasa_aciertos'] = aciertos / consultas if consultas else 0.0
+    return datos
+
+
+# --- claves versionadas ---------------------------------------------------
+
+def _nombre(objetivo):
+    if isinstance(objetivo, str):
+        return objetivo
+    return objetivo._meta.label_lower
+
+
+def version(objetivo):
+    """
+    Versión actual de un modelo o de un nombre arbitrario (p. ej. una
+    categoría del catálogo): un contador que `invalidar` sube en 1. No
+    depende del reloj, así que dos cambios seguidos o un host atrasado
+    nunca repiten ni retroceden una versión.
+
+    Otros procesos ven un cambio como mucho LOCAL_TTL segundos después;
+    el proceso que invalida lo ve de inmediato.
+    """
+    clave = f"version:{_nombre(objetivo)}"
+    valor = cache.get(clave)
+    if valor is None:
+        if not cache.add(clave, 1, None):
+            return cache.get(clave, 1)
+        valor = 1
+    return valor
+
+
+async def aversion(objetivo):
+    """Como version(), para vistas async."""
+    clave = f"version:{_nombre(objetivo)}"
+    valor = await cache.aget(clave)
+    if valor is None:
+        if not await cache.aadd(clave, 1, None):
+            return await cache.aget(clave, 1)
+        valor = 1
+    return valor
+
+
+def invalidar(*objetivos):
+    """Sube la versión tras el commit de la transacción actual."""
+    def subir_versiones():
+        for objetivo in objetivos:
+            if objetivo is None:
+                continue
+            clave = f"version:{_nombre(objetivo)}"
+            try:
+                cache.incr(clave)
+            except ValueError:
+                # Nadie la leyó todavía (o se perdió): la próxima lectura parte de 1.
+                cache.add(clave, 1, None)
+
+    transaction.on_commit(subir_versiones)
+
+
+def clave_versionada(objetivo, *partes):
+    return ":".join(str(parte) for parte in (_nombre(objetivo), version(objetivo), *partes))
+
+
+# --- protección contra estampidas -----------------------------------------
+
+_locks = {}
+_locks_guardia = threading.Lock()
+
+
+def obtener_o_calcular(clave, calcular, timeout=DEFAULT_TIMEOUT, espera=2.0):
+    """
+    Devuelve el valor cacheado o lo calcula una sola vez aunque lleguen
+    muchas peticiones a la vez: dentro del proceso se agrupan con un lock
+    por clave, y entre procesos con un candado en la compartida (`add`).
+    Si quien tiene el candado tarda más que `espera`, se calcula igual.
+    """
+    valor = cache.get(clave, _FALTA)
+    if valor is not _FALTA:
+        return valor
+
+    with _locks_guardia:
+        lock = _locks.setdefault(clave, threading.Lock())
+
+    with lock:
+        valor = cache.get(clave, _FALTA)
+        if valor is not _FALTA:
+            _metricas['coalescidas'] += 1
+            return valor
+
+        candado = f"candado:{clave}"
+        tengo_candado = cache.add(candado, 1, timeout=max(int(espera * 2), 1))
+        if not tengo_candado:
+            limite = time.monotonic() + espera
+            while time.monotonic() < limite:
+                time.sleep(0.05)
+                valor = cache.get(clave, _FALTA)
+                if valor is not _FALTA:
+                    _metricas['coalescidas'] += 1
+                    return valor
+
+        try:
+            _metricas['calculos'] += 1
+            valor = calcular()
+            cache.set(clave, valor, timeout)
+        finally:
+            if tengo_candado:
+                cache.delete(candado)
+            with _locks_guardia:
+                _locks.pop(clave, None)
+    return valor
+
+
+_alocks = {}
+
+
+async def aobtener_o_calcular(clave, calcular, timeout=DEFAULT_TIMEOUT, espera=2.0):
+    """Como obtener_o_calcular, pero `calcular` es una corrutina y se espera sin bloquear el loop."""
+    valor = await cache.aget(clave, _FALTA)
+    if valor is not _FALTA:
+        return valor
+
+    lock = _alocks.setdefault(clave, asyncio.Lock())
+    async with lock:
+        valor = await cache.aget(clave, _FALTA)
+        if valor is not _FALTA:
+            _metricas['coalescidas'] += 1
+            return valor
+
+        candado = f"candado:{clave}"
+        tengo_candado = await cache.aadd(candado, 1, timeout=max(int(espera * 2), 1))
+        if not tengo_candado:
+            limite = time.monotonic() + espera
+            while time.monotonic() < limite:
+                await asyncio.sleep(0.05)
+                valor = await cache.aget(clave, _FALTA)
+                if valor is not _FALTA:
+                    _metricas['coalescidas'] += 1
+                    return valor
+
+        try:
+            _metricas['calculos'] += 1
+            valor = await calcular()
+            await cache.aset(clave, valor, timeout)
+        finally:
+            if tengo_candado:
+                await cache.adelete(candado)
+            _alocks.pop(clave, None)
+    return valor
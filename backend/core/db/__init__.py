@@ -0,0 +1,21 @@
+"""
+Métricas de las conexiones a la base de datos.
+
+El backend `core.db.postgresql` mide cuánto tarda cada petición en obtener
+una conexión (handshake TCP + auth sin pool, espera en el pool con pool) y
+lo publica en /metrics (core.metricas). En modo pool, además, cada checkout
+actualiza el tamaño, las conexiones libres y las peticiones en espera del
+pool de ese proceso; Prometheus ve la suma de los workers vivos.
+"""
+from core import metricas
+
+
+def registrar_checkout(conexion, segundos):
+    metricas.CHECKOUT_BD.labels(conexion.alias).observe(segundos)
+    pool = conexion.pool
+    if pool is not None:
+        # psycopg_pool: pool_size, pool_available, requests_waiting...
+        estado = pool.get_stats()
+        metricas.POOL_BD.labels(conexion.alias, 'abiertas').set(estado.get('pool_size', 0))
+        metricas.POOL_BD.labels(conexion.alias, 'libres').set(estado.get('pool_available', 0))
+        metricas.POOL_BD.labels(conexion.alias, 'esperando').set(estado.get('requests_waiting', 0))
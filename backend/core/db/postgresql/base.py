@@ -0,0 +1,16 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from core.db import registrar_checkout
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Backend de PostgreSQL de Django que mide el tiempo de checkout de la conexión."""
+
+    def ensure_connection(self):
+        if self.connection is not None:
+            return
+        inicio = time.perf_counter()
+        super().ensure_connection()
+        registrar_checkout(self, time.perf_counter() - inicio)
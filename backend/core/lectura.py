@@ -0,0 +1,91 @@
+"""
+Serialización de solo lectura sobre `.values()` para listados grandes.
+
+Un ModelSerializer arma una instancia por fila y recorre sus campos con
+get_attribute/to_representation. LecturaCompilada lee la definición del
+serializer una sola vez y la traduce a columnas de `.values()` (con
+`source='categoria.nombre'` -> 'categoria__nombre') y a un getter por campo:
+los campos cuyo to_representation no cambia el valor de la base (enteros,
+textos, booleanos, pk de relaciones) se copian tal cual, y el resto (Decimal,
+fechas) pasa por el to_representation del propio campo. La salida es la
+misma que `Serializer(instancias, many=True).data`.
+
+Los SerializerMethodField se declaran en `calculados` como
+{campo: (columnas, funcion)}; cualquier otro campo que no se pueda leer de
+una columna (serializers anidados, fuentes con métodos) da error al compilar.
+"""
+from functools import cached_property
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+
+# to_representation de estos campos devuelve el mismo valor que trae .values().
+_SIN_CONVERSION = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+    PrimaryKeyRelatedField,
+)
+
+
+class LecturaCompilada:
+
+    def __init__(self, serializer_class, calculados=None):
+        self.serializer_class = serializer_class
+        self.calculados = calculados or {}
+
+    @cached_property
+    def _compilado(self):
+        # Se compila en el primer uso: instanciar el serializer necesita los modelos cargados.
+        columnas = []
+        getters = []
+        for nombre, campo in self.serializer_class().fields.items():
+            if campo.write_only:
+                continue
+            if nombre in self.calculados:
+                fuentes, funcion = self.calculados[nombre]
+                columnas.extend(c for c in fuentes if c not in columnas)
+                getters.append((nombre, _calculado(fuentes, funcion)))
+                continue
+            if isinstance(campo, (serializers.SerializerMethodField, serializers.BaseSerializer)) or campo.source == '*':
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{nombre} no se puede leer de una columna; "
+                    "declararlo en `calculados`."
+                )
+            columna = '__'.join(campo.source_attrs)
+            if columna not in columnas:
+                columnas.append(columna)
+            if isinstance(campo, _SIN_CONVERSION):
+                getters.append((nombre, itemgetter(columna)))
+            else:
+                getters.append((nombre, _convertido(columna, campo.to_representation)))
+        return tuple(columnas), tuple(getters)
+
+    @property
+    def columnas(self):
+        """Columnas que hay que pedir con `.values()`."""
+        return self._compilado[0]
+
+    def valores(self, queryset):
+        return queryset.values(*self.columnas)
+
+    def representar(self, filas):
+        """Filas de `.values(*columnas)` (dicts; pueden traer columnas de más) -> lista de dicts."""
+        getters = self._compilado[1]
+        return [{nombre: getter(fila) for nombre, getter in getters} for fila in filas]
+
+
+def _convertido(columna, to_representation):
+    def getter(fila):
+        valor = fila[columna]
+        return None if valor is None else to_representation(valor)
+    return getter
+
+
+def _calculado(fuentes, funcion):
+    def getter(fila):
+        return funcion(*(fila[fuente] for fuente in fuentes))
+    return getter
@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, verify_password
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide verificaciones de contraseña por segundo (lo que cuesta un login) "
+        "con cada hasher configurado, en un hilo y con N hilos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--segundos', type=float, default=3.0,
+                            help="Duración de cada medición.")
+        parser.add_argument('--hilos', type=int, default=1,
+                            help="Hilos en paralelo para la medición concurrente.")
+        parser.add_argument('--algoritmos', default=','.join(settings.PASSWORD_HASHERS[:3]),
+                            help="Rutas de hashers separadas por comas.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'hasher':<55} {'ms/login':>9} {'login/s':>9} {'hilos':>6} {'login/s':>9}"
+        )
+        for ruta in [r.strip() for r in options['algoritmos'].split(',') if r.strip()]:
+            with override_settings(PASSWORD_HASHERS=[ruta]):
+                try:
+                    encoded = get_hasher('default').encode('contraseña de prueba', get_hasher('default').salt())
+                except (ValueError, ImportError) as e:
+                    self.stderr.write(f"{ruta}: no disponible ({e})")
+                    continue
+                uno = self._medir(encoded, 1, options['segundos'])
+                varios = self._medir(encoded, options['hilos'], options['segundos'])
+            self.stdout.write(
+                f"{ruta:<55} {1000 / uno:>9.1f} {uno:>9.1f} {options['hilos']:>6} {varios:>9.1f}"
+            )
+
+    def _medir(self, encoded, hilos, segundos):
+        if hilos < 1:
+            raise CommandError("--hilos debe ser al menos 1.")
+        fin = time.perf_counter() + segundos
+
+        def verificar():
+            n = 0
+            while time.perf_counter() < fin:
+                verify_password('contraseña de prueba', encoded)
+                n += 1
+            return n
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            total = sum(pool.map(lambda _: verificar(), range(hilos)))
+        return total / (time.perf_counter() - inicio)
@@ -0,0 +1,128 @@
+import io
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import OrjsonParser
+from core.renderers import OrjsonRenderer, orjson
+
+
+def _precio(azar):
+    return Decimal(azar.randint(100, 100_000)) / 100
+
+
+def catalogo(n, azar):
+    # Como _pagina_catalogo: ProductoSerializer ya convirtió los Decimal a texto.
+    return {
+        'categoria': 'Calzado',
+        'productos': [
+            {
+                'id': i, 'sku': f"SKU-{i:07d}", 'nombre': f"Zapatilla térmica Nº{i}",
+                'precio': str(_precio(azar)), 'stock': azar.randint(0, 50), 'disponible': azar.randint(0, 50),
+                'categoria': 3, 'categoria_nombre': 'Calzado',
+            }
+            for i in range(1, n + 1)
+        ],
+        'siguiente': 'WzEwMF0',
+    }
+
+
+def carrito(n, azar):
+    # ItemCarritoSerializer deja precio y subtotal como Decimal (ReadOnlyField).
+    items = []
+    for i in range(1, n + 1):
+        precio, cantidad = _precio(azar), azar.randint(1, 5)
+        items.append({
+            'id': i, 'producto': i, 'producto_nombre': f"Remera clásica {i}",
+            'cantidad': cantidad, 'precio': precio, 'subtotal': precio * cantidad,
+        })
+    return {'id': 1, 'usuario': 'cliente', 'items': items, 'total': sum(i['subtotal'] for i in items)}
+
+
+def ventas(n, azar):
+    # VentaSerializer: total y creado_en ya son texto; los detalles llevan Decimal.
+    ahora = timezone.now()
+    filas = []
+    for i in range(1, n + 1):
+        detalles = []
+        for j in range(3):
+            precio, cantidad = _precio(azar), azar.randint(1, 3)
+            detalles.append({
+                'producto': f"Campera impermeable {j}", 'cantidad': cantidad,
+                'precio_unitario': precio, 'subtotal': precio * cantidad,
+            })
+        filas.append({
+            'id': i, 'usuario': azar.randint(1, 1000),
+            'total': str(sum(d['subtotal'] for d in detalles)), 'metodo_pago': 'tarjeta',
+            'creado_en': (ahora - timedelta(minutes=i)).isoformat().replace('+00:00', 'Z'),
+            'detalles': detalles,
+        })
+    return filas
+
+
+def analitica(n, azar):
+    # Filas de values() sin serializer: datetime y Decimal crudos.
+    inicio = timezone.now().replace(minute=0, second=0, microsecond=0)
+    return [
+        {'inicio': inicio - timedelta(hours=i), 'ingresos': _precio(azar) * 10,
+         'unidades': azar.randint(0, 500), 'ventas': azar.randint(0, 100)}
+        for i in range(n)
+    ]
+
+
+PAYLOADS = {'catalogo': catalogo, 'carrito': carrito, 'ventas': ventas, 'analitica': analitica}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara JSONRenderer/JSONParser de DRF con los de orjson (JSON_ORJSON) "
+        "sobre respuestas de catálogo, carrito, ventas y analítica, y verifica "
+        "que la salida sea idéntica."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=100,
+                            help="Productos, ítems o ventas por respuesta.")
+        parser.add_argument('--segundos', type=float, default=1.0,
+                            help="Duración de cada medición.")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write("orjson no está instalado: OrjsonRenderer usa el renderer de DRF.")
+
+        azar = random.Random(0)
+        self.stdout.write(
+            f"{'respuesta':<11} {'bytes':>8} {'drf µs':>9} {'orjson µs':>10} {'x':>6} "
+            f"{'parse drf':>10} {'orjson':>8} {'x':>6}  idéntica"
+        )
+        for nombre, generar in PAYLOADS.items():
+            datos = generar(options['filas'], azar)
+            drf = JSONRenderer().render(datos)
+            rapido = OrjsonRenderer().render(datos)
+
+            render_drf = self._medir(lambda: JSONRenderer().render(datos), options['segundos'])
+            render_rapido = self._medir(lambda: OrjsonRenderer().render(datos), options['segundos'])
+            parse_drf = self._medir(lambda: JSONParser().parse(io.BytesIO(drf)), options['segundos'])
+            parse_rapido = self._medir(lambda: OrjsonParser().parse(io.BytesIO(drf)), options['segundos'])
+            self.stdout.write(
+                f"{nombre:<11} {len(drf):>8} {render_drf:>9.1f} {render_rapido:>10.1f} "
+                f"{render_drf / render_rapido:>6.1f} {parse_drf:>10.1f} {parse_rapido:>8.1f} "
+                f"{parse_drf / parse_rapido:>6.1f}  {'sí' if drf == rapido else 'NO'}"
+            )
+
+    def _medir(self, funcion, segundos):
+        """Microsegundos por llamada."""
+        n = 0
+        inicio = time.perf_counter()
+        fin = inicio + segundos
+        while time.perf_counter() < fin:
+            funcion()
+            n += 1
+        return (time.perf_counter() - inicio) / n * 1e6
+
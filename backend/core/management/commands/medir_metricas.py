@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+
+from core import metricas
+from core.middleware import MetricasMiddleware
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo de MetricasMiddleware por petición y del execute_wrapper "
+        "por consulta. Para medir el modo multiproceso de gunicorn, correrlo con "
+        "PROMETHEUS_MULTIPROC_DIR apuntando a un directorio vacío."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=50_000)
+        parser.add_argument('--consultas', type=int, default=5_000)
+        parser.add_argument('--ruta', default='/api/productos/publico/categorias/1/productos/')
+
+    def handle(self, *args, **options):
+        modo = 'multiproceso' if os.environ.get('PROMETHEUS_MULTIPROC_DIR') else 'un proceso'
+        self.stdout.write(f"Registro: {modo}")
+
+        request = RequestFactory().get(options['ruta'])
+        request.resolver_match = resolve(options['ruta'])
+        respuesta = HttpResponse(b'ok')
+
+        def vista(request):
+            return respuesta
+
+        n = options['peticiones']
+        sin = self._medir(vista, request, n)
+        con = self._medir(MetricasMiddleware(vista), request, n)
+        self.stdout.write(f"Petición sin middleware: {sin:.2f} µs, con middleware: {con:.2f} µs")
+        self.stdout.write(self.style.SUCCESS(f"Costo por petición: {con - sin:.2f} µs"))
+
+        n = options['consultas']
+        with connection.cursor() as cursor:
+            metricas.instrumentar_conexion(None, connection)
+            fuera = self._medir(lambda _: cursor.execute('SELECT 1'), None, n)
+            token = metricas.iniciar()
+            try:
+                dentro = self._medir(lambda _: cursor.execute('SELECT 1'), None, n)
+            finally:
+                metricas.terminar(token, request, 200, 0.0)
+            connection.execute_wrappers.remove(metricas.registrar_consulta)
+            try:
+                sin_wrapper = self._medir(lambda _: cursor.execute('SELECT 1'), None, n)
+            finally:
+                metricas.instrumentar_conexion(None, connection)
+        self.stdout.write(
+            f"SELECT 1 sin wrapper: {sin_wrapper:.2f} µs, fuera de una petición: {fuera:.2f} µs, "
+            f"dentro: {dentro:.2f} µs"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Costo por consulta: {dentro - sin_wrapper:.2f} µs"))
+
+    def _medir(self, funcion, argumento, n):
+        """Microsegundos por llamada (el mejor de tres)."""
+        mejor = None
+        for _ in range(3):
+            inicio = time.perf_counter()
+            for _ in range(n):
+                funcion(argumento)
+            duracion = (time.perf_counter() - inicio) / n * 1e6
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        return mejor
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.models import Categoria, Producto
+from productos.serializers import (
+    CategoriaSerializer, ProductoSerializer, categorias_lectura, productos_lectura,
+)
+from usuarios.models import Usuario
+from usuarios.serializers import UsuarioListSerializer, usuarios_lectura
+
+# (nombre, serializer, queryset para el serializer, lectura compilada, queryset base)
+CASOS = [
+    ('productos', ProductoSerializer, lambda: Producto.objects.select_related('categoria'),
+     productos_lectura, lambda: Producto.objects.all()),
+    ('categorias', CategoriaSerializer, lambda: Categoria.objects.all(),
+     categorias_lectura, lambda: Categoria.objects.all()),
+    ('usuarios', UsuarioListSerializer, lambda: Usuario.objects.all(),
+     usuarios_lectura, lambda: Usuario.objects.all()),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara filas por segundo de los ModelSerializer de los listados contra su "
+        "LecturaCompilada (core.lectura) sobre los datos de la base, solo "
+        "serializando y con la consulta incluida, y verifica que la salida sea igual."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=5000,
+                            help="Filas por listado (las primeras por id).")
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        n, repeticiones = options['filas'], options['repeticiones']
+        self.stdout.write(
+            f"{'listado':<11} {'filas':>6} {'serializer':>11} {'compilada':>10} {'x':>6} "
+            f"{'+consulta':>10} {'compilada':>10} {'x':>6}  igual"
+        )
+        for nombre, serializer, queryset, lectura, base in CASOS:
+            instancias = list(queryset().order_by('id')[:n])
+            filas = list(lectura.valores(base().order_by('id')[:n]))
+            if not filas:
+                self.stdout.write(f"{nombre:<11} sin datos")
+                continue
+            esperado = serializer(instancias, many=True).data
+            if lectura.representar(filas) != esperado:
+                raise CommandError(f"{nombre}: la lectura compilada no coincide con {serializer.__name__}.")
+
+            solo_serializer = self._medir(lambda: serializer(instancias, many=True).data, repeticiones)
+            solo_compilada = self._medir(lambda: lectura.representar(filas), repeticiones)
+            con_serializer = self._medir(
+                lambda: serializer(list(queryset().order_by('id')[:n]), many=True).data, repeticiones)
+            con_compilada = self._medir(
+                lambda: lectura.representar(list(lectura.valores(base().order_by('id')[:n]))), repeticiones)
+            self.stdout.write(
+                f"{nombre:<11} {len(filas):>6} {len(filas) / solo_serializer:>11.0f} "
+                f"{len(filas) / solo_compilada:>10.0f} {solo_serializer / solo_compilada:>6.1f} "
+                f"{len(filas) / con_serializer:>10.0f} {len(filas) / con_compilada:>10.0f} "
+                f"{con_serializer / con_compilada:>6.1f}  sí"
+            )
+
+    def _medir(self, funcion, repeticiones):
+        """Mejor tiempo de `repeticiones` llamadas, en segundos."""
+        mejor = None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            duracion = time.perf_counter() - inicio
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        return mejor
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core import outbox
+from productos.alertas import despachar_resumen
+
+
+class Command(BaseCommand):
+    help = "Drena la cola de correos salientes (outbox) en lotes, con reintentos y backoff, y encola el resumen de stock bajo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=settings.OUTBOX_LOTE,
+                            help="Correos por lote (una conexión SMTP por lote).")
+        parser.add_argument('--hilos', type=int, default=1,
+                            help="Hilos que drenan la cola en paralelo.")
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument('--una-vez', action='store_true',
+                            help="Drena lo pendiente y termina.")
+        parser.add_argument('--estado', action='store_true',
+                            help="Muestra profundidad y lag de la cola y termina.")
+
+    def handle(self, *args, **options):
+        if options['estado']:
+            self._mostrar_estado()
+            return
+
+        if options['una_vez']:
+            despachar_resumen()
+            total = 0
+            while True:
+                procesados = outbox.procesar_lote(options['lote'])
+                if not procesados:
+                    break
+                total += procesados
+            self.stdout.write(self.style.SUCCESS(f"Correos procesados: {total}"))
+            self._mostrar_estado()
+            return
+
+        detener = threading.Event()
+        hilos = [
+            threading.Thread(
+                target=self._trabajar,
+                args=(detener, options['lote'], options['intervalo']),
+                name=f"outbox-{i}",
+                daemon=True,
+            )
+            for i in range(max(options['hilos'], 1))
+        ]
+        for hilo in hilos:
+            hilo.start()
+
+        self.stdout.write(self.style.SUCCESS(f"Procesando correos con {len(hilos)} hilo(s)..."))
+        try:
+            while True:
+                time.sleep(max(options['intervalo'], 1) * 15)
+                close_old_connections()
+                try:
+                    # Un solo hilo arma el resumen de stock para respetar la ventana.
+                    alertas = despachar_resumen()
+                    if alertas:
+                        self.stdout.write(f"Resumen de stock encolado con {alertas} alerta(s)")
+                    self._mostrar_estado()
+                except Exception as e:
+                    self.stderr.write(f"Error en la tarea periódica: {e}")
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Deteniendo hilos..."))
+            detener.set()
+            for hilo in hilos:
+                hilo.join()
+
+    def _trabajar(self, detener, lote, intervalo):
+        try:
+            while not detener.is_set():
+                try:
+                    procesados = outbox.procesar_lote(lote)
+                except Exception as e:
+                    self.stderr.write(f"Error procesando lote: {e}")
+                    close_old_connections()
+                    procesados = 0
+                if not procesados:
+                    detener.wait(intervalo)
+        finally:
+            connection.close()
+
+    def _mostrar_estado(self):
+        estado = outbox.estadisticas()
+        self.stdout.write(
+            f"Cola de correos: {estado['profundidad']} pendientes, "
+            f"lag {estado['lag_segundos']:.1f}s, {estado['fallidos']} fallidos"
+        )
@@ -0,0 +1,85 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _direccion(texto):
+    host, _, puerto = texto.rpartition(':')
+    if not host or not puerto.isdigit():
+        raise CommandError(f"Dirección inválida: {texto!r} (se espera host:puerto)")
+    return host, int(puerto)
+
+
+class Command(BaseCommand):
+    help = (
+        "Proxy TCP que agrega latencia fija en cada sentido. Se pone delante de "
+        "PostgreSQL o Redis (DB_HOST/DB_PORT, REDIS_URL) para comparar con "
+        "prueba_carga el servidor WSGI contra el ASGI cuando el I/O es lento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escuchar', default='127.0.0.1:6432',
+                            help="host:puerto donde escucha el proxy.")
+        parser.add_argument('--destino', required=True,
+                            help="host:puerto del servicio real, p. ej. db:5432.")
+        parser.add_argument('--retardo-ms', type=float, default=20.0,
+                            help="Milisegundos agregados a cada envío, en cada sentido.")
+
+    def handle(self, *args, **options):
+        self.destino = _direccion(options['destino'])
+        self.retardo = options['retardo_ms'] / 1000
+        host, puerto = _direccion(options['escuchar'])
+        try:
+            asyncio.run(self._servir(host, puerto))
+        except KeyboardInterrupt:
+            pass
+
+    async def _servir(self, host, puerto):
+        servidor = await asyncio.start_server(self._atender, host, puerto)
+        self.stdout.write(self.style.SUCCESS(
+            f"Proxy {host}:{puerto} -> {self.destino[0]}:{self.destino[1]} "
+            f"con {self.retardo * 1000:.0f} ms por sentido"
+        ))
+        async with servidor:
+            await servidor.serve_forever()
+
+    async def _atender(self, cliente_r, cliente_w):
+        try:
+            destino_r, destino_w = await asyncio.open_connection(*self.destino)
+        except OSError as e:
+            self.stderr.write(f"No se pudo conectar con el destino: {e}")
+            cliente_w.close()
+            return
+        await asyncio.gather(
+            self._copiar(cliente_r, destino_w),
+            self._copiar(destino_r, cliente_w),
+        )
+
+    async def _copiar(self, lector, escritor):
+        # Cada bloque se entrega `retardo` después de llegar, sin frenar a los siguientes.
+        cola = asyncio.Queue()
+
+        async def entregar():
+            while True:
+                llegada, datos = await cola.get()
+                if datos is None:
+                    break
+                espera = llegada + self.retardo - asyncio.get_running_loop().time()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+                escritor.write(datos)
+                await escritor.drain()
+
+        entrega = asyncio.create_task(entregar())
+        try:
+            while datos := await lector.read(65536):
+                await cola.put((asyncio.get_running_loop().time(), datos))
+        except ConnectionError:
+            pass
+        finally:
+            await cola.put((0, None))
+            try:
+                await entrega
+            except ConnectionError:
+                pass
+            escritor.close()
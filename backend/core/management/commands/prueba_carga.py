@@ -0,0 +1,197 @@
+import asyncio
+import json
+import statistics
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Conexion:
+    """Cliente HTTP/1.1 mínimo con keep-alive (solo librería estándar)."""
+
+    def __init__(self, host, puerto):
+        self.host = host
+        self.puerto = puerto
+        self.reader = None
+        self.writer = None
+
+    async def abrir(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.puerto)
+
+    async def cerrar(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.writer = None
+
+    async def pedir(self, metodo, ruta, cuerpo=None, cabeceras=None):
+        if self.writer is None:
+            await self.abrir()
+
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else b''
+        lineas = [
+            f"{metodo} {ruta} HTTP/1.1",
+            f"Host: {self.host}:{self.puerto}",
+            "Connection: keep-alive",
+            "Accept: application/json",
+            f"Content-Length: {len(datos)}",
+        ]
+        if cuerpo is not None:
+            lineas.append("Content-Type: application/json")
+        for nombre, valor in (cabeceras or {}).items():
+            lineas.append(f"{nombre}: {valor}")
+        self.writer.write(("\r\n".join(lineas) + "\r\n\r\n").encode() + datos)
+        await self.writer.drain()
+
+        estado = int((await self.reader.readline()).split()[1])
+        respuesta = {}
+        while True:
+            linea = await self.reader.readline()
+            if linea in (b'\r\n', b''):
+                break
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            respuesta[nombre.strip().lower()] = valor.strip()
+
+        if respuesta.get('transfer-encoding') == 'chunked':
+            contenido = b''
+            while True:
+                tamano = int((await self.reader.readline()).strip(), 16)
+                if tamano == 0:
+                    await self.reader.readline()
+                    break
+                contenido += await self.reader.readexactly(tamano)
+                await self.reader.readline()
+        else:
+            contenido = await self.reader.readexactly(int(respuesta.get('content-length', 0)))
+
+        if respuesta.get('connection', '').lower() == 'close':
+            await self.cerrar()
+        return estado, contenido
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    indice = min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)
+    return ordenados[indice]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga local contra un servidor en marcha: catálogo, carrito y login. "
+        "Informa peticiones/s y latencias p50/p95/p99 por escenario."
+    )
+
+    ESCENARIOS = ('catalogo', 'carrito', 'login')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrencia', type=int, default=50,
+                            help="Conexiones keep-alive simultáneas.")
+        parser.add_argument('--duracion', type=float, default=30.0, help="Segundos de carga.")
+        parser.add_argument('--escenarios', default='catalogo,carrito',
+                            help=f"Lista separada por comas: {', '.join(self.ESCENARIOS)}.")
+        parser.add_argument('--categoria', type=int, default=1,
+                            help="Categoría usada en el escenario de catálogo.")
+        parser.add_argument('--email', help="Usuario para carrito y login.")
+        parser.add_argument('--password', help="Contraseña del usuario.")
+
+    def handle(self, *args, **options):
+        escenarios = [e.strip() for e in options['escenarios'].split(',') if e.strip()]
+        desconocidos = set(escenarios) - set(self.ESCENARIOS)
+        if desconocidos:
+            raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+        if {'carrito', 'login'} & set(escenarios) and not (options['email'] and options['password']):
+            raise CommandError("Los escenarios carrito y login necesitan --email y --password.")
+
+        url = urlsplit(options['url'])
+        self.host = url.hostname
+        self.puerto = url.port or 80
+        self.options = options
+        self.escenarios = escenarios
+
+        resultados, duracion = asyncio.run(self._ejecutar())
+        self._informar(resultados, duracion)
+
+    async def _ejecutar(self):
+        self.token = None
+        if 'carrito' in self.escenarios:
+            conexion = Conexion(self.host, self.puerto)
+            try:
+                estado, contenido = await conexion.pedir('POST', '/api/usuarios/login/', self._credenciales())
+            except OSError as e:
+                raise CommandError(f"No se pudo conectar con {self.host}:{self.puerto}: {e}")
+            finally:
+                await conexion.cerrar()
+            if estado != 200:
+                raise CommandError(f"No se pudo iniciar sesión ({estado}): {contenido[:200]!r}")
+            self.token = json.loads(contenido)['tokens']['access']
+
+        resultados = defaultdict(lambda: {'latencias': [], 'estados': defaultdict(int), 'errores': 0})
+        inicio = time.perf_counter()
+        fin = inicio + self.options['duracion']
+        await asyncio.gather(*(
+            self._cliente(i, fin, resultados) for i in range(self.options['concurrencia'])
+        ))
+        return resultados, time.perf_counter() - inicio
+
+    async def _cliente(self, numero, fin, resultados):
+        conexion = Conexion(self.host, self.puerto)
+        turno = numero
+        try:
+            while time.perf_counter() < fin:
+                escenario = self.escenarios[turno % len(self.escenarios)]
+                turno += 1
+                metodo, ruta, cuerpo, cabeceras = self._peticion(escenario)
+                datos = resultados[escenario]
+                t0 = time.perf_counter()
+                try:
+                    estado, _ = await conexion.pedir(metodo, ruta, cuerpo, cabeceras)
+                except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    datos['errores'] += 1
+                    await conexion.cerrar()
+                    continue
+                datos['latencias'].append(time.perf_counter() - t0)
+                datos['estados'][estado] += 1
+        finally:
+            await conexion.cerrar()
+
+    def _credenciales(self):
+        return {'email': self.options['email'], 'password': self.options['password']}
+
+    def _peticion(self, escenario):
+        if escenario == 'catalogo':
+            return 'GET', f"/api/productos/publico/categorias/{self.options['categoria']}/productos/", None, None
+        if escenario == 'carrito':
+            return 'GET', '/api/carrito/carrito/', None, {'Authorization': f"Bearer {self.token}"}
+        return 'POST', '/api/usuarios/login/', self._credenciales(), None
+
+    def _informar(self, resultados, duracion):
+        self.stdout.write(
+            f"{self.options['concurrencia']} conexiones durante {duracion:.1f}s contra "
+            f"{self.host}:{self.puerto}\n"
+        )
+        self.stdout.write(
+            f"{'escenario':<10} {'peticiones':>10} {'pet/s':>9} {'p50 ms':>9} "
+            f"{'p95 ms':>9} {'p99 ms':>9} {'errores':>8}  estados"
+        )
+        for escenario in self.escenarios:
+            datos = resultados[escenario]
+            ordenados = sorted(datos['latencias'])
+            estados = ", ".join(f"{codigo}: {n}" for codigo, n in sorted(datos['estados'].items()))
+            self.stdout.write(
+                f"{escenario:<10} {len(ordenados):>10} {len(ordenados) / duracion:>9.1f} "
+                f"{percentil(ordenados, 50) * 1000:>9.2f} {percentil(ordenados, 95) * 1000:>9.2f} "
+                f"{percentil(ordenados, 99) * 1000:>9.2f} {datos['errores']:>8}  {estados}"
+            )
+        todas = [latencia for datos in resultados.values() for latencia in datos['latencias']]
+        if todas:
+            self.stdout.write(
+                f"\nTotal: {len(todas) / duracion:.1f} pet/s, "
+                f"media {statistics.fmean(todas) * 1000:.2f} ms"
+            )
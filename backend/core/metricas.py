@@ -0,0 +1,169 @@
+"""
+Métricas de las peticiones en formato Prometheus (GET /metrics).
+
+MetricasMiddleware (core.middleware) registra por ruta la latencia, las
+respuestas por código, la cantidad de consultas y el tiempo en la base, y
+las peticiones en curso. La ruta es el patrón de la URL
+("api/productos/admin/productos/<int:pk>/"), nunca el path concreto, para
+no crear una serie por id.
+
+Las consultas se cuentan con un execute_wrapper que se agrega una vez a
+cada conexión (señal connection_created) y suma en el acumulador de la
+petición actual, guardado en un ContextVar: funciona igual con hilos
+(gthread) y con vistas async, donde el ORM corre en otro hilo.
+
+Con gunicorn cada worker es un proceso: si PROMETHEUS_MULTIPROC_DIR está
+definida (gunicorn.conf.py la define antes de cargar la app), cada proceso
+escribe sus valores en archivos mmap de ese directorio y /metrics suma los
+de todos. Sin la variable (runserver, comandos) se usa el registro del
+proceso.
+
+core.db agrega el tiempo de checkout de las conexiones y el estado del pool.
+El estado de la cola de correos (core.outbox) no es de ningún proceso: se
+lee de la base en cada scrape.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+
+from django.db import DatabaseError
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+SIN_RUTA = '<sin_ruta>'
+METODOS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+LATENCIA = Histogram(
+    'ecommerce_peticion_segundos', "Duración de la petición, de la primera middleware a la respuesta.",
+    ['metodo', 'ruta'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPUESTAS = Counter(
+    'ecommerce_respuestas', "Respuestas por código de estado.",
+    ['metodo', 'ruta', 'estado'],
+)
+CONSULTAS_BD = Histogram(
+    'ecommerce_peticion_consultas_bd', "Consultas SQL por petición.",
+    ['metodo', 'ruta'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+TIEMPO_BD = Histogram(
+    'ecommerce_peticion_bd_segundos', "Tiempo en la base de datos por petición.",
+    ['metodo', 'ruta'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+EN_CURSO = Gauge(
+    'ecommerce_peticiones_en_curso', "Peticiones que se están atendiendo.",
+    multiprocess_mode='livesum',
+)
+# Las dos de conexiones las alimenta core.db (DB_POOL_MODO).
+CHECKOUT_BD = Histogram(
+    'ecommerce_bd_checkout_segundos',
+    "Tiempo en obtener una conexión: handshake sin pool, espera en el pool con pool.",
+    ['alias'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+POOL_BD = Gauge(
+    'ecommerce_bd_pool_conexiones', "Pool de psycopg: conexiones abiertas, libres y peticiones esperando.",
+    ['alias', 'estado'],
+    multiprocess_mode='livesum',
+)
+
+# [consultas, segundos] de la petición en curso, o None fuera de una petición.
+_acumulado = ContextVar('metricas_bd', default=None)
+
+# Series ya creadas por (metodo, ruta[, estado]): evita .labels() en cada petición.
+_series = {}
+_respuestas = {}
+
+
+def registrar_consulta(execute, sql, params, many, context):
+    acumulado = _acumulado.get()
+    if acumulado is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        acumulado[0] += 1
+        acumulado[1] += time.perf_counter() - inicio
+
+
+def instrumentar_conexion(sender, connection, **kwargs):
+    # connection_created se repite en cada reconexión del mismo DatabaseWrapper.
+    if registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_consulta)
+
+
+def iniciar():
+    """Abre el acumulador de consultas de una petición; devuelve el token para terminar()."""
+    EN_CURSO.inc()
+    return _acumulado.set([0, 0.0])
+
+
+def terminar(token, request, estado, segundos):
+    consultas, segundos_bd = _acumulado.get()
+    _acumulado.reset(token)
+    EN_CURSO.dec()
+
+    coincidencia = getattr(request, 'resolver_match', None)
+    ruta = coincidencia.route if coincidencia is not None else SIN_RUTA
+    clave = (request.method if request.method in METODOS else 'OTRO', ruta)
+    series = _series.get(clave)
+    if series is None:
+        series = _series[clave] = (
+            LATENCIA.labels(*clave), CONSULTAS_BD.labels(*clave), TIEMPO_BD.labels(*clave),
+        )
+    series[0].observe(segundos)
+    series[1].observe(consultas)
+    series[2].observe(segundos_bd)
+
+    respuestas = _respuestas.get((clave, estado))
+    if respuestas is None:
+        respuestas = _respuestas[(clave, estado)] = RESPUESTAS.labels(*clave, estado)
+    respuestas.inc()
+
+
+class ColaCorreos:
+    """Profundidad, lag y descartados de la cola de correos salientes."""
+
+    def collect(self):
+        from core import outbox
+
+        try:
+            estado = outbox.estadisticas()
+        except DatabaseError as e:
+            logger.warning("No se pudo leer la cola de correos: %s", e)
+            return
+        yield GaugeMetricFamily(
+            'ecommerce_correos_pendientes', "Correos en la cola sin enviar.", value=estado['profundidad'],
+        )
+        yield GaugeMetricFamily(
+            'ecommerce_correos_lag_segundos', "Antigüedad del correo pendiente más viejo.",
+            value=estado['lag_segundos'],
+        )
+        yield GaugeMetricFamily(
+            'ecommerce_correos_fallidos', "Correos descartados tras agotar los reintentos.",
+            value=estado['fallidos'],
+        )
+
+
+# Métricas que se calculan al exportar, iguales desde cualquier proceso.
+_ESTADO = CollectorRegistry()
+_ESTADO.register(ColaCorreos())
+
+
+def exportar():
+    """(cuerpo, content_type) con las métricas de todos los procesos."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro) + generate_latest(_ESTADO), CONTENT_TYPE_LATEST
@@ -0,0 +1,113 @@
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from core import metricas, perfiles
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición para /metrics (ver core.metricas). Va primera en
+    MIDDLEWARE para incluir a las demás. Funciona en WSGI y en ASGI sin
+    pasar por sync_to_async.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self._acall(request)
+        if request.path_info == '/metrics':
+            return self.get_response(request)
+        inicio = time.perf_counter()
+        token = metricas.iniciar()
+        estado = 500
+        try:
+            response = self.get_response(request)
+            estado = response.status_code
+            return response
+        finally:
+            metricas.terminar(token, request, estado, time.perf_counter() - inicio)
+
+    async def _acall(self, request):
+        if request.path_info == '/metrics':
+            return await self.get_response(request)
+        inicio = time.perf_counter()
+        token = metricas.iniciar()
+        estado = 500
+        try:
+            response = await self.get_response(request)
+            estado = response.status_code
+            return response
+        finally:
+            metricas.terminar(token, request, estado, time.perf_counter() - inicio)
+
+
+class PerfilMiddleware:
+    """
+    Perfila la petición si un admin lo pide con X-Perfil (ver core.perfiles).
+    Sin la marca solo cuesta mirar un header y un parámetro.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self._acall(request)
+        modo, memoria = perfiles.pedido(request)
+        if modo is None:
+            return self.get_response(request)
+        usuario = perfiles.autorizar(request)
+        if usuario is None:
+            return self.get_response(request)
+        if not perfiles.dentro_del_limite(request):
+            response = self.get_response(request)
+            response['X-Perfil'] = 'limitado'
+            return response
+
+        hilos = None if modo == perfiles.CPROFILE else {threading.get_ident()}
+        sesion = perfiles.Sesion(modo, memoria, hilos)
+        sesion.iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            sesion.terminar()
+        response['X-Perfil-Id'] = sesion.guardar(request, usuario, response.status_code)
+        return response
+
+    async def _acall(self, request):
+        modo, memoria = perfiles.pedido(request)
+        if modo is None:
+            return await self.get_response(request)
+        usuario = await sync_to_async(perfiles.autorizar)(request)
+        if usuario is None:
+            return await self.get_response(request)
+        if not await sync_to_async(perfiles.dentro_del_limite)(request):
+            response = await self.get_response(request)
+            response['X-Perfil'] = 'limitado'
+            return response
+
+        # cProfile solo ve su hilo y acá la vista puede correr en otro: muestreo de todos.
+        sesion = perfiles.Sesion(perfiles.MUESTREO, memoria)
+        sesion.iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            sesion.terminar()
+        response['X-Perfil-Id'] = await sync_to_async(sesion.guardar)(request, usuario, response.status_code)
+        return response
@@ -0,0 +1,35 @@
+from django.db.migrations.operations.base import Operation
+
+
+class SoloPostgres(Operation):
+    """
+    Aplica la operación envuelta solo en PostgreSQL (índices GIN, opclasses
+    de pg_trgm). En SQLite, donde corren las pruebas locales, el estado de
+    los modelos queda igual pero no se toca la base.
+    """
+
+    reversible = True
+
+    def __init__(self, operacion):
+        self.operacion = operacion
+
+    def deconstruct(self):
+        return self.__class__.__qualname__, [self.operacion], {}
+
+    def state_forwards(self, app_label, state):
+        self.operacion.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            self.operacion.database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            self.operacion.database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return f"{self.operacion.describe()} (solo PostgreSQL)"
+
+    @property
+    def migration_name_fragment(self):
+        return self.operacion.migration_name_fragment
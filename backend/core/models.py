@@ -0,0 +1,38 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class CorreoSaliente(models.Model):
+    """Correo encolado (outbox) en la misma transacción que lo origina."""
+
+    PENDIENTE = 'pendiente'
+    ENVIADO = 'enviado'
+    FALLIDO = 'fallido'
+    ESTADOS = (
+        (PENDIENTE, 'Pendiente'),
+        (ENVIADO, 'Enviado'),
+        (FALLIDO, 'Fallido'),
+    )
+
+    asunto = models.CharField(max_length=255)
+    cuerpo = models.TextField()
+    destinatarios = models.JSONField(default=list)
+    estado = models.CharField(max_length=10, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    ultimo_error = models.TextField(blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    disponible_en = models.DateTimeField(default=timezone.now)
+    enviado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['disponible_en'],
+                condition=Q(estado='pendiente'),
+                name='correo_pendiente_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.asunto} -> {', '.join(self.destinatarios)} ({self.estado})"
@@ -0,0 +1,129 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import CorreoSaliente
+
+logger = logging.getLogger(__name__)
+
+
+def encolar_correo(asunto, cuerpo, destinatarios):
+    # Debe llamarse dentro de la transacción que origina el correo:
+    # si esa transacción hace rollback, el correo tampoco se envía.
+    return CorreoSaliente.objects.create(
+        asunto=asunto,
+        cuerpo=cuerpo,
+        destinatarios=list(destinatarios),
+    )
+
+
+def calcular_backoff(intentos):
+    segundos = settings.OUTBOX_BACKOFF_SEGUNDOS * (2 ** max(intentos - 1, 0))
+    return timedelta(seconds=min(segundos, settings.OUTBOX_BACKOFF_MAX_SEGUNDOS))
+
+
+def _registrar_fallo(correo, error, ahora):
+    correo.intentos += 1
+    correo.ultimo_error = str(error)
+    if correo.intentos >= settings.OUTBOX_MAX_INTENTOS:
+        correo.estado = CorreoSaliente.FALLIDO
+        logger.error("Correo %s descartado tras %s intentos: %s", correo.pk, correo.intentos, error)
+    else:
+        correo.disponible_en = ahora + calcular_backoff(correo.intentos)
+
+
+def procesar_lote(tamano=None):
+    """
+    Envía un lote de correos pendientes reutilizando una sola conexión SMTP.
+
+    El lote se reclama en una transacción corta: las filas se bloquean con
+    SKIP LOCKED y su disponible_en se corre OUTBOX_RECLAMO_SEGUNDOS hacia
+    adelante, así ningún otro hilo o proceso las toma mientras se envían.
+    Los envíos van fuera de la transacción, sin retener bloqueos, y se cortan
+    pasados OUTBOX_LOTE_SEGUNDOS: lo que no se llegó a enviar queda disponible
+    otra vez. Si el proceso muere a mitad del lote, esos correos se reintentan
+    cuando vence el reclamo (entrega al menos una vez).
+    Devuelve la cantidad de correos procesados (enviados o reintentables).
+    """
+    tamano = tamano or settings.OUTBOX_LOTE
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        correos = list(
+            CorreoSaliente.objects.select_for_update(skip_locked=True)
+            .filter(estado=CorreoSaliente.PENDIENTE, disponible_en__lte=ahora)
+            .order_by('disponible_en')[:tamano]
+        )
+        if not correos:
+            return 0
+        CorreoSaliente.objects.filter(id__in=[correo.id for correo in correos]).update(
+            disponible_en=ahora + timedelta(seconds=settings.OUTBOX_RECLAMO_SEGUNDOS),
+        )
+
+    procesados = _enviar(correos, ahora)
+
+    # Los que no se enviaron conservan en memoria su disponible_en anterior:
+    # guardarlos así libera el reclamo.
+    CorreoSaliente.objects.bulk_update(
+        correos,
+        ['estado', 'intentos', 'ultimo_error', 'disponible_en', 'enviado_en'],
+    )
+    return procesados
+
+
+def _enviar(correos, ahora):
+    conexion = get_connection(fail_silently=False)
+    try:
+        conexion.open()
+    except Exception as e:
+        logger.warning("No se pudo abrir la conexión de correo: %s", e)
+        for correo in correos:
+            _registrar_fallo(correo, e, ahora)
+        return len(correos)
+
+    limite = time.monotonic() + settings.OUTBOX_LOTE_SEGUNDOS
+    procesados = 0
+    try:
+        for correo in correos:
+            if procesados and time.monotonic() >= limite:
+                logger.info("Lote de correos cortado por tiempo: %s sin enviar", len(correos) - procesados)
+                break
+            mensaje = EmailMessage(
+                subject=correo.asunto,
+                body=correo.cuerpo,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=correo.destinatarios,
+                connection=conexion,
+            )
+            try:
+                mensaje.send(fail_silently=False)
+            except Exception as e:
+                _registrar_fallo(correo, e, ahora)
+            else:
+                correo.estado = CorreoSaliente.ENVIADO
+                correo.enviado_en = timezone.now()
+            procesados += 1
+    finally:
+        conexion.close()
+    return procesados
+
+
+def estadisticas():
+    """Profundidad de la cola y antigüedad (lag) del correo pendiente más viejo."""
+    ahora = timezone.now()
+    pendientes = CorreoSaliente.objects.filter(estado=CorreoSaliente.PENDIENTE).aggregate(
+        profundidad=Count('id'),
+        mas_antiguo=Min('creado_en'),
+    )
+    mas_antiguo = pendientes['mas_antiguo']
+    return {
+        'profundidad': pendientes['profundidad'],
+        'lag_segundos': (ahora - mas_antiguo).total_seconds() if mas_antiguo else 0.0,
+        'fallidos': CorreoSaliente.objects.filter(estado=CorreoSaliente.FALLIDO).count(),
+    }
@@ -0,0 +1,93 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+
+def codificar_cursor(*valores):
+    # Los Decimal van como texto para no perder precisión.
+    texto = json.dumps(valores, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Devuelve la lista de valores del cursor, o None si no viene. ValueError si es inválido."""
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido.")
+    if not isinstance(valores, list) or not valores:
+        raise ValueError("Cursor inválido.")
+    return valores
+
+
+def leer_limite(request, defecto=None, maximo=None):
+    defecto = defecto or settings.PAGINA_TAMANO
+    maximo = maximo or settings.PAGINA_TAMANO_MAX
+    # Acepta tanto Request de DRF como HttpRequest (vistas async).
+    valor = getattr(request, 'query_params', request.GET).get('limite')
+    if valor is None:
+        return defecto
+    limite = int(valor)
+    if limite < 1:
+        raise ValueError("El límite debe ser positivo.")
+    return min(limite, maximo)
+
+
+def paginar_por_id(queryset, cursor, limite):
+    """
+    Paginación keyset sobre `id`: cada página es un `WHERE id > cursor
+    ORDER BY id LIMIT n`, que cuesta lo mismo sin importar qué tan lejos
+    esté la página. Devuelve (filas, cursor_siguiente).
+    """
+    return _cortar(list(_pagina(queryset, cursor, limite)), limite)
+
+
+async def apaginar_por_id(queryset, cursor, limite):
+    """Como paginar_por_id, con el ORM async."""
+    return _cortar([fila async for fila in _pagina(queryset, cursor, limite)], limite)
+
+
+def _pagina(queryset, cursor, limite):
+    if cursor is not None:
+        queryset = queryset.filter(id__gt=int(cursor[0]))
+    return queryset.order_by('id')[:limite + 1]
+
+
+def _cortar(filas, limite):
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultimo = filas[-1]
+        siguiente = codificar_cursor(ultimo['id'] if isinstance(ultimo, dict) else ultimo.id)
+    return filas, siguiente
+
+
+def paginar_por_campos(queryset, campos, cursor, limite, descendente=False):
+    """
+    Keyset sobre dos columnas, la segunda única (p. ej. `email` normalizado
+    e `id`): la página arranca en el índice sobre ambas en vez de ordenar
+    todas las coincidencias. Con `descendente` el primer campo va de mayor
+    a menor (p. ej. relevancia) y el segundo sigue ascendente para desempatar.
+    Acepta filas como dict o instancia.
+    """
+    primero, segundo = campos
+    if cursor is not None:
+        if len(cursor) != 2:
+            raise ValueError("Cursor inválido.")
+        despues = 'lt' if descendente else 'gt'
+        queryset = queryset.filter(**{f"{primero}__{despues}e": cursor[0]}).filter(
+            Q(**{f"{primero}__{despues}": cursor[0]}) | Q(**{primero: cursor[0], f"{segundo}__gt": cursor[1]})
+        )
+    filas = list(queryset.order_by(f"-{primero}" if descendente else primero, segundo)[:limite + 1])
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultimo = filas[-1]
+        valor = ultimo.get if isinstance(ultimo, dict) else lambda campo: getattr(ultimo, campo)
+        siguiente = codificar_cursor(valor(primero), valor(segundo))
+    return filas, siguiente
@@ -0,0 +1,29 @@
+import io
+
+from rest_framework.parsers import JSONParser, get_encoding
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se comporta como JSONParser
+    orjson = None
+
+
+class OrjsonParser(JSONParser):
+    """
+    JSONParser de DRF con orjson para cuerpos UTF-8. Devuelve los mismos
+    datos y, como STRICT_JSON, rechaza NaN/Infinity. Con otra codificación
+    o sin orjson usa el parser de DRF.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = get_encoding(parser_context or {})
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        cuerpo = stream.read()
+        try:
+            return orjson.loads(cuerpo)
+        except orjson.JSONDecodeError:
+            # El error sale con el mismo mensaje que en DRF; también cubre lo
+            # que orjson no acepta y json sí (enteros de más de 64 bits).
+            return super().parse(io.BytesIO(cuerpo), media_type, parser_context)
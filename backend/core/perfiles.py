@@ -0,0 +1,325 @@
+"""
+Perfilado a pedido de una petición (PerfilMiddleware).
+
+Un admin agrega a la petición `X-Perfil: cprofile` o `X-Perfil: muestreo`
+(o `?_perfil=...`), y opcionalmente `X-Perfil-Memoria: 1`
+(`?_perfil_memoria=1`). La petición se atiende normalmente; los resultados
+quedan en PERFIL_DIR y la respuesta trae `X-Perfil-Id` para bajarlos desde
+/api/perfiles/<id>/<formato>/:
+
+- cprofile: perfil determinista del hilo de la vista. `pstats` (para
+  `python -m pstats` o snakeviz) y `resumen` (las funciones con más tiempo
+  acumulado, en texto).
+- muestreo: un hilo toma la pila cada PERFIL_INTERVALO_MS; mucho menos
+  intrusivo. `speedscope` (JSON para https://www.speedscope.app).
+- memoria: diferencia de tracemalloc entre el inicio y el fin, por línea.
+  tracemalloc es uno por proceso: las sesiones simultáneas lo comparten y
+  cada diferencia puede incluir lo que asignaron las otras peticiones.
+
+En vistas async no hay un hilo único que perfilar con cProfile: se usa
+muestreo de todos los hilos, que puede incluir otras peticiones del mismo
+worker.
+
+Perfilar cuesta: lo limita la tasa "perfil_global" de DEFAULT_THROTTLE_RATES
+(compartida por todos los workers), y las peticiones de quien no es admin
+ignoran las marcas sin avisar.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.throttling import LimiteVentanaDeslizante
+
+CPROFILE = 'cprofile'
+MUESTREO = 'muestreo'
+MODOS = (CPROFILE, MUESTREO)
+
+# formato -> sufijo del archivo
+FORMATOS = {
+    'pstats': '.pstats',
+    'resumen': '.txt',
+    'speedscope': '.speedscope.json',
+    'memoria': '.memoria.txt',
+}
+_ID = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$')
+
+
+class LimitePerfil(LimiteVentanaDeslizante):
+    sufijo = 'global'
+
+    def identificador(self, request, view):
+        return 'todos'
+
+
+_VISTA_LIMITE = SimpleNamespace(throttle_scope='perfil')
+
+
+def pedido(request):
+    """Modo pedido por la petición (None si no pidió perfil) y si pidió memoria."""
+    modo = request.headers.get('X-Perfil') or request.GET.get('_perfil')
+    if not modo:
+        return None, False
+    memoria = (request.headers.get('X-Perfil-Memoria') or request.GET.get('_perfil_memoria')) == '1'
+    return (modo if modo in MODOS else CPROFILE), memoria
+
+
+def autorizar(request):
+    """Usuario admin de la petición si puede perfilar ahora, o None."""
+    from usuarios.authentication import JWTSinConsultaAuthentication
+    from usuarios.permissions import EsAdmin
+
+    try:
+        autenticado = JWTSinConsultaAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if autenticado is None:
+        return None
+    usuario = autenticado[0]
+    if not EsAdmin().has_permission(SimpleNamespace(user=usuario), None):
+        return None
+    return usuario
+
+
+def dentro_del_limite(request):
+    return LimitePerfil().allow_request(request, _VISTA_LIMITE)
+
+
+class Sesion:
+    """Un perfilado en curso: se abre antes de la vista y se guarda después."""
+
+    def __init__(self, modo, memoria, hilos=None):
+        self.modo = modo
+        self.memoria = memoria
+        self.hilos = hilos
+        self.perfil = None
+        self.muestreador = None
+
+    def iniciar(self):
+        if self.memoria:
+            self.antes = _abrir_memoria()
+        self.inicio = time.perf_counter()
+        if self.modo == CPROFILE:
+            self.perfil = cProfile.Profile()
+            self.perfil.enable()
+        else:
+            self.muestreador = Muestreador(settings.PERFIL_INTERVALO_MS / 1000, self.hilos)
+            self.muestreador.start()
+
+    def terminar(self):
+        if self.perfil is not None:
+            self.perfil.disable()
+        else:
+            self.muestreador.detener()
+        self.duracion = time.perf_counter() - self.inicio
+        if self.memoria:
+            self.despues = _cerrar_memoria()
+
+    def guardar(self, request, usuario, estado):
+        """Escribe los artefactos en PERFIL_DIR y devuelve el id."""
+        perfil_id = f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        coincidencia = getattr(request, 'resolver_match', None)
+        nombre = f"{request.method} {request.path}"
+        artefactos = {}
+
+        if self.perfil is not None:
+            self.perfil.create_stats()
+            artefactos['pstats'] = lambda ruta: self.perfil.dump_stats(ruta)
+            artefactos['resumen'] = lambda ruta: _escribir(ruta, _resumen(self.perfil, nombre))
+        else:
+            datos = json.dumps(self.muestreador.speedscope(nombre)).encode()
+            artefactos['speedscope'] = lambda ruta: _escribir(ruta, datos)
+        if self.memoria:
+            artefactos['memoria'] = lambda ruta: _escribir(ruta, _diferencia_memoria(self.antes, self.despues))
+
+        directorio = settings.PERFIL_DIR
+        os.makedirs(directorio, exist_ok=True)
+        for formato, escribir in artefactos.items():
+            escribir(os.path.join(directorio, perfil_id + FORMATOS[formato]))
+        _escribir(os.path.join(directorio, f"{perfil_id}.json"), json.dumps({
+            'id': perfil_id,
+            'modo': self.modo,
+            'metodo': request.method,
+            'path': request.path,
+            'ruta': coincidencia.route if coincidencia is not None else None,
+            'estado': estado,
+            'usuario': usuario.id,
+            'duracion_ms': round(self.duracion * 1000, 2),
+            'creado_en': timezone.now().isoformat(),
+            'formatos': list(artefactos),
+        }).encode())
+        podar(directorio, settings.PERFIL_MAX)
+        return perfil_id
+
+
+# Sesiones de memoria abiertas en el proceso. La primera enciende tracemalloc
+# y la última lo apaga, salvo que ya estuviera activo (p. ej. PYTHONTRACEMALLOC).
+_memoria_lock = threading.Lock()
+_memoria_sesiones = 0
+_memoria_propia = False
+
+
+def _abrir_memoria():
+    global _memoria_sesiones, _memoria_propia
+    with _memoria_lock:
+        if _memoria_sesiones == 0:
+            _memoria_propia = not tracemalloc.is_tracing()
+            if _memoria_propia:
+                tracemalloc.start(settings.PERFIL_MEMORIA_FRAMES)
+        _memoria_sesiones += 1
+        return tracemalloc.take_snapshot()
+
+
+def _cerrar_memoria():
+    global _memoria_sesiones
+    with _memoria_lock:
+        despues = tracemalloc.take_snapshot()
+        _memoria_sesiones -= 1
+        if _memoria_sesiones == 0 and _memoria_propia:
+            tracemalloc.stop()
+        return despues
+
+
+class Muestreador(threading.Thread):
+    """
+    Perfilador por muestreo: cada `intervalo` segundos copia la pila de los
+    hilos observados (todos menos él mismo si `hilos` es None). Con el GIL, un
+    hilo que no suelta el intérprete se muestrea cada sys.getswitchinterval().
+    """
+
+    def __init__(self, intervalo, hilos=None):
+        super().__init__(name='perfil-muestreo', daemon=True)
+        self.intervalo = intervalo
+        self.hilos = hilos
+        self.frames = {}
+        self.muestras = {}  # hilo -> [(pila, peso)]
+        self._fin = threading.Event()
+
+    def run(self):
+        propio = threading.get_ident()
+        anterior = time.perf_counter()
+        while not self._fin.wait(self.intervalo):
+            ahora = time.perf_counter()
+            peso, anterior = ahora - anterior, ahora
+            for hilo, frame in sys._current_frames().items():
+                if hilo == propio or (self.hilos is not None and hilo not in self.hilos):
+                    continue
+                self.muestras.setdefault(hilo, []).append((self._pila(frame), peso))
+
+    def detener(self):
+        self._fin.set()
+        self.join()
+
+    def _pila(self, frame):
+        pila = []
+        while frame is not None:
+            codigo = frame.f_code
+            clave = (codigo.co_name, codigo.co_filename, codigo.co_firstlineno)
+            indice = self.frames.get(clave)
+            if indice is None:
+                indice = self.frames[clave] = len(self.frames)
+            pila.append(indice)
+            frame = frame.f_back
+        pila.reverse()
+        return pila
+
+    def speedscope(self, nombre):
+        """Perfil en el formato de archivo de speedscope, uno por hilo."""
+        nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+        perfiles = []
+        for hilo, muestras in self.muestras.items():
+            total = sum(peso for _, peso in muestras)
+            perfiles.append({
+                'type': 'sampled',
+                'name': f"{nombre} [{nombres.get(hilo, hilo)}]",
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': total,
+                'samples': [pila for pila, _ in muestras],
+                'weights': [peso for _, peso in muestras],
+            })
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': nombre,
+            'exporter': 'ecommerce core.perfiles',
+            'shared': {'frames': [
+                {'name': nombre_funcion, 'file': archivo, 'line': linea}
+                for (nombre_funcion, archivo, linea) in self.frames
+            ]},
+            'profiles': perfiles,
+        }
+
+
+def _escribir(ruta, datos):
+    with open(ruta, 'wb') as archivo:
+        archivo.write(datos if isinstance(datos, bytes) else datos.encode())
+
+
+def _resumen(perfil, nombre):
+    salida = io.StringIO()
+    salida.write(f"{nombre}\n\n")
+    pstats.Stats(perfil, stream=salida).sort_stats('cumulative').print_stats(settings.PERFIL_RESUMEN_FILAS)
+    return salida.getvalue()
+
+
+def _diferencia_memoria(antes, despues):
+    excluir = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    diferencias = despues.filter_traces(excluir).compare_to(antes.filter_traces(excluir), 'lineno')
+    lineas = [f"{'bytes':>12} {'bloques':>8}  línea"]
+    for diferencia in diferencias[:settings.PERFIL_RESUMEN_FILAS]:
+        marco = diferencia.traceback[0]
+        lineas.append(
+            f"{diferencia.size_diff:>+12} {diferencia.count_diff:>+8}  {marco.filename}:{marco.lineno}"
+        )
+    total = sum(d.size_diff for d in diferencias)
+    lineas.append(f"\nTotal: {total:+} bytes")
+    return "\n".join(lineas) + "\n"
+
+
+def podar(directorio, maximo):
+    """Deja solo los `maximo` perfiles más nuevos (los ids ordenan por fecha)."""
+    ids = sorted(
+        nombre[:-5] for nombre in os.listdir(directorio)
+        if nombre.endswith('.json') and _ID.match(nombre[:-5])
+    )
+    for viejo in ids[:-maximo] if maximo else []:
+        for sufijo in ('.json', *FORMATOS.values()):
+            try:
+                os.remove(os.path.join(directorio, viejo + sufijo))
+            except FileNotFoundError:
+                pass
+
+
+def listar():
+    directorio = settings.PERFIL_DIR
+    if not os.path.isdir(directorio):
+        return []
+    perfiles = []
+    for nombre in sorted(os.listdir(directorio), reverse=True):
+        if nombre.endswith('.json') and _ID.match(nombre[:-5]):
+            with open(os.path.join(directorio, nombre), 'rb') as archivo:
+                perfiles.append(json.load(archivo))
+    return perfiles
+
+
+def ruta_artefacto(perfil_id, formato):
+    """Ruta del archivo, o None si el id o el formato no son válidos o no existe."""
+    if not _ID.match(perfil_id) or formato not in FORMATOS:
+        return None
+    ruta = os.path.join(settings.PERFIL_DIR, perfil_id + FORMATOS[formato])
+    return ruta if os.path.isfile(ruta) else None
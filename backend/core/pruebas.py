@@ -0,0 +1,45 @@
+"""Ayudas para las pruebas de las apps."""
+import unittest
+
+from django.db import connection
+
+
+class ConsultasConstantesMixin:
+    """
+    Para TestCase: fija la cantidad de consultas de una operación y verifica
+    que no crezca con el tamaño de los datos (N+1).
+    """
+
+    tamanos = (1, 5, 20)
+
+    def assertConsultasConstantes(self, esperadas, preparar, ejecutar, tamanos=None):
+        """
+        Para cada n de `tamanos` llama a `preparar(n)` (fuera de la medición)
+        y exige exactamente `esperadas` consultas en `ejecutar()`.
+        """
+        for n in tamanos or self.tamanos:
+            preparar(n)
+            with self.subTest(tamano=n), self.assertNumQueries(esperadas):
+                ejecutar()
+
+
+class PlanConsultaMixin:
+    """
+    Para TestCase en PostgreSQL: verifica con EXPLAIN que una consulta use un
+    índice. Las pruebas siembran miles de filas y llaman a `analizar()` para
+    que el planificador decida con estadísticas, como en producción (con
+    tablas chicas siempre elige Seq Scan).
+    """
+
+    def analizar(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        patron = rf"(Index Scan|Index Only Scan) using {indice} |Bitmap Index Scan on {indice}\b"
+        self.assertRegex(plan, patron, f"La consulta no usa {indice}:\n{plan}")
+
+
+# Los planes (y los índices de opclass/GIN) son de PostgreSQL.
+solo_postgres = unittest.skipUnless(connection.vendor == 'postgresql', "EXPLAIN de PostgreSQL")
@@ -0,0 +1,48 @@
+"""
+Renderer JSON de DRF con orjson.
+
+Produce los mismos bytes que rest_framework.renderers.JSONRenderer: los
+tipos que orjson no conoce o formatea distinto (Decimal, fechas, textos
+lazy, QuerySet...) pasan por el mismo JSONEncoder.default de DRF, y
+\\u2028/\\u2029 se escapan igual. Si orjson no está instalado, si se pide
+sangría (API navegable, `; indent=4`) o si los datos tienen algo que orjson
+no puede serializar (enteros de más de 64 bits), se usa el renderer de DRF.
+
+Diferencias conocidas: floats con exponente ("1e-5" en lugar de "1e-05",
+mismo valor) y NaN/Infinity, que salen como null en vez de dar error.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se comporta como JSONRenderer
+    orjson = None
+
+_default = JSONEncoder().default
+
+
+class OrjsonRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
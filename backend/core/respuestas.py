@@ -0,0 +1,16 @@
+from django.http import HttpResponse
+from rest_framework.settings import api_settings
+
+
+def respuesta_json(datos, status=200, headers=None):
+    """
+    Respuesta JSON para vistas async fuera de DRF, con el mismo renderer y
+    formato que usan las vistas de DRF.
+    """
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(
+        renderer.render(datos),
+        status=status,
+        content_type=f"{renderer.media_type}; charset=utf-8",
+        headers=headers,
+    )
@@ -0,0 +1,388 @@
+import os
+import runpy
+import time
+import tracemalloc
+from datetime import timedelta
+from smtplib import SMTPException
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from core import outbox, perfiles
+from core.cache import CacheDosNiveles, clave_versionada, invalidar, version
+from core.db import registrar_checkout
+from core.models import CorreoSaliente
+from core.paginacion import decodificar_cursor, paginar_por_campos
+from core.throttling import LimitePorIP, LimiteVentanaDeslizante
+from productos.cache import invalidar_categorias
+from productos.models import Categoria, Producto
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class BackendFallido(BaseEmailBackend):
+    def send_messages(self, mensajes):
+        raise SMTPException("servidor caído")
+
+
+class BackendQueMiraLaCola(LocmemBackend):
+    """Anota, al enviar, cuántos correos seguían disponibles para otro worker."""
+    disponibles = []
+
+    def send_messages(self, mensajes):
+        BackendQueMiraLaCola.disponibles.append(
+            CorreoSaliente.objects.filter(
+                estado=CorreoSaliente.PENDIENTE, disponible_en__lte=timezone.now(),
+            ).count()
+        )
+        return super().send_messages(mensajes)
+
+
+@override_settings(EMAIL_BACKEND=LOCMEM, OUTBOX_MAX_INTENTOS=3, OUTBOX_BACKOFF_SEGUNDOS=30)
+class OutboxTests(TestCase):
+
+    def encolar(self, n=1):
+        return [outbox.encolar_correo(f"Asunto {i}", "Cuerpo", [f"c{i}@example.com"]) for i in range(n)]
+
+    def test_rollback_descarta_el_correo(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.encolar()
+                raise RuntimeError
+        self.assertFalse(CorreoSaliente.objects.exists())
+
+    def test_envia_el_lote_y_lo_marca_enviado(self):
+        self.encolar(3)
+        self.assertEqual(outbox.procesar_lote(), 3)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["c0@example.com", "c1@example.com", "c2@example.com"])
+        self.assertEqual(CorreoSaliente.objects.filter(estado=CorreoSaliente.ENVIADO).count(), 3)
+        self.assertEqual(outbox.procesar_lote(), 0)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_respeta_el_tamano_del_lote(self):
+        self.encolar(5)
+        self.assertEqual(outbox.procesar_lote(2), 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(EMAIL_BACKEND='core.tests.BackendQueMiraLaCola')
+    def test_reclama_el_lote_antes_de_enviar(self):
+        BackendQueMiraLaCola.disponibles = []
+        self.encolar(2)
+        outbox.procesar_lote()
+        # Mientras se envía, ninguna fila del lote está disponible para otro worker.
+        self.assertEqual(BackendQueMiraLaCola.disponibles, [0, 0])
+
+    @override_settings(OUTBOX_LOTE_SEGUNDOS=0)
+    def test_corta_por_tiempo_y_libera_lo_no_enviado(self):
+        self.encolar(3)
+        self.assertEqual(outbox.procesar_lote(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        libres = CorreoSaliente.objects.filter(
+            estado=CorreoSaliente.PENDIENTE, disponible_en__lte=timezone.now(),
+        )
+        self.assertEqual(libres.count(), 2)
+
+    @override_settings(EMAIL_BACKEND='core.tests.BackendFallido')
+    def test_fallo_reintenta_con_backoff_y_descarta_al_final(self):
+        correo, = self.encolar()
+        antes = timezone.now()
+        self.assertEqual(outbox.procesar_lote(), 1)
+        correo.refresh_from_db()
+        self.assertEqual(correo.estado, CorreoSaliente.PENDIENTE)
+        self.assertEqual(correo.intentos, 1)
+        self.assertIn("servidor caído", correo.ultimo_error)
+        self.assertGreaterEqual(correo.disponible_en, antes + timedelta(seconds=30))
+
+        for _ in range(2):
+            CorreoSaliente.objects.filter(pk=correo.pk).update(disponible_en=timezone.now())
+            outbox.procesar_lote()
+        correo.refresh_from_db()
+        self.assertEqual(correo.estado, CorreoSaliente.FALLIDO)
+        self.assertEqual(correo.intentos, 3)
+
+    def test_estadisticas(self):
+        self.encolar(2)
+        CorreoSaliente.objects.filter(pk=self.encolar()[0].pk).update(estado=CorreoSaliente.FALLIDO)
+        estado = outbox.estadisticas()
+        self.assertEqual(estado['profundidad'], 2)
+        self.assertEqual(estado['fallidos'], 1)
+        self.assertGreaterEqual(estado['lag_segundos'], 0)
+
+
+@override_settings(METRICAS_TOKEN='secreto')
+class ColaCorreosMetricasTests(TestCase):
+
+    def test_metrics_exporta_la_cola_de_correos(self):
+        outbox.encolar_correo("Asunto", "Cuerpo", ["c@example.com"])
+        respuesta = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        cuerpo = respuesta.content.decode()
+        self.assertIn('ecommerce_correos_pendientes 1.0', cuerpo)
+        self.assertIn('ecommerce_correos_lag_segundos', cuerpo)
+        self.assertIn('ecommerce_correos_fallidos 0.0', cuerpo)
+
+
+class MetricasAccesoTests(SimpleTestCase):
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro').status_code, 401)
+        with mock.patch('core.metricas.exportar', return_value=(b'', 'text/plain')):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+
+    @override_settings(METRICAS_TOKEN='', DEBUG=False)
+    def test_sin_token_no_existe_en_produccion(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICAS_TOKEN='', DEBUG=True)
+    def test_sin_token_abierto_con_debug(self):
+        with mock.patch('core.metricas.exportar', return_value=(b'', 'text/plain')):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class PoolEstadisticas:
+    def get_stats(self):
+        return {'pool_size': 4, 'pool_available': 1, 'requests_waiting': 2}
+
+
+class ConexionesBDTests(SimpleTestCase):
+
+    def muestra(self, nombre, **etiquetas):
+        return REGISTRY.get_sample_value(nombre, etiquetas)
+
+    def test_checkout_sin_pool(self):
+        antes = self.muestra('ecommerce_bd_checkout_segundos_count', alias='sin_pool') or 0
+        registrar_checkout(SimpleNamespace(alias='sin_pool', pool=None), 0.003)
+        self.assertEqual(self.muestra('ecommerce_bd_checkout_segundos_count', alias='sin_pool'), antes + 1)
+        self.assertIsNone(self.muestra('ecommerce_bd_pool_conexiones', alias='sin_pool', estado='abiertas'))
+
+    def test_checkout_con_pool_publica_el_estado_del_pool(self):
+        registrar_checkout(SimpleNamespace(alias='con_pool', pool=PoolEstadisticas()), 0.2)
+        self.assertEqual(self.muestra('ecommerce_bd_checkout_segundos_bucket', alias='con_pool', le='0.1'), 0)
+        self.assertEqual(self.muestra('ecommerce_bd_checkout_segundos_bucket', alias='con_pool', le='0.25'), 1)
+        self.assertEqual(self.muestra('ecommerce_bd_pool_conexiones', alias='con_pool', estado='abiertas'), 4)
+        self.assertEqual(self.muestra('ecommerce_bd_pool_conexiones', alias='con_pool', estado='libres'), 1)
+        self.assertEqual(self.muestra('ecommerce_bd_pool_conexiones', alias='con_pool', estado='esperando'), 2)
+
+    def test_modo_de_pool_desconocido(self):
+        with mock.patch.dict(os.environ, {'DB_POOL_MODO': 'pgbouncr'}):
+            with self.assertRaisesMessage(ImproperlyConfigured, "DB_POOL_MODO='pgbouncr'"):
+                runpy.run_path(str(settings.BASE_DIR / 'ecommerce' / 'settings.py'))
+
+
+class VersionesTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_invalidar_sube_la_version_aunque_el_reloj_no_avance(self):
+        self.assertEqual(version('prueba'), 1)
+        with mock.patch('time.time', return_value=1000.0):
+            for esperada in (2, 3):
+                with self.captureOnCommitCallbacks(execute=True):
+                    invalidar('prueba', None)
+                self.assertEqual(version('prueba'), esperada)
+        self.assertEqual(clave_versionada('prueba', 'x'), 'prueba:3:x')
+
+    def test_invalidar_sin_version_previa(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar('nueva')
+        self.assertEqual(version('nueva'), 1)
+
+    def test_catalogo_usa_solo_el_etag(self):
+        categoria = Categoria.objects.create(nombre='Calzado')
+        url = f'/api/productos/publico/categorias/{categoria.id}/productos/'
+        primera = self.client.get(url)
+        self.assertNotIn('Last-Modified', primera)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag']).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Categoria.objects.filter(pk=categoria.pk).update(nombre='Botas')
+            invalidar_categorias(categoria.id)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag']).status_code, 200)
+
+
+class PaginarPorCamposTests(TestCase):
+
+    def test_empates_en_un_decimal_con_cursor(self):
+        categoria = Categoria.objects.create(nombre='Calzado')
+        Producto.objects.bulk_create(
+            Producto(categoria=categoria, nombre=f"P{i}", precio=('10.50', '7.25', '3.10')[i % 3], stock=1)
+            for i in range(10)
+        )
+        filas = Producto.objects.values('id', 'precio')
+        vistos, cursor = [], None
+        while True:
+            pagina, siguiente = paginar_por_campos(filas, ('precio', 'id'), cursor, 3, descendente=True)
+            vistos += pagina
+            if siguiente is None:
+                break
+            cursor = decodificar_cursor(siguiente)
+            self.assertIsInstance(cursor[0], str)
+        esperado = sorted(filas, key=lambda f: (-f['precio'], f['id']))
+        self.assertEqual(vistos, esperado)
+
+
+class VistaLimitada(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = [LimitePorIP]
+    throttle_scope = 'prueba'
+
+    def get(self, request):
+        return Response({})
+
+
+class Reloj:
+    """Reemplaza time.time y time.monotonic; `avanzar` mueve los dos."""
+
+    def __init__(self, ahora):
+        self.ahora = ahora
+        self.monotonico = time.monotonic()
+
+    def avanzar(self, segundos):
+        self.ahora += segundos
+        self.monotonico += segundos
+
+    def __enter__(self):
+        self.parches = [
+            mock.patch('time.time', lambda: self.ahora),
+            mock.patch('time.monotonic', lambda: self.monotonico),
+        ]
+        for parche in self.parches:
+            parche.start()
+        return self
+
+    def __exit__(self, *exc):
+        for parche in self.parches:
+            parche.stop()
+
+
+class LimiteVentanaDeslizanteTests(SimpleTestCase):
+    # 6000 es múltiplo de 60: el reloj arranca al principio de una ventana.
+    inicio = 6000.0
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.addCleanup(setattr, self.cache, '_caida_hasta', 0.0)
+        self.vista = VistaLimitada.as_view()
+        self.fabrica = APIRequestFactory()
+
+    def limitar(self, tasa):
+        parche = mock.patch.object(LimiteVentanaDeslizante, 'THROTTLE_RATES', {'prueba_ip': tasa})
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def pedir(self, ip='10.0.0.1', **cabeceras):
+        return self.vista(self.fabrica.get('/', REMOTE_ADDR=ip, **cabeceras))
+
+    def rafaga(self, n, **kwargs):
+        return [self.pedir(**kwargs).status_code for _ in range(n)]
+
+    def test_rafaga_responde_429_con_retry_after(self):
+        self.limitar('5/min')
+        with Reloj(self.inicio):
+            self.assertEqual(self.rafaga(8), [200] * 5 + [429] * 3)
+            respuesta = self.pedir()
+            self.assertEqual(respuesta['Retry-After'], '60')
+            # Otra IP tiene su propio contador.
+            self.assertEqual(self.pedir(ip='10.0.0.2').status_code, 200)
+
+    def test_la_ventana_anterior_pesa_segun_lo_que_queda_de_ella(self):
+        self.limitar('10/min')
+        with Reloj(self.inicio) as reloj:
+            self.assertEqual(self.rafaga(11), [200] * 10 + [429])
+            # A mitad de la ventana siguiente, la anterior cuenta 10 * 0.5.
+            reloj.avanzar(90)
+            self.assertEqual(self.rafaga(6), [200] * 5 + [429])
+            # 5 + 10 * (1 - 36/60) = 9 deja sitio en 6 segundos.
+            self.assertEqual(self.pedir()['Retry-After'], '6')
+            reloj.avanzar(6)
+            self.assertEqual(self.pedir().status_code, 200)
+
+    def test_x_forwarded_for_no_cambia_la_identidad(self):
+        # Con NUM_PROXIES=0 la IP es REMOTE_ADDR, invente lo que invente el cliente.
+        self.limitar('3/min')
+        with Reloj(self.inicio):
+            codigos = [
+                self.pedir(HTTP_X_FORWARDED_FOR=f"203.0.113.{i}").status_code for i in range(5)
+            ]
+        self.assertEqual(codigos, [200] * 3 + [429] * 2)
+
+    def test_sin_compartida_los_contadores_duran_la_ventana(self):
+        self.limitar('5/min')
+        caida = mock.patch.object(
+            CacheDosNiveles, 'compartido', new_callable=mock.PropertyMock, side_effect=ConnectionError,
+        )
+        with Reloj(self.inicio) as reloj, caida:
+            self.assertEqual(self.rafaga(5), [200] * 5)
+            # Pasado LOCAL_TTL el contador local sigue ahí: no se reinicia cada 5 s.
+            reloj.avanzar(20)
+            self.assertEqual(self.pedir().status_code, 429)
+            # Al final de la ventana siguiente la anterior ya casi no pesa.
+            reloj.avanzar(99)
+            self.assertEqual(self.pedir().status_code, 200)
+
+    def test_costo_por_comprobacion_no_depende_del_limite(self):
+        operaciones = {}
+        for tasa in ('5/min', '1000/min'):
+            self.cache.clear()
+            self.limitar(tasa)
+            with mock.patch.object(self.cache, 'get', wraps=self.cache.get) as get, \
+                    mock.patch.object(self.cache, 'add', wraps=self.cache.add) as add, \
+                    mock.patch.object(self.cache, 'incr', wraps=self.cache.incr) as incr, \
+                    Reloj(self.inicio):
+                inicio = time.perf_counter()
+                self.rafaga(500)
+                duracion = time.perf_counter() - inicio
+            # incr también cubre los decr de las rechazadas.
+            operaciones[tasa] = get.call_count + add.call_count + incr.call_count
+            self.assertLessEqual(operaciones[tasa], 4 * 500)
+            self.assertLess(duracion, 5)
+        self.assertLessEqual(abs(operaciones['5/min'] - operaciones['1000/min']), 500)
+
+
+class PerfilMemoriaTests(SimpleTestCase):
+
+    def setUp(self):
+        if tracemalloc.is_tracing():
+            self.skipTest("tracemalloc ya estaba activo")
+
+    def sesion(self):
+        return perfiles.Sesion(perfiles.MUESTREO, memoria=True, hilos=set())
+
+    def test_sesiones_superpuestas_comparten_tracemalloc(self):
+        primera, segunda = self.sesion(), self.sesion()
+        primera.iniciar()
+        segunda.iniciar()
+        primera.terminar()
+        # La primera en terminar no apaga el trazado de la otra.
+        self.assertTrue(tracemalloc.is_tracing())
+        datos = [bytearray(1000) for _ in range(100)]
+        segunda.terminar()
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertIn('Total:', perfiles._diferencia_memoria(segunda.antes, segunda.despues))
+        del datos
+
+    def test_no_apaga_un_trazado_ajeno(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        sesion = self.sesion()
+        sesion.iniciar()
+        sesion.terminar()
+        self.assertTrue(tracemalloc.is_tracing())
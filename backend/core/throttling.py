@@ -0,0 +1,119 @@
+"""
+Límites de peticiones para DRF con ventana deslizante aproximada.
+
+Cada límite usa dos contadores por identidad (ventana actual y anterior) en
+la caché por defecto: la estimación es `anterior * peso + actual`, donde el
+peso es la fracción de la ventana anterior que todavía cae dentro de los
+últimos N segundos. Son como mucho cuatro operaciones de caché por
+comprobación, sin importar el límite, y `incr` es atómico en Redis.
+
+Si la compartida se cae, CacheDosNiveles cuenta en la memoria de cada
+proceso, con la misma ventana: el límite efectivo pasa a ser N por ventana
+*por worker* (y vuelve a empezar de cero) hasta que la compartida vuelve.
+Se prefiere eso a rechazar todos los logins mientras Redis no responde.
+
+Las vistas eligen las identidades con `throttle_classes` y el nombre con
+`throttle_scope`; la tasa se busca en DEFAULT_THROTTLE_RATES como
+`<scope>_<sufijo>` (p. ej. "login_ip"). Una tasa None desactiva el límite.
+"""
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+
+class LimiteVentanaDeslizante(SimpleRateThrottle):
+    sufijo = None
+
+    def __init__(self):
+        # La tasa depende de la vista; se resuelve en allow_request.
+        pass
+
+    def identificador(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        alcance = getattr(view, 'throttle_scope', None)
+        if not alcance:
+            return True
+        self.scope = f"{alcance}_{self.sufijo}"
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+
+        ident = self.identificador(request, view)
+        if ident is None:
+            return True
+
+        ahora = time.time()
+        numero = int(ahora // self.duration)
+        self.transcurrido = ahora - numero * self.duration
+        base = f"limite:{self.scope}:{ident}"
+        actual = f"{base}:{numero}"
+
+        self.anterior = cache.get(f"{base}:{numero - 1}", 0)
+        cache.add(actual, 0, self.duration * 2)
+        try:
+            self.actual = cache.incr(actual)
+        except ValueError:
+            # Expiró (o se perdió con la compartida) entre add e incr.
+            if cache.add(actual, 1, self.duration * 2):
+                self.actual = 1
+            else:
+                self.actual = cache.incr(actual)
+
+        peso = 1 - self.transcurrido / self.duration
+        if self.anterior * peso + self.actual <= self.num_requests:
+            return True
+
+        # Las peticiones rechazadas no cuentan.
+        try:
+            self.actual = cache.decr(actual)
+        except ValueError:
+            self.actual = 0
+        logger.info("Límite %s superado para %s", self.scope, ident)
+        return False
+
+    def wait(self):
+        restante = self.duration - self.transcurrido
+        libres = self.num_requests - self.actual - 1
+        if libres < 0 or not self.anterior:
+            # Hay que esperar a la próxima ventana.
+            return max(restante, 1)
+        # Momento en que el peso de la ventana anterior deja sitio a una más.
+        liberado = self.duration * (1 - libres / self.anterior)
+        return max(liberado - self.transcurrido, 1)
+
+
+class LimitePorIP(LimiteVentanaDeslizante):
+    sufijo = 'ip'
+
+    def identificador(self, request, view):
+        return self.get_ident(request)
+
+
+class LimitePorEmail(LimiteVentanaDeslizante):
+    """Por el campo `email` del cuerpo; sin email no limita (lo cubre el de IP)."""
+    sufijo = 'email'
+
+    def identificador(self, request, view):
+        datos = request.data
+        email = datos.get('email') if hasattr(datos, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        # Hash para acotar la clave y no guardar correos en la caché.
+        return hashlib.md5(email.strip().lower().encode()).hexdigest()
+
+
+class LimitePorUsuario(LimiteVentanaDeslizante):
+    sufijo = 'usuario'
+
+    def identificador(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
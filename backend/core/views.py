@@ -0,0 +1,44 @@
+import hmac
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core import metricas, perfiles
+from usuarios.authentication import JWTSinConsultaAuthentication
+from usuarios.permissions import EsAdmin
+
+
+@require_GET
+def metricas_prometheus(request):
+    # Prometheus manda "Authorization: Bearer <METRICAS_TOKEN>". Sin token
+    # configurado el endpoint solo existe con DEBUG.
+    if not settings.METRICAS_TOKEN:
+        if not settings.DEBUG:
+            raise Http404
+    else:
+        esperado = f"Bearer {settings.METRICAS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), esperado):
+            return HttpResponse(status=401)
+    cuerpo, content_type = metricas.exportar()
+    return HttpResponse(cuerpo, content_type=content_type)
+
+
+@api_view(['GET'])
+@authentication_classes([JWTSinConsultaAuthentication])
+@permission_classes([IsAuthenticated, EsAdmin])
+def perfiles_admin(request):
+    return Response({'perfiles': perfiles.listar()})
+
+
+@api_view(['GET'])
+@authentication_classes([JWTSinConsultaAuthentication])
+@permission_classes([IsAuthenticated, EsAdmin])
+def descargar_perfil(request, perfil_id, formato):
+    ruta = perfiles.ruta_artefacto(perfil_id, formato)
+    if ruta is None:
+        return Response({'error': 'Perfil no encontrado'}, status=404)
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=ruta.rsplit('/', 1)[-1])
@@ -13,7 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
-from decouple import config
+from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 
 
 
@@ -28,9 +29,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = config('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = config('DEBUG', default=True, cast=bool)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='', cast=Csv())
 
 
 # Application definition
@@ -42,14 +43,18 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'usuarios',
     'productos',
     'carrito',
     'core',
+    'analitica',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricasMiddleware',
+    'core.middleware.PerfilMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,20 +89,104 @@ WSGI_APPLICATION = 'ecommerce.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.postgresql',
         'NAME': 'ecommerce',      
         'USER': 'django',
         'PASSWORD': 'django123',
-        'HOST': 'db',  
-        'PORT': '5432',
+        'HOST': config('DB_HOST', default='db'),  
+        'PORT': config('DB_PORT', default='5432'),
     }
 }
 
+# Conexiones a la base de datos (DB_POOL_MODO):
+# - ninguno: una conexión nueva por petición.
+# - persistente: cada hilo reutiliza su conexión hasta DB_CONN_MAX_AGE segundos.
+# - pool: pool de psycopg 3 por proceso (DB_POOL_MIN/DB_POOL_MAX/DB_POOL_TIMEOUT).
+# - pgbouncer: conexiones persistentes contra PgBouncer en modo transacción.
+DB_POOL_MODO = config('DB_POOL_MODO', default='persistente')
+
+if DB_POOL_MODO not in ('ninguno', 'persistente', 'pool', 'pgbouncer'):
+    raise ImproperlyConfigured(
+        f"DB_POOL_MODO={DB_POOL_MODO!r} no es válido: ninguno, persistente, pool o pgbouncer."
+    )
+if DB_POOL_MODO == 'persistente':
+    DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif DB_POOL_MODO == 'pool':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': config('DB_POOL_MIN', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX', default=config('GUNICORN_THREADS', default=4, cast=int), cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+        },
+    }
+elif DB_POOL_MODO == 'pgbouncer':
+    DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    # En modo transacción los cursores con nombre no sobreviven entre transacciones.
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+
+
+# Cache
+# Dos niveles: LRU en memoria del proceso delante de una caché compartida
+# (Redis si hay REDIS_URL, si no LocMemCache). Ver core/cache.py.
+
+REDIS_URL = config('REDIS_URL', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.CacheDosNiveles',
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {
+            'COMPARTIDO': 'compartido',
+            'LOCAL_TTL': config('CACHE_LOCAL_TTL', default=5, cast=int),
+            'LOCAL_MAX_ENTRADAS': config('CACHE_LOCAL_MAX_ENTRADAS', default=1000, cast=int),
+            'LOCAL_MAX_BYTES': config('CACHE_LOCAL_MAX_BYTES', default=16 * 1024 * 1024, cast=int),
+        },
+    },
+    'compartido': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'ecommerce',
+        'OPTIONS': {
+            'socket_connect_timeout': 0.5,
+            'socket_timeout': 0.5,
+        },
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'compartido',
+    },
+}
 
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# Hash de contraseñas: argon2 | scrypt | pbkdf2. Los otros quedan para verificar
+# hashes existentes, que se regeneran con el elegido al iniciar sesión.
+HASH_ALGORITMO = config('HASH_ALGORITMO', default='argon2')
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=19456, cast=int)  # KiB
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=1, cast=int)
+SCRYPT_WORK_FACTOR = config('SCRYPT_WORK_FACTOR', default=2 ** 14, cast=int)
+SCRYPT_BLOCK_SIZE = config('SCRYPT_BLOCK_SIZE', default=8, cast=int)
+SCRYPT_PARALLELISM = config('SCRYPT_PARALLELISM', default=1, cast=int)
+
+_HASHERS = {
+    'argon2': 'usuarios.hashers.Argon2Ajustado',
+    'scrypt': 'usuarios.hashers.ScryptAjustado',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_HASHERS[HASH_ALGORITMO]] + [
+    ruta for nombre, ruta in _HASHERS.items() if nombre != HASH_ALGORITMO
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+# Hilos por proceso para hashear (0 = en el hilo de la petición). Con varios
+# workers de gunicorn, 1 por proceso ya reparte los hashes entre los núcleos.
+HASH_HILOS = config('HASH_HILOS', default=1, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -115,10 +204,39 @@ AUTH_PASSWORD_VALIDATORS = [
 
 
 
+# False vuelve al JSONRenderer/JSONParser de DRF (manage.py medir_json compara ambos).
+JSON_ORJSON = config('JSON_ORJSON', default=True, cast=bool)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # JSON con orjson (core.renderers, core.parsers): mismos bytes que los de DRF.
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.OrjsonRenderer' if JSON_ORJSON else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.OrjsonParser' if JSON_ORJSON else 'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Tasas de core.throttling: "<throttle_scope>_<ip|email|usuario>". None desactiva.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': config('LIMITE_LOGIN_IP', default='30/min'),
+        'login_email': config('LIMITE_LOGIN_EMAIL', default='10/min'),
+        'registro_ip': config('LIMITE_REGISTRO_IP', default='10/hour'),
+        'registro_email': config('LIMITE_REGISTRO_EMAIL', default='3/hour'),
+        'verificacion_ip': config('LIMITE_VERIFICACION_IP', default='20/min'),
+        'verificacion_email': config('LIMITE_VERIFICACION_EMAIL', default='5/min'),
+        'perfil_usuario': config('LIMITE_PERFIL_USUARIO', default='10/min'),
+        # Perfilados a pedido (core.perfiles), sumando todos los admins.
+        'perfil_global': config('LIMITE_PERFIL_GLOBAL', default='10/min'),
+    },
+    # Proxies de confianza delante de gunicorn. Con 0 los límites por IP usan
+    # REMOTE_ADDR e ignoran X-Forwarded-For, que el cliente puede inventar;
+    # subirlo solo detrás de un proxy conocido que agregue su propia entrada.
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 # configuracion del JWT
@@ -128,6 +246,31 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
 }
 
+# Códigos de verificación (usuarios.codigos): 'bd' o 'cache'.
+CODIGOS_ALMACEN = config('CODIGOS_ALMACEN', default='bd')
+CODIGOS_CACHE = config('CODIGOS_CACHE', default='compartido')
+
+if CODIGOS_ALMACEN not in ('bd', 'cache'):
+    raise ImproperlyConfigured(f"CODIGOS_ALMACEN={CODIGOS_ALMACEN!r} no es válido: bd o cache.")
+# Con una caché por proceso (LocMemCache sin REDIS_URL, o el nivel local de
+# CacheDosNiveles) cada worker tendría sus propios códigos e intentos.
+if CODIGOS_ALMACEN == 'cache' and CACHES.get(CODIGOS_CACHE, {}).get('BACKEND', 'no definida') in (
+    'no definida',
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+    'core.cache.CacheDosNiveles',
+):
+    raise ImproperlyConfigured(
+        f"CODIGOS_ALMACEN='cache' necesita que CODIGOS_CACHE={CODIGOS_CACHE!r} sea una caché "
+        "compartida entre workers (p. ej. definir REDIS_URL)."
+    )
+CODIGOS_MAX_INTENTOS = config('CODIGOS_MAX_INTENTOS', default=5, cast=int)
+CODIGOS_PURGA_LOTE = config('CODIGOS_PURGA_LOTE', default=1000, cast=int)
+
+# Segundos que se cachea el estado (activo/rol) del usuario en JWTSinConsultaAuthentication.
+# 0 = confiar solo en los claims del token hasta que expire.
+JWT_ESTADO_TTL = config('JWT_ESTADO_TTL', default=60, cast=int)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -161,6 +304,8 @@ EMAIL_USE_SSL = config('EMAIL_USE_SSL', default=False, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
+# segundos por operación SMTP; sin esto un servidor colgado frena al worker de correos
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
 
 
 
@@ -172,4 +317,61 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
 
 ADMIN_EMAIL = config('ADMIN_EMAIL', default=EMAIL_HOST_USER)
 ADMIN_USERNAME = config('ADMIN_USERNAME', default='admin')
-ADMIN_PASSWORD = config('ADMIN_PASSWORD', default='admin123')
\ No newline at end of file
+ADMIN_PASSWORD = config('ADMIN_PASSWORD', default='admin123')
+
+# cola de correos salientes (outbox), drenada por `manage.py procesar_correos`
+OUTBOX_LOTE = config('OUTBOX_LOTE', default=50, cast=int)
+OUTBOX_MAX_INTENTOS = config('OUTBOX_MAX_INTENTOS', default=5, cast=int)
+OUTBOX_BACKOFF_SEGUNDOS = config('OUTBOX_BACKOFF_SEGUNDOS', default=30, cast=int)
+OUTBOX_BACKOFF_MAX_SEGUNDOS = config('OUTBOX_BACKOFF_MAX_SEGUNDOS', default=3600, cast=int)
+# un lote se deja de enviar pasados OUTBOX_LOTE_SEGUNDOS; sus filas quedan reclamadas
+# OUTBOX_RECLAMO_SEGUNDOS (debe sobrar: lote + EMAIL_TIMEOUT) por si el worker muere
+OUTBOX_LOTE_SEGUNDOS = config('OUTBOX_LOTE_SEGUNDOS', default=60, cast=int)
+OUTBOX_RECLAMO_SEGUNDOS = config('OUTBOX_RECLAMO_SEGUNDOS', default=300, cast=int)
+
+# resumen de alertas de stock bajo: como mucho un correo por ventana
+ALERTAS_STOCK_VENTANA_MINUTOS = config('ALERTAS_STOCK_VENTANA_MINUTOS', default=15, cast=int)
+
+# reporte de inventario: tamaño de bloque del cursor y adjunto comprimido
+INVENTARIO_CHUNK = config('INVENTARIO_CHUNK', default=2000, cast=int)
+INVENTARIO_ADJUNTAR_GZIP = config('INVENTARIO_ADJUNTAR_GZIP', default=True, cast=bool)
+INVENTARIO_MAX_MEMORIA = config('INVENTARIO_MAX_MEMORIA', default=5 * 1024 * 1024, cast=int)
+
+# paginación keyset (cursor) de los listados
+PAGINA_TAMANO = config('PAGINA_TAMANO', default=50, cast=int)
+PAGINA_TAMANO_MAX = config('PAGINA_TAMANO_MAX', default=200, cast=int)
+
+# caché del catálogo público por categoría
+CATALOGO_CACHE_SEGUNDOS = config('CATALOGO_CACHE_SEGUNDOS', default=300, cast=int)
+CATALOGO_MAX_AGE = config('CATALOGO_MAX_AGE', default=0, cast=int)
+
+# importación masiva de productos (import_productos / admin/productos/importar/)
+IMPORTACION_LOTE = config('IMPORTACION_LOTE', default=1000, cast=int)
+IMPORTACION_MAX_ERRORES = config('IMPORTACION_MAX_ERRORES', default=100, cast=int)
+
+# reservas de stock de los carritos (carrito.reservas, manage.py liberar_reservas)
+RESERVA_MINUTOS = config('RESERVA_MINUTOS', default=15, cast=int)
+RESERVA_LIBERAR_LOTE = config('RESERVA_LIBERAR_LOTE', default=500, cast=int)
+
+# máximo de líneas en POST /api/carrito/carrito/lote/
+CARRITO_LOTE_MAX = config('CARRITO_LOTE_MAX', default=100, cast=int)
+
+# resúmenes de ventas (manage.py agregar_ventas)
+ANALITICA_LOTE = config('ANALITICA_LOTE', default=5000, cast=int)
+ANALITICA_MARGEN_SEGUNDOS = config('ANALITICA_MARGEN_SEGUNDOS', default=60, cast=int)
+
+# Con SERVIDOR_MODO=asgi (gunicorn.conf.py) el catálogo público y el GET del
+# carrito usan sus vistas async.
+SERVIDOR_MODO = config('SERVIDOR_MODO', default='wsgi')
+VISTAS_ASYNC = config('VISTAS_ASYNC', default=SERVIDOR_MODO == 'asgi', cast=bool)
+
+# GET /metrics (core.metricas). Prometheus manda "Authorization: Bearer <token>";
+# vacío deja el endpoint abierto solo con DEBUG y responde 404 en producción.
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+
+# Perfilado a pedido de admins (core.perfiles, X-Perfil); el límite es 'perfil_global'.
+PERFIL_DIR = config('PERFIL_DIR', default='/tmp/ecommerce-perfiles')
+PERFIL_MAX = config('PERFIL_MAX', default=100, cast=int)  # perfiles guardados
+PERFIL_INTERVALO_MS = config('PERFIL_INTERVALO_MS', default=5, cast=float)
+PERFIL_MEMORIA_FRAMES = config('PERFIL_MEMORIA_FRAMES', default=1, cast=int)
+PERFIL_RESUMEN_FILAS = config('PERFIL_RESUMEN_FILAS', default=40, cast=int)
@@ -1,10 +1,15 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import descargar_perfil, metricas_prometheus, perfiles_admin
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/usuarios/', include('usuarios.urls')),
     path('api/productos/', include('productos.urls')),
     path('api/carrito/', include('carrito.urls')),
-    
+    path('api/analitica/', include('analitica.urls')),
+    path('metrics', metricas_prometheus, name='metricas'),
+    path('api/perfiles/', perfiles_admin, name='perfiles_admin'),
+    path('api/perfiles/<str:perfil_id>/<str:formato>/', descargar_perfil, name='descargar_perfil'),
 ]
@@ -0,0 +1,87 @@
+"""
+Configuración de gunicorn para producción.
+
+    gunicorn -c backend/gunicorn.conf.py
+
+SERVIDOR_MODO=wsgi (por defecto): workers gthread sobre ecommerce.wsgi.
+SERVIDOR_MODO=asgi: workers de uvicorn sobre ecommerce.asgi.
+
+La app se precarga en el master (preload_app) y los workers la comparten
+por copy-on-write. Por eso `kill -HUP` solo recicla workers con el mismo
+código; para desplegar código nuevo sin cortar conexiones:
+`kill -USR2 <master>` (arranca un master nuevo) y luego
+`kill -WINCH` + `kill -QUIT` sobre el master viejo.
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+from pathlib import Path
+
+
+def _entero(nombre, defecto):
+    return int(os.environ.get(nombre, defecto))
+
+
+# Métricas de Prometheus (core.metricas) sumadas entre workers. La variable y
+# el directorio tienen que existir antes de que la app precargada importe
+# prometheus_client; los archivos de una ejecución anterior sumarían
+# contadores viejos, así que se vacía al arrancar.
+metricas_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    '/dev/shm/ecommerce-metricas' if os.path.isdir('/dev/shm') else '/tmp/ecommerce-metricas',
+)
+shutil.rmtree(metricas_dir, ignore_errors=True)
+os.makedirs(metricas_dir, exist_ok=True)
+
+modo = os.environ.get('SERVIDOR_MODO', 'wsgi')
+nucleos = multiprocessing.cpu_count()
+
+chdir = str(Path(__file__).resolve().parent)
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+if modo == 'asgi':
+    # Un event loop por worker: un proceso por núcleo basta.
+    wsgi_app = 'ecommerce.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    workers = _entero('WEB_CONCURRENCY', nucleos + 1)
+    threads = 1
+else:
+    # Las vistas esperan sobre todo a Postgres/Redis: varios hilos por worker.
+    wsgi_app = 'ecommerce.wsgi:application'
+    worker_class = 'gthread'
+    workers = _entero('WEB_CONCURRENCY', nucleos * 2 + 1)
+    threads = _entero('GUNICORN_THREADS', 4)
+
+preload_app = True
+keepalive = _entero('GUNICORN_KEEPALIVE', 5)
+timeout = _entero('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _entero('GUNICORN_GRACEFUL_TIMEOUT', 30)
+# Reciclar workers de vez en cuando acota cualquier fuga de memoria.
+max_requests = _entero('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = _entero('GUNICORN_MAX_REQUESTS_JITTER', 200)
+
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    # Congela los objetos de la app precargada: el GC no los vuelve a tocar
+    # y las páginas compartidas con los workers no se copian.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Cada worker abre sus propias conexiones; nunca hereda las del master.
+    from django.db import connections
+    connections.close_all()
+
+
+def child_exit(server, worker):
+    # Saca al worker muerto del gauge de peticiones en curso.
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.outbox import encolar_correo
+from .models import AlertaStock, STOCK_OK, estado_stock
+
+
+def registrar_transiciones(cambios):
+    """
+    Registra alertas para los productos que acaban de pasar a CASI AGOTADO
+    o AGOTADO. `cambios` es un iterable de (producto, stock_anterior) con
+    `producto.stock` ya actualizado; solo se miran los productos tocados,
+    así que el costo no depende del tamaño del catálogo.
+    """
+    alertas = []
+    for producto, stock_anterior in cambios:
+        nuevo = estado_stock(producto.stock)
+        if nuevo != STOCK_OK and nuevo != estado_stock(stock_anterior):
+            alertas.append(AlertaStock(producto=producto, estado=nuevo, stock=producto.stock))
+    if alertas:
+        AlertaStock.objects.bulk_create(alertas)
+    return alertas
+
+
+def despachar_resumen(ahora=None):
+    """
+    Encola un único correo con las alertas pendientes, como mucho una vez
+    por ventana (ALERTAS_STOCK_VENTANA_MINUTOS). Devuelve cuántas alertas
+    se incluyeron.
+    """
+    ahora = ahora or timezone.now()
+    ventana = timedelta(minutes=settings.ALERTAS_STOCK_VENTANA_MINUTOS)
+
+    with transaction.atomic():
+        ultimo_envio = (
+            AlertaStock.objects.filter(notificada_en__isnull=False)
+            .order_by('-notificada_en')
+            .values_list('notificada_en', flat=True)
+            .first()
+        )
+        if ultimo_envio and ahora - ultimo_envio < ventana:
+            return 0
+
+        pendientes = list(
+            AlertaStock.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('producto__categoria')
+            .filter(notificada_en__isnull=True)
+            .order_by('creado_en')
+        )
+        if not pendientes:
+            return 0
+
+        # Una línea por producto con su estado actual; los ya repuestos se omiten.
+        productos = {alerta.producto_id: alerta.producto for alerta in pendientes}
+        lineas = [
+            f"- {producto.nombre} ({producto.categoria.nombre}): "
+            f"stock {producto.stock} -> {estado_stock(producto.stock)}"
+            for producto in productos.values()
+            if estado_stock(producto.stock) != STOCK_OK
+        ]
+        if lineas:
+            encolar_correo(
+                asunto="📦 Productos con stock bajo",
+                cuerpo=(
+                    "📦 Productos que pasaron a CASI AGOTADO o AGOTADO desde el último resumen:\n\n"
+                    + "\n".join(lineas)
+                ),
+                destinatarios=[settings.ADMIN_EMAIL],
+            )
+        AlertaStock.objects.filter(id__in=[alerta.id for alerta in pendientes]).update(notificada_en=ahora)
+    return len(pendientes)
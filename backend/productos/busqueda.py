@@ -0,0 +1,69 @@
+"""
+Búsqueda pública del catálogo.
+
+En PostgreSQL combina dos índices GIN sobre Producto: la columna generada
+`busqueda` (tsvector del nombre, con stemming en español) y los trigramas
+de `nombre`, que encuentran palabras mal escritas ("zapatila"). Las
+coincidencias se ordenan por relevancia (ts_rank + word_similarity,
+redondeada a RELEVANCIA) con paginación keyset sobre (relevancia, id).
+
+En SQLite no hay ninguna de las dos cosas: cada palabra se busca con
+LIKE y el orden es por id. Alcanza para desarrollo y pruebas, no para
+producción.
+"""
+from decimal import Decimal
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import DecimalField, F, Q
+from django.db.models.functions import Cast
+
+from core.paginacion import paginar_por_campos, paginar_por_id
+from .models import CONFIG_BUSQUEDA, Producto
+from .serializers import productos_lectura
+
+# ts_rank y word_similarity son real (float4): un float que va y vuelve por
+# el cursor JSON llega como double y ya no es igual, así que el desempate por
+# id fallaba y se perdían o repetían productos con la misma relevancia. Como
+# numeric de escala fija el valor del cursor es exacto en los dos sentidos.
+RELEVANCIA = DecimalField(max_digits=12, decimal_places=6)
+
+
+def buscar(filtros, cursor, limite):
+    """
+    Devuelve (filas, cursor_siguiente) para los filtros de
+    FiltroBusquedaSerializer; las filas son de productos_lectura.
+    """
+    productos = Producto.objects.all()
+    if 'categoria' in filtros:
+        productos = productos.filter(categoria_id=filtros['categoria'])
+    if 'precio_min' in filtros:
+        productos = productos.filter(precio__gte=filtros['precio_min'])
+    if 'precio_max' in filtros:
+        productos = productos.filter(precio__lte=filtros['precio_max'])
+    if filtros.get('en_stock'):
+        productos = productos.filter(stock__gt=F('reservado'))
+
+    texto = filtros['q']
+    if connection.vendor != 'postgresql':
+        for palabra in texto.split():
+            productos = productos.filter(nombre__icontains=palabra)
+        return paginar_por_id(productos_lectura.valores(productos), cursor, limite)
+
+    consulta = SearchQuery(texto, config=CONFIG_BUSQUEDA, search_type='websearch')
+    productos = productos.filter(
+        Q(busqueda=consulta) | Q(nombre__trigram_word_similar=texto)
+    ).annotate(
+        relevancia=Cast(SearchRank(F('busqueda'), consulta) + TrigramWordSimilarity(texto, 'nombre'), RELEVANCIA),
+    ).values(*productos_lectura.columnas, 'relevancia')
+    return paginar_por_campos(productos, ('relevancia', 'id'), _cursor_relevancia(cursor), limite, descendente=True)
+
+
+def _cursor_relevancia(cursor):
+    if cursor is None:
+        return None
+    try:
+        relevancia, producto_id = cursor
+        return [Decimal(str(relevancia)), int(producto_id)]
+    except (ArithmeticError, TypeError, ValueError):
+        raise ValueError("Cursor inválido.")
@@ -0,0 +1,96 @@
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from core.cache import aversion, invalidar, version
+from .models import Producto
+from .serializers import disponible
+
+
+def _nombre(categoria_id):
+    return f"catalogo:{categoria_id}"
+
+
+def version_categoria(categoria_id):
+    """
+    Versión del catálogo de una categoría: contador de cambios (ver
+    core.cache.version). Entra en la clave de caché y en el ETag.
+    """
+    return version(_nombre(categoria_id))
+
+
+async def aversion_categoria(categoria_id):
+    return await aversion(_nombre(categoria_id))
+
+
+# Las búsquedas abarcan todas las categorías: cualquier cambio del catálogo las invalida.
+BUSQUEDA = 'catalogo:busqueda'
+
+
+def invalidar_categorias(*categoria_ids):
+    invalidar(BUSQUEDA, *(_nombre(c) for c in categoria_ids if c is not None))
+
+
+def clave_pagina(categoria_id, version, cursor, limite):
+    return f"catalogo:pagina:{categoria_id}:{version}:{cursor}:{limite}"
+
+
+def etag_pagina(categoria_id, version, cursor, limite, productos):
+    # El disponible no está en la versión (cambia con cada reserva): entra aparte.
+    disponibles = ",".join(str(p['disponible']) for p in productos)
+    firma = hashlib.md5(f"{categoria_id}:{version}:{cursor}:{limite}:{disponibles}".encode()).hexdigest()
+    return quote_etag(firma)
+
+
+# `disponible` (stock - reservado) cambia con cada alta o baja en un carrito.
+# Las páginas del catálogo y de la búsqueda se guardan sin él y se completa
+# al responder con una consulta por clave primaria; así las reservas no
+# invalidan la caché.
+
+def sin_disponible(datos):
+    """Página lista para guardar en la caché, con `disponible` vacío."""
+    for producto in datos['productos']:
+        producto['disponible'] = None
+    return datos
+
+
+def completar_disponible(datos):
+    stocks = {}
+    if datos['productos']:
+        stocks = {fila[0]: fila[1:] for fila in _consulta_stocks(datos)}
+    return _completar(datos, stocks)
+
+
+async def acompletar_disponible(datos):
+    stocks = {}
+    if datos['productos']:
+        stocks = {fila[0]: fila[1:] async for fila in _consulta_stocks(datos)}
+    return _completar(datos, stocks)
+
+
+def _consulta_stocks(datos):
+    ids = [producto['id'] for producto in datos['productos']]
+    return Producto.objects.filter(id__in=ids).values_list('id', 'stock', 'reservado')
+
+
+def _completar(datos, stocks):
+    # Copia: `datos` puede ser el mismo objeto que quedó en la caché local.
+    productos = []
+    for producto in datos['productos']:
+        stock, reservado = stocks.get(producto['id'], (0, 0))
+        productos.append({**producto, 'disponible': disponible(stock, reservado)})
+    return {**datos, 'productos': productos}
+
+
+def respuesta_condicional(request, etag):
+    """Devuelve un 304 si el cliente ya tiene esta versión, o None."""
+    # Sin Last-Modified: la versión es un contador, no una fecha; vale el ETag.
+    return get_conditional_response(request, etag=etag)
+
+
+def marcar_respuesta(response, etag):
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.CATALOGO_MAX_AGE)
+    return response
@@ -0,0 +1,39 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.importacion import detectar_formato, importar_productos, leer_filas
+
+
+class Command(BaseCommand):
+    help = "Importa (crea o actualiza por sku) productos desde un archivo CSV o NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta', help="Archivo con columnas sku, nombre, precio, stock, categoria.")
+        parser.add_argument('--formato', choices=['csv', 'ndjson'],
+                            help="Por defecto se deduce de la extensión.")
+        parser.add_argument('--lote', type=int, default=settings.IMPORTACION_LOTE,
+                            help="Filas por lote (una transacción por lote).")
+
+    def handle(self, *args, **options):
+        try:
+            formato = detectar_formato(options['ruta'], options['formato'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        def progreso(resultado):
+            self.stdout.write(
+                f"{resultado['procesadas']} filas, {resultado['filas_por_segundo']} filas/s"
+            )
+
+        with open(options['ruta'], 'rb') as archivo:
+            resultado = importar_productos(leer_filas(archivo, formato), options['lote'], progreso)
+
+        for error in resultado['errores']:
+            self.stderr.write(f"Fila {error['fila']}: {json.dumps(error['errores'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['importadas']} productos importados de {resultado['procesadas']} filas "
+            f"({resultado['con_errores']} con errores) en {resultado['segundos']}s "
+            f"({resultado['filas_por_segundo']} filas/s)"
+        ))
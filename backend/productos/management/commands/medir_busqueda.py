@@ -0,0 +1,82 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from productos.busqueda import buscar
+from productos.cache import invalidar_categorias
+from productos.models import Categoria, Producto
+
+TIPOS = ['Zapatilla', 'Remera', 'Campera', 'Pantalón', 'Mochila', 'Gorra', 'Buzo', 'Media', 'Bermuda', 'Bolso']
+MODELOS = ['running', 'urbana', 'trekking', 'clásica', 'deportiva', 'térmica', 'liviana', 'impermeable']
+COLORES = ['azul', 'negra', 'blanca', 'roja', 'verde', 'gris', 'amarilla', 'violeta']
+
+# Frecuentes, raras, con errores de tipeo y sin resultados.
+CONSULTAS = 'zapatilla,campera impermeable roja,mochila trekking gris 42,zapatila runing,remra,xyzzy'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de la búsqueda pública (sin caché) con consultas "
+        "frecuentes, raras y con errores de tipeo. Con --sembrar crea antes "
+        "productos de prueba (p. ej. 1.000.000). No sembrar en producción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sembrar', type=int, default=0,
+                            help="Productos de prueba a crear antes de medir.")
+        parser.add_argument('--lote', type=int, default=10_000)
+        parser.add_argument('--consultas', default=CONSULTAS,
+                            help="Textos a buscar, separados por comas.")
+        parser.add_argument('--repeticiones', type=int, default=50)
+        parser.add_argument('--limite', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['sembrar']:
+            self._sembrar(options['sembrar'], options['lote'])
+
+        self.stdout.write(f"{Producto.objects.count()} productos ({connection.vendor})")
+        self.stdout.write(f"{'consulta':<40} {'filas':>6} {'p50 ms':>8} {'p95 ms':>8} {'máx ms':>8}")
+        for texto in [t.strip() for t in options['consultas'].split(',') if t.strip()]:
+            for filtros in ({'q': texto}, {'q': texto, 'en_stock': True}):
+                tiempos = []
+                for _ in range(options['repeticiones']):
+                    inicio = time.perf_counter()
+                    filas, _siguiente = buscar(filtros, None, options['limite'])
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                tiempos.sort()
+                nombre = texto + (' [en_stock]' if filtros.get('en_stock') else '')
+                self.stdout.write(
+                    f"{nombre:<40} {len(filas):>6} {statistics.median(tiempos):>8.1f} "
+                    f"{tiempos[int(len(tiempos) * 0.95) - 1]:>8.1f} {tiempos[-1]:>8.1f}"
+                )
+
+    def _sembrar(self, cantidad, lote):
+        categorias = [Categoria.objects.get_or_create(nombre=f"carga-{tipo}")[0] for tipo in TIPOS]
+        inicial = Producto.objects.filter(sku__startswith='carga-').count()
+        azar = random.Random(inicial)
+        inicio = time.perf_counter()
+        creados = 0
+        while creados < cantidad:
+            tamano = min(lote, cantidad - creados)
+            productos = []
+            for n in range(inicial + creados, inicial + creados + tamano):
+                tipo = azar.randrange(len(TIPOS))
+                productos.append(Producto(
+                    sku=f"carga-{n}",
+                    nombre=f"{TIPOS[tipo]} {azar.choice(MODELOS)} {azar.choice(COLORES)} {azar.randint(1, 999)}",
+                    precio=azar.randint(100, 100_000) / 100,
+                    stock=azar.choice([0, 0, 1, 5, 20, 100]),
+                    categoria=categorias[tipo],
+                ))
+            Producto.objects.bulk_create(productos, batch_size=tamano)
+            creados += tamano
+            self.stdout.write(f"{creados} productos ({creados / (time.perf_counter() - inicio):.0f}/s)")
+        # bulk_create no dispara post_save.
+        invalidar_categorias(*(categoria.pk for categoria in categorias))
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE productos_producto")
+        self.stdout.write(self.style.SUCCESS(f"Productos creados: {creados}"))
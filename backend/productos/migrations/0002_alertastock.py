@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(max_length=20)),
+                ('stock', models.PositiveIntegerField()),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('notificada_en', models.DateTimeField(blank=True, null=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='productos.producto')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('notificada_en__isnull', True)), fields=['creado_en'], name='alerta_pendiente_idx'), models.Index(fields=['-notificada_en'], name='alerta_notificada_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_producto_sku'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['categoria', 'id'], name='producto_categoria_id_idx'),
+        ),
+    ]
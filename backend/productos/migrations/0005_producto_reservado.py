@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_producto_producto_categoria_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='reservado',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
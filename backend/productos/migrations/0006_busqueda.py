@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:06
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+import productos.models
+from django.db import migrations, models
+
+from core.migraciones import SoloPostgres
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_producto_reservado'),
+    ]
+
+    operations = [
+        # No hace nada fuera de PostgreSQL.
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name='producto',
+            name='busqueda',
+            field=models.GeneratedField(db_persist=True, expression=productos.models.VectorBusqueda('nombre', config='spanish'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        SoloPostgres(migrations.AddIndex(
+            model_name='producto',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda'], name='producto_busqueda_idx'),
+        )),
+        SoloPostgres(migrations.AddIndex(
+            model_name='producto',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nombre'], name='producto_nombre_trgm_idx', opclasses=['gin_trgm_ops']),
+        )),
+    ]
@@ -1,4 +1,37 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+AGOTADO = 'AGOTADO'
+CASI_AGOTADO = 'CASI AGOTADO'
+STOCK_OK = 'OK'
+UMBRAL_CASI_AGOTADO = 2
+
+
+def estado_stock(stock):
+    if stock == 0:
+        return AGOTADO
+    elif stock <= UMBRAL_CASI_AGOTADO:
+        return CASI_AGOTADO
+    return STOCK_OK
+
+
+# Configuración de texto de PostgreSQL para la búsqueda del catálogo.
+CONFIG_BUSQUEDA = 'spanish'
+
+
+class VectorBusqueda(SearchVector):
+    """
+    to_tsvector del nombre en PostgreSQL. SQLite no tiene tsvector: ahí la
+    columna guarda el nombre en minúsculas y la búsqueda usa LIKE
+    (ver productos.busqueda).
+    """
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return compiler.compile(Lower(self.source_expressions[0]))
+
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
@@ -8,10 +41,52 @@ class Categoria(models.Model):
 
 
 class Producto(models.Model):
+    # Código del proveedor; es la clave de las importaciones masivas (upsert).
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     nombre = models.CharField(max_length=200)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    # Unidades retenidas en carritos (carrito.reservas); disponible = stock - reservado.
+    reservado = models.PositiveIntegerField(default=0)
     categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='productos')
+    # Calculada por la base al escribir el nombre; no se asigna desde Python.
+    busqueda = models.GeneratedField(
+        expression=VectorBusqueda('nombre', config=CONFIG_BUSQUEDA),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # Paginación keyset del catálogo: WHERE categoria_id = ? AND id > ? ORDER BY id
+            models.Index(fields=['categoria', 'id'], name='producto_categoria_id_idx'),
+            # Búsqueda pública: busqueda @@ consulta, y nombre %> texto (pg_trgm) para errores de tipeo.
+            GinIndex(fields=['busqueda'], name='producto_busqueda_idx'),
+            GinIndex(fields=['nombre'], opclasses=['gin_trgm_ops'], name='producto_nombre_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} ({self.categoria.nombre})"
+
+
+class AlertaStock(models.Model):
+    """Transición de un producto a CASI AGOTADO o AGOTADO, pendiente de resumen."""
+
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='alertas')
+    estado = models.CharField(max_length=20)
+    stock = models.PositiveIntegerField()
+    creado_en = models.DateTimeField(auto_now_add=True)
+    notificada_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['creado_en'],
+                condition=Q(notificada_en__isnull=True),
+                name='alerta_pendiente_idx',
+            ),
+            models.Index(fields=['-notificada_en'], name='alerta_notificada_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} -> {self.estado} ({self.stock})"
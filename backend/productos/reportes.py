@@ -0,0 +1,110 @@
+import csv
+import gzip
+import json
+import tempfile
+from collections import Counter
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import Producto, estado_stock
+
+COLUMNAS = ('id', 'nombre', 'categoria', 'stock', 'estado')
+
+
+def filas_inventario(chunk_size=None):
+    """
+    Recorre el catálogo por bloques con un cursor del lado del servidor,
+    sin instanciar modelos: la memoria usada no depende del tamaño del catálogo.
+    """
+    filas = (
+        Producto.objects.order_by('id')
+        .values_list('id', 'nombre', 'categoria__nombre', 'stock')
+        .iterator(chunk_size=chunk_size or settings.INVENTARIO_CHUNK)
+    )
+    for producto_id, nombre, categoria, stock in filas:
+        yield producto_id, nombre, categoria, stock, estado_stock(stock)
+
+
+async def afilas_inventario(chunk_size=None):
+    """
+    filas_inventario para respuestas servidas por ASGI, donde Django junta en
+    memoria todo un iterador sync antes de enviarlo. Cada bloque se lee en el
+    hilo de la conexión (sync_to_async), como hace QuerySet.aiterator.
+    """
+    chunk_size = chunk_size or settings.INVENTARIO_CHUNK
+    filas = filas_inventario(chunk_size)
+    siguiente = sync_to_async(lambda: list(islice(filas, chunk_size)))
+    try:
+        while bloque := await siguiente():
+            for fila in bloque:
+                yield fila
+    finally:
+        # Cierra el cursor del servidor si el cliente corta la descarga.
+        await sync_to_async(filas.close)()
+
+
+class _Eco:
+    # csv.writer escribe en este objeto y devuelve la línea en vez de guardarla.
+    def write(self, valor):
+        return valor
+
+
+def lineas_csv(filas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUMNAS)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+async def alineas_csv(filas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUMNAS)
+    async for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def _linea_ndjson(fila):
+    return json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False) + "\n"
+
+
+def lineas_ndjson(filas):
+    for fila in filas:
+        yield _linea_ndjson(fila)
+
+
+async def alineas_ndjson(filas):
+    async for fila in filas:
+        yield _linea_ndjson(fila)
+
+
+# formato -> (generador sync, generador async, content type)
+FORMATOS = {
+    'csv': (lineas_csv, alineas_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (lineas_ndjson, alineas_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def contar_estados(filas, contador):
+    for fila in filas:
+        contador[fila[-1]] += 1
+        yield fila
+
+
+def comprimir(lineas):
+    # El archivo pasa a disco si supera el umbral, así el gzip no crece en RAM.
+    archivo = tempfile.SpooledTemporaryFile(max_size=settings.INVENTARIO_MAX_MEMORIA)
+    with gzip.GzipFile(fileobj=archivo, mode='wb') as gz:
+        for linea in lineas:
+            gz.write(linea.encode('utf-8'))
+    archivo.seek(0)
+    return archivo
+
+
+def inventario_comprimido(formato='csv'):
+    """Devuelve (archivo gzip, conteo por estado) del catálogo completo."""
+    generar = FORMATOS[formato][0]
+    conteo = Counter()
+    archivo = comprimir(generar(contar_estados(filas_inventario(), conteo)))
+    return archivo, conteo
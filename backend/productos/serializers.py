@@ -1,6 +1,14 @@
 from rest_framework import serializers
+from core.lectura import LecturaCompilada
 from .models import Categoria, Producto
 
+
+def disponible(stock, reservado):
+    # Stock menos lo reservado en carritos. Las páginas cacheadas del catálogo
+    # lo completan al responder (productos.cache.completar_disponible).
+    return max(stock - reservado, 0)
+
+
 class CategoriaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Categoria
@@ -9,7 +17,35 @@ class CategoriaSerializer(serializers.ModelSerializer):
 
 class ProductoSerializer(serializers.ModelSerializer):
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
+    disponible = serializers.SerializerMethodField()
 
     class Meta:
         model = Producto
-        fields = ['id', 'nombre', 'precio', 'stock', 'categoria', 'categoria_nombre']
+        fields = ['id', 'sku', 'nombre', 'precio', 'stock', 'disponible', 'categoria', 'categoria_nombre']
+
+    def get_disponible(self, obj):
+        return disponible(obj.stock, obj.reservado)
+
+
+# Listados: la misma salida que los serializers de arriba, leída de .values().
+categorias_lectura = LecturaCompilada(CategoriaSerializer)
+productos_lectura = LecturaCompilada(
+    ProductoSerializer,
+    calculados={'disponible': (('stock', 'reservado'), disponible)},
+)
+
+
+class FiltroBusquedaSerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=100)
+    categoria = serializers.IntegerField(required=False, min_value=1)
+    precio_min = serializers.DecimalField(required=False, max_digits=10, decimal_places=2, min_value=0)
+    precio_max = serializers.DecimalField(required=False, max_digits=10, decimal_places=2, min_value=0)
+    en_stock = serializers.BooleanField(required=False, default=False)
+
+
+class FilaImportacionSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=64)
+    nombre = serializers.CharField(max_length=200)
+    precio = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    stock = serializers.IntegerField(min_value=0)
+    categoria = serializers.CharField(max_length=100)
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.cache import invalidar
+from .cache import invalidar_categorias
+from .models import Categoria, Producto
+
+
+@receiver(pre_save, sender=Producto)
+def recordar_categoria_anterior(sender, instance, **kwargs):
+    # Si el producto cambia de categoría hay que invalidar también la anterior.
+    if instance.pk:
+        instance._categoria_anterior = (
+            Producto.objects.filter(pk=instance.pk).values_list('categoria_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_catalogo_producto(sender, instance, **kwargs):
+    invalidar_categorias(instance.categoria_id, getattr(instance, '_categoria_anterior', None))
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_catalogo_categoria(sender, instance, **kwargs):
+    invalidar_categorias(instance.pk)
+    invalidar(Categoria)
@@ -0,0 +1,183 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.pruebas import PlanConsultaMixin, solo_postgres
+
+from usuarios.views import generar_tokens_para_usuario
+from .models import Categoria, Producto
+
+Usuario = get_user_model()
+
+
+def crear_admin():
+    return Usuario.objects.create_user(
+        username='admin', email='admin@example.com', password='x', rol='admin', is_staff=True,
+    )
+
+
+def autorizacion(usuario):
+    return f"Bearer {generar_tokens_para_usuario(usuario)['access']}"
+
+
+class ExportarInventarioTests(TestCase):
+    url = '/api/productos/inventario/exportar/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_admin()
+        categoria = Categoria.objects.create(nombre='Calzado')
+        Producto.objects.bulk_create([
+            Producto(categoria=categoria, nombre='Zapatilla, "runner"', precio='30.00', stock=0),
+            Producto(categoria=categoria, nombre='Media', precio='2.50', stock=2),
+            Producto(categoria=categoria, nombre='Bota', precio='80.00', stock=9),
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def esperado_csv(self):
+        ids = list(Producto.objects.order_by('id').values_list('id', flat=True))
+        return (
+            "id,nombre,categoria,stock,estado\r\n"
+            f'{ids[0]},"Zapatilla, ""runner""",Calzado,0,AGOTADO\r\n'
+            f"{ids[1]},Media,Calzado,2,CASI AGOTADO\r\n"
+            f"{ids[2]},Bota,Calzado,9,OK\r\n"
+        )
+
+    def test_csv_por_wsgi(self):
+        respuesta = self.client.get(self.url, HTTP_AUTHORIZATION=autorizacion(self.admin))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(respuesta.is_async)
+        self.assertEqual(respuesta['Content-Disposition'], 'attachment; filename="inventario.csv"')
+        self.assertEqual(b''.join(respuesta.streaming_content).decode(), self.esperado_csv())
+
+    async def test_csv_por_asgi_usa_un_iterador_async(self):
+        respuesta = await self.async_client.get(self.url, headers={'Authorization': autorizacion(self.admin)})
+        self.assertEqual(respuesta.status_code, 200)
+        # Con un iterador sync, el handler ASGI juntaría todo el archivo en memoria.
+        self.assertTrue(respuesta.is_async)
+        contenido = b''.join([parte async for parte in respuesta.streaming_content]).decode()
+        self.assertEqual(contenido, await self.aesperado_csv())
+
+    async def aesperado_csv(self):
+        return await sync_to_async(self.esperado_csv)()
+
+    async def test_ndjson_por_asgi(self):
+        respuesta = await self.async_client.get(
+            self.url, {'formato': 'ndjson'}, headers={'Authorization': autorizacion(self.admin)},
+        )
+        self.assertTrue(respuesta.is_async)
+        lineas = b''.join([parte async for parte in respuesta.streaming_content]).decode().splitlines()
+        self.assertEqual([json.loads(linea)['estado'] for linea in lineas], ['AGOTADO', 'CASI AGOTADO', 'OK'])
+
+    def test_formato_desconocido(self):
+        respuesta = self.client.get(self.url, {'formato': 'xls'}, HTTP_AUTHORIZATION=autorizacion(self.admin))
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class BusquedaTests(TestCase):
+    url = '/api/productos/publico/buscar/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.calzado = Categoria.objects.create(nombre='Calzado')
+        cls.deportes = Categoria.objects.create(nombre='Deportes')
+        Producto.objects.bulk_create([
+            Producto(categoria=cls.calzado, nombre='Zapatilla roja', precio='30.00', stock=5),
+            Producto(categoria=cls.calzado, nombre='Zapatilla azul', precio='50.00', stock=0),
+            Producto(categoria=cls.deportes, nombre='Zapatilla verde', precio='80.00', stock=2, reservado=2),
+            Producto(categoria=cls.deportes, nombre='Zapatilla negra', precio='20.00', stock=9),
+            Producto(categoria=cls.calzado, nombre='Zapatilla blanca', precio='45.00', stock=1),
+            Producto(categoria=cls.calzado, nombre='Bota', precio='90.00', stock=3),
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def buscar(self, **params):
+        respuesta = self.client.get(self.url, {'q': 'zapatilla', **params})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def nombres(self, **params):
+        return sorted(p['nombre'].split()[-1] for p in self.buscar(**params)['productos'])
+
+    def test_filtros(self):
+        self.assertEqual(self.nombres(), ['azul', 'blanca', 'negra', 'roja', 'verde'])
+        self.assertEqual(self.nombres(precio_min='25', precio_max='50'), ['azul', 'blanca', 'roja'])
+        # Lo reservado en carritos no cuenta como stock.
+        self.assertEqual(self.nombres(en_stock='true'), ['blanca', 'negra', 'roja'])
+        self.assertEqual(self.nombres(categoria=self.deportes.id), ['negra', 'verde'])
+
+    def test_parametros_invalidos(self):
+        for params in ({'q': 'z'}, {'q': 'zapatilla', 'precio_min': '-1'}, {'q': 'zapatilla', 'categoria': 'x'},
+                       {'q': 'zapatilla', 'cursor': '%%%'}, {'q': 'zapatilla', 'limite': '0'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_recorrer_paginas_no_pierde_ni_repite(self):
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            datos = self.buscar(limite=2, **({'cursor': cursor} if cursor else {}))
+            vistos += [p['id'] for p in datos['productos']]
+            paginas += 1
+            cursor = datos['siguiente']
+            if cursor is None:
+                break
+        self.assertEqual(paginas, 3)
+        self.assertEqual(len(vistos), len(set(vistos)))
+        self.assertEqual(set(vistos), set(Producto.objects.filter(nombre__startswith='Zapatilla').values_list('id', flat=True)))
+
+
+@solo_postgres
+class BusquedaRelevanciaTests(TestCase):
+    """Productos con la misma relevancia: el cursor tiene que desempatar por id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre='Calzado')
+        Producto.objects.bulk_create(
+            Producto(categoria=categoria, nombre=f"Zapatilla trail {color}", precio='10.00', stock=1)
+            for color in ('roja', 'azul', 'verde', 'negra', 'gris', 'blanca', 'rosa')
+            for _ in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_recorrer_paginas_con_empates(self):
+        vistos, cursor = [], None
+        while True:
+            params = {'q': 'zapatilla trail', 'limite': 4, **({'cursor': cursor} if cursor else {})}
+            datos = self.client.get('/api/productos/publico/buscar/', params).json()
+            vistos += [p['id'] for p in datos['productos']]
+            cursor = datos['siguiente']
+            if cursor is None:
+                break
+        self.assertEqual(len(vistos), len(set(vistos)))
+        self.assertEqual(set(vistos), set(Producto.objects.values_list('id', flat=True)))
+
+
+@solo_postgres
+class PlanesProductoTests(PlanConsultaMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categorias = Categoria.objects.bulk_create(Categoria(nombre=f"Categoría {i}") for i in range(200))
+        Producto.objects.bulk_create(
+            Producto(categoria=categorias[i % 200], nombre=f"Producto {i}", precio='1.00', stock=i % 7)
+            for i in range(20000)
+        )
+        cls.categoria = categorias[17]
+
+    def setUp(self):
+        self.analizar()
+
+    def test_pagina_del_catalogo_usa_categoria_id(self):
+        # La consulta de paginar_por_id en el catálogo público.
+        pagina = Producto.objects.filter(categoria=self.categoria, id__gt=0).order_by('id')[:50]
+        self.assertUsaIndice(pagina, 'producto_categoria_id_idx')
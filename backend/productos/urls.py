@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -6,10 +7,17 @@ urlpatterns = [
     path('admin/categorias/', views.categorias_admin, name='categorias_admin'),
     path('admin/categorias/<int:pk>/', views.categoria_detalle, name='categoria_detalle'),
     path('admin/productos/', views.productos_admin, name='productos_admin'),
+    path('admin/productos/importar/', views.importar_productos_admin, name='importar_productos'),
     path('admin/productos/<int:pk>/', views.producto_detalle, name='producto_detalle'),
 
     path("inventario/", views.inventario_admin, name="inventario_admin"), 
+    path("inventario/exportar/", views.exportar_inventario, name="exportar_inventario"),
 
     # PÚBLICO
-    path('publico/categorias/<int:categoria_id>/productos/', views.productos_por_categoria, name='productos_por_categoria'),
+    path(
+        'publico/categorias/<int:categoria_id>/productos/',
+        views.productos_por_categoria_async if settings.VISTAS_ASYNC else views.productos_por_categoria,
+        name='productos_por_categoria',
+    ),
+    path('publico/buscar/', views.buscar_productos, name='buscar_productos'),
 ]
@@ -1,22 +1,45 @@
+import hashlib
+import json
+
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import Categoria, Producto
-from .serializers import CategoriaSerializer, ProductoSerializer
+from .models import Categoria, Producto, AGOTADO, CASI_AGOTADO, STOCK_OK
+from .serializers import (
+    CategoriaSerializer, FiltroBusquedaSerializer, ProductoSerializer, categorias_lectura, productos_lectura,
+)
+from .reportes import FORMATOS, afilas_inventario, filas_inventario, inventario_comprimido
+from .importacion import detectar_formato, importar_productos, leer_filas
+from .busqueda import buscar
+from .cache import (
+    BUSQUEDA, acompletar_disponible, aversion_categoria, clave_pagina, completar_disponible, etag_pagina,
+    marcar_respuesta, respuesta_condicional, sin_disponible, version_categoria,
+)
+from core.cache import aobtener_o_calcular, clave_versionada, obtener_o_calcular
+from core.paginacion import apaginar_por_id, decodificar_cursor, leer_limite, paginar_por_id
+from core.respuestas import respuesta_json
+from usuarios.authentication import JWTSinConsultaAuthentication
 from usuarios.permissions import EsAdmin
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.handlers.asgi import ASGIRequest
+from django.core.mail import EmailMessage
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_GET
 
 
 
 @api_view(['GET', 'POST'])
+@authentication_classes([JWTSinConsultaAuthentication])
 @permission_classes([IsAuthenticated, EsAdmin])
 def categorias_admin(request):
     if request.method == 'GET':
-        categorias = Categoria.objects.all()
-        serializer = CategoriaSerializer(categorias, many=True)
-        return Response(serializer.data)
+        datos = obtener_o_calcular(
+            clave_versionada(Categoria, 'lista'),
+            lambda: categorias_lectura.representar(categorias_lectura.valores(Categoria.objects.all())),
+        )
+        return Response(datos)
 
     elif request.method == 'POST':
         serializer = CategoriaSerializer(data=request.data)
@@ -27,6 +50,7 @@ def categorias_admin(request):
 
 
 @api_view(['PUT', 'DELETE'])
+@authentication_classes([JWTSinConsultaAuthentication])
 @permission_classes([IsAuthenticated, EsAdmin])
 def categoria_detalle(request, pk):
     try:
@@ -48,12 +72,12 @@ def categoria_detalle(request, pk):
 
 
 @api_view(['GET', 'POST'])
+@authentication_classes([JWTSinConsultaAuthentication])
 @permission_classes([IsAuthenticated, EsAdmin])
 def productos_admin(request):
     if request.method == 'GET':
-        productos = Producto.objects.all()
-        serializer = ProductoSerializer(productos, many=True)
-        return Response(serializer.data)
+        productos = productos_lectura.valores(Producto.objects.all())
+        return Response(productos_lectura.representar(productos))
 
     elif request.method == 'POST':
         serializer = ProductoSerializer(data=request.data)
@@ -63,7 +87,25 @@ def productos_admin(request):
         return Response(serializer.errors, status=400)
 
 
+@api_view(['POST'])
+@authentication_classes([JWTSinConsultaAuthentication])
+@permission_classes([IsAuthenticated, EsAdmin])
+@parser_classes([MultiPartParser])
+def importar_productos_admin(request):
+    archivo = request.FILES.get('archivo')
+    if archivo is None:
+        return Response({'error': "Falta el archivo ('archivo')."}, status=400)
+    try:
+        formato = detectar_formato(archivo.name, request.query_params.get('formato'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+
+    resultado = importar_productos(leer_filas(archivo, formato))
+    return Response(resultado, status=200)
+
+
 @api_view(['PUT', 'DELETE'])
+@authentication_classes([JWTSinConsultaAuthentication])
 @permission_classes([IsAuthenticated, EsAdmin])
 def producto_detalle(request, pk):
     try:
@@ -88,52 +130,167 @@ def producto_detalle(request, pk):
 @permission_classes([AllowAny])
 def productos_por_categoria(request, categoria_id):
     try:
-        categoria = Categoria.objects.get(pk=categoria_id)
-    except Categoria.DoesNotExist:
+        cursor = decodificar_cursor(request.query_params.get('cursor'))
+        limite = leer_limite(request)
+    except ValueError:
+        return Response({'error': 'Parámetros de paginación inválidos'}, status=400)
+
+    version = version_categoria(categoria_id)
+    datos = obtener_o_calcular(
+        clave_pagina(categoria_id, version, cursor, limite),
+        lambda: _pagina_catalogo(categoria_id, cursor, limite),
+        settings.CATALOGO_CACHE_SEGUNDOS,
+    )
+    if datos is None:
         return Response({'error': 'Categoría no encontrada'}, status=404)
 
-    productos = Producto.objects.filter(categoria=categoria)
-    serializer = ProductoSerializer(productos, many=True)
-    return Response({
-        'categoria': categoria.nombre,
-        'productos': serializer.data
+    datos = completar_disponible(datos)
+    etag = etag_pagina(categoria_id, version, cursor, limite, datos['productos'])
+    no_modificado = respuesta_condicional(request, etag)
+    if no_modificado is not None:
+        return marcar_respuesta(no_modificado, etag)
+    return marcar_respuesta(Response(datos), etag)
+
+
+def _pagina_catalogo(categoria_id, cursor, limite):
+    productos, siguiente = paginar_por_id(
+        productos_lectura.valores(Producto.objects.filter(categoria_id=categoria_id)),
+        cursor,
+        limite,
+    )
+    if productos:
+        nombre = productos[0]['categoria__nombre']
+    else:
+        nombre = Categoria.objects.filter(pk=categoria_id).values_list('nombre', flat=True).first()
+        if nombre is None:
+            return None
+
+    return sin_disponible({
+        'categoria': nombre,
+        'productos': productos_lectura.representar(productos),
+        'siguiente': siguiente,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def buscar_productos(request):
+    filtros = FiltroBusquedaSerializer(data=request.query_params)
+    filtros.is_valid(raise_exception=True)
+    filtros = filtros.validated_data
+    try:
+        cursor = decodificar_cursor(request.query_params.get('cursor'))
+        limite = leer_limite(request)
+    except ValueError:
+        return Response({'error': 'Parámetros de paginación inválidos'}, status=400)
+
+    firma = hashlib.md5(json.dumps([filtros, cursor, limite], sort_keys=True, default=str).encode()).hexdigest()
+    try:
+        datos = obtener_o_calcular(
+            clave_versionada(BUSQUEDA, firma),
+            lambda: _pagina_busqueda(filtros, cursor, limite),
+            settings.CATALOGO_CACHE_SEGUNDOS,
+        )
+    except ValueError:
+        return Response({'error': 'Parámetros de paginación inválidos'}, status=400)
+    return Response(completar_disponible(datos))
+
+
+def _pagina_busqueda(filtros, cursor, limite):
+    productos, siguiente = buscar(filtros, cursor, limite)
+    return sin_disponible({
+        'productos': productos_lectura.representar(productos),
+        'siguiente': siguiente,
+    })
+
+
+# Versión ASGI de productos_por_categoria (VISTAS_ASYNC): misma respuesta,
+# con el ORM y la caché async para no ocupar un hilo mientras espera I/O.
+@require_GET
+async def productos_por_categoria_async(request, categoria_id):
+    try:
+        cursor = decodificar_cursor(request.GET.get('cursor'))
+        limite = leer_limite(request)
+    except ValueError:
+        return respuesta_json({'error': 'Parámetros de paginación inválidos'}, status=400)
+
+    version = await aversion_categoria(categoria_id)
+    datos = await aobtener_o_calcular(
+        clave_pagina(categoria_id, version, cursor, limite),
+        lambda: _apagina_catalogo(categoria_id, cursor, limite),
+        settings.CATALOGO_CACHE_SEGUNDOS,
+    )
+    if datos is None:
+        return respuesta_json({'error': 'Categoría no encontrada'}, status=404)
+
+    datos = await acompletar_disponible(datos)
+    etag = etag_pagina(categoria_id, version, cursor, limite, datos['productos'])
+    no_modificado = respuesta_condicional(request, etag)
+    if no_modificado is not None:
+        return marcar_respuesta(no_modificado, etag)
+    return marcar_respuesta(respuesta_json(datos), etag)
+
+
+async def _apagina_catalogo(categoria_id, cursor, limite):
+    productos, siguiente = await apaginar_por_id(
+        productos_lectura.valores(Producto.objects.filter(categoria_id=categoria_id)),
+        cursor,
+        limite,
+    )
+    if productos:
+        nombre = productos[0]['categoria__nombre']
+    else:
+        nombre = await Categoria.objects.filter(pk=categoria_id).values_list('nombre', flat=True).afirst()
+        if nombre is None:
+            return None
+
+    return sin_disponible({
+        'categoria': nombre,
+        'productos': productos_lectura.representar(productos),
+        'siguiente': siguiente,
     })
 
 
 
 @api_view(['GET'])
+@authentication_classes([JWTSinConsultaAuthentication])
 @permission_classes([IsAuthenticated, EsAdmin])
 def inventario_admin(request):
+    adjuntar = request.query_params.get('adjunto')
+    if adjuntar is None:
+        adjuntar = settings.INVENTARIO_ADJUNTAR_GZIP
+    else:
+        adjuntar = adjuntar.lower() in ('1', 'true', 'si', 'sí')
     try:
-        lineas_stock = []
-        
-        for producto in Producto.objects.select_related("categoria").all():
-            if producto.stock == 0:
-                estado = "AGOTADO"
-            elif producto.stock <= 2:
-                estado = "CASI AGOTADO"
-            else:
-                estado = "OK"
-
-            lineas_stock.append(
-                f"- {producto.nombre.upper()} ({producto.categoria.nombre.upper()}): "
-                f"stock {producto.stock} -> {estado.upper()}"
-            )
-
-        cuerpo_stock = (
-            "📦 Estado actual del catálogo de productos\n\n"
-            + "\n".join(lineas_stock)
-        )
-        
-        # Enviar email
-        send_mail(
+        email = EmailMessage(
             subject="📦 Estado actual del catálogo",
-            message=cuerpo_stock,
             from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[settings.ADMIN_EMAIL],
-            fail_silently=False,
+            to=[settings.ADMIN_EMAIL],
         )
-        
+
+        if adjuntar:
+            archivo, conteo = inventario_comprimido('csv')
+            with archivo:
+                email.attach("inventario.csv.gz", archivo.read(), "application/gzip")
+            email.body = (
+                "📦 Estado actual del catálogo de productos\n\n"
+                f"Total de productos: {sum(conteo.values())}\n"
+                + "\n".join(f"{estado}: {conteo[estado]}" for estado in (AGOTADO, CASI_AGOTADO, STOCK_OK))
+                + "\n\nEl detalle completo va adjunto (inventario.csv.gz)."
+            )
+        else:
+            lineas_stock = (
+                f"- {nombre.upper()} ({categoria.upper()}): stock {stock} -> {estado.upper()}"
+                for _, nombre, categoria, stock, estado in filas_inventario()
+            )
+            email.body = (
+                "📦 Estado actual del catálogo de productos\n\n"
+                + "\n".join(lineas_stock)
+            )
+
+        # Enviar email
+        email.send(fail_silently=False)
+
         return Response(
             {
                 "detail": "Estado De Stock enviado al correo.",
@@ -146,4 +303,23 @@ def inventario_admin(request):
         return Response(
             {"error": f"Error al procesar: {str(e)}", "status": "error"},
             status=500,
-        )
\ No newline at end of file
+        )
+
+
+@api_view(['GET'])
+@authentication_classes([JWTSinConsultaAuthentication])
+@permission_classes([IsAuthenticated, EsAdmin])
+def exportar_inventario(request):
+    formato = request.query_params.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return Response({'error': f"Formato no soportado. Usa: {', '.join(FORMATOS)}"}, status=400)
+
+    generar, agenerar, content_type = FORMATOS[formato]
+    if isinstance(request._request, ASGIRequest):
+        # Bajo ASGI un iterador sync se juntaría entero en memoria antes de enviarse.
+        lineas = agenerar(afilas_inventario())
+    else:
+        lineas = generar(filas_inventario())
+    response = StreamingHttpResponse(lineas, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="inventario.{formato}"'
+    return response
@@ -0,0 +1,119 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Usuario
+
+
+def agregar_claims(token, usuario):
+    # El token lleva lo que necesitan los permisos (EsAdmin, IsAdminUser)
+    # para no tener que cargar el usuario en cada petición.
+    token['rol'] = usuario.rol
+    token['is_staff'] = usuario.is_staff
+    token['is_active'] = usuario.is_active
+    return token
+
+
+def _clave_estado(usuario_id):
+    return f"usuario:estado:{usuario_id}"
+
+
+def estado_usuario(usuario_id):
+    """
+    (is_active, rol, is_staff) del usuario, cacheado JWT_ESTADO_TTL segundos.
+    Devuelve None si el usuario ya no existe.
+    """
+    clave = _clave_estado(usuario_id)
+    estado = cache.get(clave)
+    if estado is None:
+        fila = Usuario.objects.filter(pk=usuario_id).values_list('is_active', 'rol', 'is_staff').first()
+        estado = fila if fila is not None else False
+        cache.set(clave, estado, settings.JWT_ESTADO_TTL)
+    return estado or None
+
+
+async def aestado_usuario(usuario_id):
+    clave = _clave_estado(usuario_id)
+    estado = await cache.aget(clave)
+    if estado is None:
+        fila = await Usuario.objects.filter(pk=usuario_id).values_list('is_active', 'rol', 'is_staff').afirst()
+        estado = fila if fila is not None else False
+        await cache.aset(clave, estado, settings.JWT_ESTADO_TTL)
+    return estado or None
+
+
+def olvidar_estado(usuario_id):
+    cache.delete(_clave_estado(usuario_id))
+
+
+class UsuarioToken(TokenUser):
+    """Usuario armado solo con los claims del token, sin consultar la base de datos."""
+
+    def __init__(self, token, estado=None):
+        super().__init__(token)
+        if estado is not None:
+            self.is_active, self.rol, self.is_staff = estado
+
+    @cached_property
+    def rol(self):
+        return self.token.get('rol')
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', True)
+
+
+class JWTSinConsultaAuthentication(JWTAuthentication):
+    """
+    Igual que JWTAuthentication pero sin cargar el Usuario: `request.user`
+    es un UsuarioToken con id, rol, is_staff e is_active.
+
+    Si JWT_ESTADO_TTL > 0 se comprueba además (con caché) que el usuario siga
+    existiendo y activo, y se toman de ahí rol e is_staff, así una baja o un
+    cambio de rol se aplican en segundos y no al expirar el token.
+    Los tokens emitidos antes de existir los claims usan la ruta normal.
+    """
+
+    def get_user(self, validated_token):
+        if 'rol' not in validated_token:
+            return super().get_user(validated_token)
+
+        estado = None
+        if settings.JWT_ESTADO_TTL:
+            estado = estado_usuario(validated_token[api_settings.USER_ID_CLAIM])
+        return self._usuario(validated_token, estado)
+
+    async def aautenticar(self, request):
+        """
+        authenticate() para vistas async: devuelve el UsuarioToken o None si
+        no viene token; lanza AuthenticationFailed si es inválido.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if 'rol' not in validated_token:
+            return await sync_to_async(super().get_user)(validated_token)
+
+        estado = None
+        if settings.JWT_ESTADO_TTL:
+            estado = await aestado_usuario(validated_token[api_settings.USER_ID_CLAIM])
+        return self._usuario(validated_token, estado)
+
+    def _usuario(self, validated_token, estado):
+        if estado is None and settings.JWT_ESTADO_TTL:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        usuario = UsuarioToken(validated_token, estado)
+        if not usuario.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return usuario
@@ -0,0 +1,137 @@
+"""
+Almacén de códigos de verificación.
+
+Hay un solo código vigente por usuario y contexto, así que verificar es una
+búsqueda directa sin importar cuántos códigos se hayan emitido antes.
+Después de CODIGOS_MAX_INTENTOS fallos el código se descarta.
+
+CODIGOS_ALMACEN elige dónde viven:
+    'bd': CodigoVerificacion, con un índice único parcial sobre los no usados;
+          los vencidos se borran con `manage.py purge_codigos`.
+    'cache': la caché CODIGOS_CACHE, con TTL nativo y contador de intentos
+          atómico (incr). Tiene que ser compartida entre workers (Redis):
+          settings rechaza LocMemCache y la caché de dos niveles, cuyo nivel
+          local permitiría reusar un código en otro proceso.
+"""
+import hmac
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import CodigoVerificacion
+
+VALIDO = 'valido'
+INVALIDO = 'invalido'
+BLOQUEADO = 'bloqueado'
+
+
+class AlmacenBD:
+    def emitir(self, usuario, contexto, codigo, minutos_validez):
+        try:
+            CodigoVerificacion.crear_para_usuario(
+                usuario, minutos_validez=minutos_validez, contexto=contexto, codigo=codigo
+            )
+        except IntegrityError:
+            # Otra petición emitió uno a la vez; el nuevo retira a ese.
+            CodigoVerificacion.crear_para_usuario(
+                usuario, minutos_validez=minutos_validez, contexto=contexto, codigo=codigo
+            )
+
+    def verificar(self, usuario, contexto, codigo):
+        with transaction.atomic():
+            vigente = (
+                CodigoVerificacion.objects.select_for_update()
+                .filter(usuario=usuario, contexto=contexto, usado=False)
+                .first()
+            )
+            if vigente is None or not vigente.es_valido():
+                return INVALIDO
+
+            if hmac.compare_digest(vigente.codigo, codigo):
+                vigente.usado = True
+                vigente.save(update_fields=['usado'])
+                return VALIDO
+
+            vigente.intentos += 1
+            vigente.usado = vigente.intentos >= settings.CODIGOS_MAX_INTENTOS
+            vigente.save(update_fields=['intentos', 'usado'])
+            return BLOQUEADO if vigente.usado else INVALIDO
+
+
+class AlmacenCache:
+    @property
+    def cache(self):
+        return caches[settings.CODIGOS_CACHE]
+
+    def _claves(self, usuario, contexto):
+        base = f"codigo:{contexto}:{usuario.pk}"
+        return base, f"{base}:intentos"
+
+    def emitir(self, usuario, contexto, codigo, minutos_validez):
+        clave, intentos = self._claves(usuario, contexto)
+        self.cache.set_many({clave: codigo, intentos: 0}, minutos_validez * 60)
+
+    def verificar(self, usuario, contexto, codigo):
+        clave, clave_intentos = self._claves(usuario, contexto)
+        guardado = self.cache.get(clave)
+        if guardado is None:
+            return INVALIDO
+        try:
+            intentos = self.cache.incr(clave_intentos)
+        except ValueError:
+            return INVALIDO
+
+        if intentos <= settings.CODIGOS_MAX_INTENTOS and hmac.compare_digest(guardado, codigo):
+            # delete solo devuelve True a una de dos verificaciones simultáneas.
+            return VALIDO if self.cache.delete(clave) else INVALIDO
+        if intentos >= settings.CODIGOS_MAX_INTENTOS:
+            self.cache.delete_many([clave, clave_intentos])
+            return BLOQUEADO
+        return INVALIDO
+
+
+ALMACENES = {
+    'bd': AlmacenBD,
+    'cache': AlmacenCache,
+}
+
+
+def _almacen():
+    return ALMACENES[settings.CODIGOS_ALMACEN]()
+
+
+def emitir(usuario, contexto, minutos_validez=5, longitud=6):
+    """Genera un código nuevo (retirando el anterior) y lo devuelve."""
+    codigo = CodigoVerificacion.generar_codigo(longitud)
+    _almacen().emitir(usuario, contexto, codigo, minutos_validez)
+    return codigo
+
+
+def verificar(usuario, contexto, codigo):
+    """Devuelve VALIDO, INVALIDO o BLOQUEADO; un código válido no se puede volver a usar."""
+    return _almacen().verificar(usuario, contexto, str(codigo))
+
+
+def purgar(lote=None, pausa=0.0, antes_de=None):
+    """
+    Borra de la BD los códigos vencidos en lotes de `lote` filas, cada uno en
+    su propia transacción corta (por pk, vía codigo_expiracion_idx), para no
+    retener locks ni generar un DELETE enorme. Devuelve cuántos borró.
+    """
+    lote = lote or settings.CODIGOS_PURGA_LOTE
+    antes_de = antes_de or timezone.now()
+    vencidos = CodigoVerificacion.objects.filter(expiracion__lt=antes_de)
+    total = 0
+    while True:
+        ids = list(vencidos.values_list('pk', flat=True)[:lote])
+        if not ids:
+            return total
+        borrados, _ = CodigoVerificacion.objects.filter(pk__in=ids).delete()
+        total += borrados
+        if len(ids) < lote:
+            return total
+        if pausa:
+            time.sleep(pausa)
@@ -0,0 +1,81 @@
+"""
+Hashers con parámetros ajustables desde settings y un pool acotado de hilos
+para hashear fuera del hilo de la petición.
+
+argon2-cffi, hashlib.scrypt y hashlib.pbkdf2_hmac liberan el GIL, así que
+el pool limita cuántos hashes corren a la vez por proceso sin frenar al
+resto de peticiones del worker (hilos de gthread o el event loop de ASGI).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    ScryptPasswordHasher,
+    make_password,
+    verify_password,
+)
+
+
+class Argon2Ajustado(Argon2PasswordHasher):
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
+
+
+class ScryptAjustado(ScryptPasswordHasher):
+    work_factor = settings.SCRYPT_WORK_FACTOR
+    block_size = settings.SCRYPT_BLOCK_SIZE
+    parallelism = settings.SCRYPT_PARALLELISM
+    # hashlib limita a 32 MiB por defecto; se deja margen para factores mayores.
+    maxmem = 256 * work_factor * block_size * parallelism
+
+
+# --- pool de hashing --------------------------------------------------------
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _ejecutor():
+    # Se crea al primer uso, así cada worker de gunicorn tiene el suyo tras el fork.
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=settings.HASH_HILOS, thread_name_prefix='hash')
+    return _pool
+
+
+def en_pool(funcion, *args):
+    if settings.HASH_HILOS <= 0:
+        return funcion(*args)
+    return _ejecutor().submit(funcion, *args).result()
+
+
+def hashear(password):
+    return en_pool(make_password, password)
+
+
+def establecer_password(usuario, password):
+    """Como `usuario.set_password` pero hasheando en el pool."""
+    usuario.password = hashear(password)
+    usuario._password = password
+
+
+def autenticar(usuario, password):
+    """
+    Equivalente a authenticate() con ModelBackend para un usuario ya cargado:
+    devuelve el usuario si la contraseña es correcta y está activo, o None.
+    Si el hash usa otro algoritmo o parámetros, se regenera con los actuales.
+    """
+    correcta, actualizar = en_pool(verify_password, password, usuario.password)
+    if not correcta:
+        return None
+    if actualizar:
+        usuario.password = hashear(password)
+        usuario.save(update_fields=['password'])
+    if not usuario.is_active:
+        return None
+    return usuario
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from usuarios.codigos import purgar
+
+
+class Command(BaseCommand):
+    help = "Borra en lotes los códigos de verificación vencidos (almacén 'bd')"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=settings.CODIGOS_PURGA_LOTE,
+                            help="Filas por DELETE.")
+        parser.add_argument('--pausa', type=float, default=0.05,
+                            help="Segundos entre lotes.")
+        parser.add_argument('--margen-minutos', type=int, default=0,
+                            help="Conserva los vencidos hace menos de estos minutos.")
+
+    def handle(self, *args, **options):
+        antes_de = timezone.now() - timedelta(minutes=options['margen_minutos'])
+        borrados = purgar(options['lote'], options['pausa'], antes_de)
+        self.stdout.write(self.style.SUCCESS(f"Códigos borrados: {borrados}"))
@@ -0,0 +1,48 @@
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from core.cache import invalidar
+from usuarios.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea usuarios de prueba en lotes (p. ej. 1.000.000) para medir el listado "
+        "de usuarios con prueba_carga o EXPLAIN. No usar en producción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=1_000_000)
+        parser.add_argument('--lote', type=int, default=10_000)
+        parser.add_argument('--prefijo', default='carga',
+                            help="Prefijo de username y email de los usuarios creados.")
+
+    def handle(self, *args, **options):
+        prefijo = options['prefijo']
+        # Sin contraseña usable: evita hashear un millón de veces.
+        password = make_password(None)
+        inicial = Usuario.objects.filter(username__startswith=f"{prefijo}-").count()
+        inicio = time.perf_counter()
+        creados = 0
+        while creados < options['cantidad']:
+            tamano = min(options['lote'], options['cantidad'] - creados)
+            Usuario.objects.bulk_create(
+                [
+                    Usuario(
+                        username=f"{prefijo}-{n}",
+                        email=f"{prefijo}{n}@ejemplo.com",
+                        password=password,
+                        rol='admin' if n % 100 == 0 else 'cliente',
+                        is_active=n % 10 != 0,
+                    )
+                    for n in range(inicial + creados, inicial + creados + tamano)
+                ],
+                batch_size=tamano,
+            )
+            creados += tamano
+            self.stdout.write(f"{creados} usuarios ({creados / (time.perf_counter() - inicio):.0f}/s)")
+        # bulk_create no dispara post_save.
+        invalidar(Usuario)
+        self.stdout.write(self.style.SUCCESS(f"Usuarios creados: {creados}"))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_alter_usuario_email'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='codigoverificacion',
+            index=models.Index(fields=['usuario', 'contexto', '-creado_en'], name='codigo_usuario_contexto_idx'),
+        ),
+    ]
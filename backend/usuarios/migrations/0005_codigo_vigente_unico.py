@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:56
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def dejar_un_codigo_vigente(apps, schema_editor):
+    # La vista de verificación solo miraba el código más reciente; los
+    # anteriores sin usar ya no servían y se marcan como usados.
+    CodigoVerificacion = apps.get_model('usuarios', 'CodigoVerificacion')
+    grupos = (
+        CodigoVerificacion.objects.filter(usado=False)
+        .values('usuario', 'contexto')
+        .annotate(ultimo=Max('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for grupo in grupos.iterator():
+        CodigoVerificacion.objects.filter(
+            usuario=grupo['usuario'], contexto=grupo['contexto'], usado=False, id__lt=grupo['ultimo']
+        ).update(usado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0004_codigoverificacion_codigo_usuario_contexto_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(dejar_un_codigo_vigente, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='codigoverificacion',
+            name='codigo_usuario_contexto_idx',
+        ),
+        migrations.AddField(
+            model_name='codigoverificacion',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='codigoverificacion',
+            index=models.Index(fields=['expiracion'], name='codigo_expiracion_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='codigoverificacion',
+            constraint=models.UniqueConstraint(condition=models.Q(('usado', False)), fields=('usuario', 'contexto'), name='codigo_vigente_unico'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:59
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from core.migraciones import SoloPostgres
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('usuarios', '0005_codigo_vigente_unico'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['rol', 'id'], name='usuario_rol_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['is_active', 'id'], name='usuario_activo_idx'),
+        ),
+        # text_pattern_ops solo existe en PostgreSQL.
+        SoloPostgres(migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('email'), name='text_pattern_ops'), models.F('id'), name='usuario_email_prefijo_idx'),
+        )),
+    ]
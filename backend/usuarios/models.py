@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.postgres.indexes import OpClass
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
 from django.utils import timezone
 import random
 
@@ -11,6 +14,18 @@ class Usuario(AbstractUser):
     email = models.EmailField(unique=True)
     rol = models.CharField(max_length=10, choices=ROLES, default='cliente')
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Listado de usuarios (listar_usuarios): filtros + orden por id, y
+            # búsqueda por prefijo de email sin distinguir mayúsculas.
+            models.Index(fields=['rol', 'id'], name='usuario_rol_idx'),
+            models.Index(fields=['is_active', 'id'], name='usuario_activo_idx'),
+            models.Index(
+                OpClass(Lower('email'), name='text_pattern_ops'), F('id'),
+                name='usuario_email_prefijo_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.rol})"
 
@@ -22,6 +37,21 @@ class CodigoVerificacion(models.Model):
     expiracion = models.DateTimeField()
     usado = models.BooleanField(default=False)
     contexto = models.CharField(max_length=20, default='login')  # 'registro' o 'login'
+    intentos = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Un solo código vigente por usuario y contexto (ver usuarios.codigos):
+            # la búsqueda va directo a este índice parcial, sin importar el historial.
+            models.UniqueConstraint(
+                fields=['usuario', 'contexto'],
+                condition=models.Q(usado=False),
+                name='codigo_vigente_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['expiracion'], name='codigo_expiracion_idx'),
+        ]
 
     @staticmethod
     def generar_codigo(longitud=6):
@@ -30,10 +60,13 @@ class CodigoVerificacion(models.Model):
         return f"{random.randint(100000,999999)}"
 
     @classmethod
-    def crear_para_usuario(cls, usuario, minutos_validez=5, longitud=6, contexto='login'):
-        codigo = cls.generar_codigo(longitud)
+    def crear_para_usuario(cls, usuario, minutos_validez=5, longitud=6, contexto='login', codigo=None):
+        # Retira el código vigente anterior: solo puede haber uno (codigo_vigente_unico).
+        codigo = codigo or cls.generar_codigo(longitud)
         expiracion = timezone.now() + timezone.timedelta(minutes=minutos_validez)
-        return cls.objects.create(usuario=usuario, codigo=codigo, expiracion=expiracion, contexto=contexto)
+        with transaction.atomic():
+            cls.objects.filter(usuario=usuario, contexto=contexto, usado=False).update(usado=True)
+            return cls.objects.create(usuario=usuario, codigo=codigo, expiracion=expiracion, contexto=contexto)
 
     def es_valido(self):
         return (not self.usado) and (timezone.now() < self.expiracion)
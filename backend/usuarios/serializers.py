@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from core.lectura import LecturaCompilada
 from .models import Usuario
+from .hashers import establecer_password
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
@@ -11,7 +13,7 @@ class RegisterSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         password = validated_data.pop('password')
         usuario = Usuario(**validated_data)
-        usuario.set_password(password)
+        establecer_password(usuario, password)
         usuario.is_active = False
         usuario.rol= "cliente"
         usuario.save()
@@ -28,6 +30,12 @@ class VerifySerializer(serializers.Serializer):
     code = serializers.CharField()
 
 
+class FiltroUsuariosSerializer(serializers.Serializer):
+    rol = serializers.ChoiceField(choices=Usuario.ROLES, required=False)
+    is_active = serializers.BooleanField(required=False, allow_null=True)
+    email = serializers.CharField(required=False, max_length=254)  # prefijo
+
+
 # visualizar usuarios creados
 class UsuarioListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -35,6 +43,9 @@ class UsuarioListSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'rol']
 
 
+usuarios_lectura = LecturaCompilada(UsuarioListSerializer)
+
+
 class UpdateUsuarioSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False, min_length=6)
 
@@ -48,6 +59,6 @@ class UpdateUsuarioSerializer(serializers.ModelSerializer):
 
         instance.username = username
         if password:
-            instance.set_password(password)
+            establecer_password(instance, password)
         instance.save()
         return instance
\ No newline at end of file
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidar
+from .authentication import olvidar_estado
+from .models import Usuario
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_usuarios(sender, instance, **kwargs):
+    invalidar(Usuario)
+    olvidar_estado(instance.pk)
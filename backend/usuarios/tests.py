@@ -0,0 +1,273 @@
+import os
+import runpy
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.pruebas import PlanConsultaMixin, solo_postgres
+from core.throttling import LimiteVentanaDeslizante
+from carrito.models import Carrito
+from . import codigos
+from .authentication import olvidar_estado
+from .models import CodigoVerificacion, Usuario
+from .views import generar_tokens_para_usuario
+
+
+@override_settings(JWT_ESTADO_TTL=60)
+class AutenticacionSinConsultaTests(TestCase):
+    """JWTSinConsultaAuthentication con tokens reales, sin force_authenticate."""
+    categorias = '/api/productos/admin/categorias/'
+    carrito = '/api/carrito/carrito/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(
+            username='admin', email='admin@example.com', password='x', rol='admin', is_staff=True,
+        )
+        cls.cliente = Usuario.objects.create_user(username='cliente', email='cliente@example.com', password='x')
+        Carrito.objects.create(usuario=cls.cliente)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, usuario=None, token=None):
+        token = token or generar_tokens_para_usuario(usuario)['access']
+        return self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_endpoint_admin_sin_consultas(self):
+        self.assertEqual(self.get(self.categorias, self.admin).status_code, 200)
+        # Listado cacheado y estado del usuario cacheado: ninguna consulta.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(self.categorias, self.admin).status_code, 200)
+
+    @override_settings(JWT_ESTADO_TTL=0)
+    def test_sin_estado_alcanza_con_los_claims(self):
+        self.get(self.categorias, self.admin)
+        olvidar_estado(self.admin.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(self.categorias, self.admin).status_code, 200)
+
+    def test_carrito_solo_consulta_el_carrito(self):
+        self.get(self.carrito, self.cliente)
+        # Las mismas 2 consultas que con force_authenticate (ver carrito.tests).
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get(self.carrito, self.cliente).status_code, 200)
+
+    def test_estado_frio_cuesta_una_consulta(self):
+        self.get(self.categorias, self.admin)
+        olvidar_estado(self.admin.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(self.categorias, self.admin).status_code, 200)
+
+    def test_desactivar_revoca_el_token(self):
+        token = generar_tokens_para_usuario(self.cliente)['access']
+        self.assertEqual(self.get(self.carrito, token=token).status_code, 200)
+        self.cliente.is_active = False
+        self.cliente.save(update_fields=['is_active'])  # olvidar_estado en post_save
+        self.assertEqual(self.get(self.carrito, token=token).status_code, 401)
+
+    def test_borrar_revoca_el_token(self):
+        token = generar_tokens_para_usuario(self.cliente)['access']
+        self.assertEqual(self.get(self.carrito, token=token).status_code, 200)
+        self.cliente.delete()
+        self.assertEqual(self.get(self.carrito, token=token).status_code, 401)
+
+    def test_cambio_de_rol_se_aplica_sin_esperar_al_token(self):
+        token = generar_tokens_para_usuario(self.admin)['access']
+        self.assertEqual(self.get(self.categorias, token=token).status_code, 200)
+        self.admin.rol = 'cliente'
+        self.admin.save(update_fields=['rol'])
+        self.assertEqual(self.get(self.categorias, token=token).status_code, 403)
+
+    def test_el_estado_se_cachea_jwt_estado_ttl(self):
+        token = generar_tokens_para_usuario(self.cliente)['access']
+        self.get(self.carrito, token=token)
+        # Un UPDATE sin señales no olvida el estado: vale lo cacheado hasta que vence.
+        Usuario.objects.filter(pk=self.cliente.pk).update(is_active=False)
+        self.assertEqual(self.get(self.carrito, token=token).status_code, 200)
+        olvidar_estado(self.cliente.pk)
+        self.assertEqual(self.get(self.carrito, token=token).status_code, 401)
+
+    def test_token_sin_claims_usa_la_ruta_normal(self):
+        viejo = str(RefreshToken.for_user(self.cliente).access_token)
+        self.get(self.carrito, token=viejo)
+        # Carga el Usuario (1 consulta) además de las 2 del carrito.
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get(self.carrito, token=viejo).status_code, 200)
+        Usuario.objects.filter(pk=self.cliente.pk).update(is_active=False)
+        self.assertEqual(self.get(self.carrito, token=viejo).status_code, 401)
+
+
+class AlmacenCodigosPruebas:
+    """Mismo comportamiento con los dos almacenes (CODIGOS_ALMACEN)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(username='cliente', email='cliente@example.com', password='x')
+
+    def setUp(self):
+        caches['compartido'].clear()
+
+    def emitir(self, codigo):
+        with mock.patch.object(CodigoVerificacion, 'generar_codigo', return_value=codigo):
+            return codigos.emitir(self.usuario, 'registro')
+
+    def verificar(self, codigo):
+        return codigos.verificar(self.usuario, 'registro', codigo)
+
+    def test_un_solo_uso(self):
+        self.emitir('123456')
+        self.assertEqual(self.verificar('123456'), codigos.VALIDO)
+        self.assertEqual(self.verificar('123456'), codigos.INVALIDO)
+
+    def test_intentos_hasta_bloquear(self):
+        self.emitir('123456')
+        self.assertEqual(self.verificar('000000'), codigos.INVALIDO)
+        self.assertEqual(self.verificar('000000'), codigos.INVALIDO)
+        self.assertEqual(self.verificar('000000'), codigos.BLOQUEADO)
+        # Bloqueado: ni el código correcto sirve ya.
+        self.assertEqual(self.verificar('123456'), codigos.INVALIDO)
+
+    def test_correcto_antes_del_limite(self):
+        self.emitir('123456')
+        self.verificar('000000')
+        self.verificar('000000')
+        self.assertEqual(self.verificar('123456'), codigos.VALIDO)
+
+    def test_emitir_retira_el_anterior_y_reinicia_intentos(self):
+        self.emitir('111111')
+        self.verificar('000000')
+        self.verificar('000000')
+        self.emitir('222222')
+        self.assertEqual(self.verificar('111111'), codigos.INVALIDO)
+        self.assertEqual(self.verificar('000000'), codigos.INVALIDO)
+        self.assertEqual(self.verificar('222222'), codigos.VALIDO)
+
+    def test_contextos_separados(self):
+        self.emitir('123456')
+        self.assertEqual(codigos.verificar(self.usuario, 'login', '123456'), codigos.INVALIDO)
+        self.assertEqual(self.verificar('123456'), codigos.VALIDO)
+
+
+@override_settings(CODIGOS_ALMACEN='bd', CODIGOS_MAX_INTENTOS=3)
+class AlmacenBDTests(AlmacenCodigosPruebas, TestCase):
+
+    def test_vencido(self):
+        self.emitir('123456')
+        CodigoVerificacion.objects.update(expiracion=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.verificar('123456'), codigos.INVALIDO)
+
+
+@override_settings(CODIGOS_ALMACEN='cache', CODIGOS_CACHE='compartido', CODIGOS_MAX_INTENTOS=3)
+class AlmacenCacheTests(AlmacenCodigosPruebas, TestCase):
+
+    def test_no_toca_la_base(self):
+        with self.assertNumQueries(0):
+            self.emitir('123456')
+            self.assertEqual(self.verificar('123456'), codigos.VALIDO)
+
+
+class PurgarCodigosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        usuarios = Usuario.objects.bulk_create(
+            Usuario(username=f"u{i}", email=f"u{i}@example.com") for i in range(9)
+        )
+        ahora = timezone.now()
+        CodigoVerificacion.objects.bulk_create(
+            CodigoVerificacion(
+                usuario=usuario, codigo='123456', usado=False,
+                expiracion=ahora + timedelta(minutes=-10 if i < 7 else 10),
+            )
+            for i, usuario in enumerate(usuarios)
+        )
+
+    def test_borra_los_vencidos_en_lotes(self):
+        with mock.patch('usuarios.codigos.time.sleep') as dormir:
+            # Lotes de 3, 3 y 1: un SELECT de ids y un DELETE por lote, sin pausa tras el último.
+            with self.assertNumQueries(6):
+                self.assertEqual(codigos.purgar(lote=3, pausa=0.5), 7)
+        self.assertEqual(dormir.call_count, 2)
+        self.assertEqual(CodigoVerificacion.objects.count(), 2)
+        self.assertFalse(CodigoVerificacion.objects.filter(expiracion__lt=timezone.now()).exists())
+
+    def test_antes_de(self):
+        self.assertEqual(codigos.purgar(antes_de=timezone.now() - timedelta(hours=1)), 0)
+        self.assertEqual(CodigoVerificacion.objects.count(), 9)
+
+
+class ConfiguracionCodigosTests(SimpleTestCase):
+
+    def cargar_settings(self, **entorno):
+        with mock.patch.dict(os.environ, entorno):
+            return runpy.run_path(str(settings.BASE_DIR / 'ecommerce' / 'settings.py'))
+
+    def test_cache_sin_redis(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "CODIGOS_ALMACEN='cache'"):
+            self.cargar_settings(CODIGOS_ALMACEN='cache', REDIS_URL='')
+
+    def test_cache_de_dos_niveles(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "CODIGOS_CACHE='default'"):
+            self.cargar_settings(CODIGOS_ALMACEN='cache', CODIGOS_CACHE='default', REDIS_URL='redis://redis:6379/0')
+
+    def test_cache_con_redis(self):
+        valores = self.cargar_settings(CODIGOS_ALMACEN='cache', REDIS_URL='redis://redis:6379/0')
+        self.assertEqual(valores['CODIGOS_ALMACEN'], 'cache')
+
+    def test_almacen_desconocido(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "CODIGOS_ALMACEN='redis'"):
+            self.cargar_settings(CODIGOS_ALMACEN='redis')
+
+
+@mock.patch.object(LimiteVentanaDeslizante, 'THROTTLE_RATES', {'login_ip': '5/min', 'login_email': '3/min'})
+class LimiteLoginTests(TestCase):
+    url = '/api/usuarios/login/'
+
+    def setUp(self):
+        cache.clear()
+
+    def intentar(self, email, ip='10.0.0.1'):
+        return self.client.post(self.url, {'email': email, 'password': 'x'}, REMOTE_ADDR=ip)
+
+    def test_rafaga_desde_una_ip(self):
+        codigos = [self.intentar(f"nadie{i}@example.com").status_code for i in range(7)]
+        self.assertEqual(codigos, [404] * 5 + [429] * 2)
+        self.assertIn('Retry-After', self.intentar('otro@example.com'))
+
+    def test_rafaga_contra_un_email_desde_varias_ips(self):
+        codigos = [self.intentar('Victima@example.com ', ip=f"10.0.0.{i}").status_code for i in range(5)]
+        self.assertEqual(codigos, [404] * 3 + [429] * 2)
+
+
+@solo_postgres
+class PlanesUsuarioTests(PlanConsultaMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        usuarios = Usuario.objects.bulk_create(
+            Usuario(username=f"u{i}", email=f"u{i}@example.com") for i in range(2000)
+        )
+        expiracion = timezone.now() + timezone.timedelta(minutes=5)
+        # Cinco códigos por usuario y contexto; solo el último sigue vigente.
+        CodigoVerificacion.objects.bulk_create(
+            CodigoVerificacion(
+                usuario=usuario, codigo='123456', expiracion=expiracion, contexto=contexto, usado=n < 4,
+            )
+            for usuario in usuarios for contexto in ('registro', 'login') for n in range(5)
+        )
+        cls.usuario = usuarios[42]
+
+    def setUp(self):
+        self.analizar()
+
+    def test_codigo_vigente(self):
+        # La búsqueda de AlmacenBD.verificar.
+        vigente = CodigoVerificacion.objects.filter(usuario=self.usuario, contexto='registro', usado=False)
+        self.assertUsaIndice(vigente, 'codigo_vigente_unico')
@@ -1,6 +1,7 @@
 from django.conf import settings
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from django.core.mail import EmailMessage, BadHeaderError
+from django.db.models.functions import Lower
 from django.shortcuts import get_object_or_404
 from rest_framework import status, permissions
 from rest_framework.response import Response
@@ -8,10 +9,20 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAdminUser
 from django.contrib.auth import get_user_model
-from .serializers import RegisterSerializer, LoginSerializer, VerifySerializer, UsuarioListSerializer, UpdateUsuarioSerializer
-from .models import CodigoVerificacion
+from .serializers import (
+    RegisterSerializer, LoginSerializer, VerifySerializer, UpdateUsuarioSerializer,
+    FiltroUsuariosSerializer, usuarios_lectura,
+)
+from . import codigos
 from .models import Usuario
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from core.cache import clave_versionada, obtener_o_calcular
+from core.paginacion import decodificar_cursor, leer_limite, paginar_por_campos, paginar_por_id
+from core.throttling import LimitePorEmail, LimitePorIP, LimitePorUsuario
+from .authentication import JWTSinConsultaAuthentication, agregar_claims
+from .hashers import autenticar
+import hashlib
+import json
 import logging
 import os
 from dotenv import load_dotenv
@@ -45,7 +56,8 @@ def enviar_codigo_por_email(usuario, codigo, asunto="Código de verificación"):
 
 
 def generar_tokens_para_usuario(user):
-    refresh = RefreshToken.for_user(user)
+    # El access hereda los claims del refresh (rol, is_staff, is_active).
+    refresh = agregar_claims(RefreshToken.for_user(user), user)
     return {
         "refresh": str(refresh),
         "access": str(refresh.access_token),
@@ -54,6 +66,8 @@ def generar_tokens_para_usuario(user):
 
 class RegisterAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LimitePorIP, LimitePorEmail]
+    throttle_scope = 'registro'
 
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
@@ -61,23 +75,23 @@ class RegisterAPIView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         usuario = serializer.save()
-        codigo_obj = CodigoVerificacion.crear_para_usuario(
-            usuario, minutos_validez=5, longitud=6, contexto="registro"
-        )
+        codigo = codigos.emitir(usuario, "registro", minutos_validez=5, longitud=6)
 
         try:
-            enviar_codigo_por_email(usuario, codigo_obj.codigo, asunto="Verifica tu cuenta")
+            enviar_codigo_por_email(usuario, codigo, asunto="Verifica tu cuenta")
         except Exception as e:
             return Response({"detail": f"No se pudo enviar el correo: {e}"}, status=500)
 
         body = {"detail": "Usuario creado. Código enviado al correo."}
         if settings.DEBUG:
-            body["codigo"] = codigo_obj.codigo
+            body["codigo"] = codigo
         return Response(body, status=status.HTTP_201_CREATED)
 
 
 class VerifyRegistrationAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LimitePorIP, LimitePorEmail]
+    throttle_scope = 'verificacion'
 
     def post(self, request):
         serializer = VerifySerializer(data=request.data)
@@ -88,17 +102,13 @@ class VerifyRegistrationAPIView(APIView):
         code = serializer.validated_data["code"]
 
         usuario = get_object_or_404(User, email=email)
-        codigo_obj = (
-            CodigoVerificacion.objects.filter(usuario=usuario, contexto="registro")
-            .order_by("-creado_en")
-            .first()
-        )
+        resultado = codigos.verificar(usuario, "registro", code)
 
-        if not codigo_obj or not codigo_obj.es_valido() or codigo_obj.codigo != code:
+        if resultado == codigos.BLOQUEADO:
+            return Response({"detail": "Demasiados intentos. El código ya no es válido."}, status=400)
+        if resultado != codigos.VALIDO:
             return Response({"detail": "Código inválido o expirado."}, status=400)
 
-        codigo_obj.usado = True
-        codigo_obj.save()
         usuario.is_active = True
         usuario.save(update_fields=["is_active"])
 
@@ -108,6 +118,8 @@ class VerifyRegistrationAPIView(APIView):
 
 class LoginAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LimitePorIP, LimitePorEmail]
+    throttle_scope = 'login'
 
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -118,7 +130,7 @@ class LoginAPIView(APIView):
         password = serializer.validated_data.get("password")
 
         usuario = get_object_or_404(User, email=email)
-        user = authenticate(request, username=usuario.username, password=password)
+        user = autenticar(usuario, password)
 
         if user is None:
             return Response({"detail": "Credenciales inválidas."}, status=401)
@@ -149,11 +161,50 @@ class DeleteUserAPIView(APIView):
 
 
 @api_view(['GET'])
+@authentication_classes([JWTSinConsultaAuthentication])
 @permission_classes([IsAdminUser])
 def listar_usuarios(request):
-    usuarios = Usuario.objects.all()
-    serializer = UsuarioListSerializer(usuarios, many=True)
-    return Response(serializer.data)
+    filtros = FiltroUsuariosSerializer(data=request.query_params)
+    filtros.is_valid(raise_exception=True)
+    filtros = filtros.validated_data
+    try:
+        cursor = decodificar_cursor(request.query_params.get('cursor'))
+        limite = leer_limite(request)
+    except ValueError:
+        return Response({'error': 'Parámetros de paginación inválidos'}, status=400)
+
+    firma = hashlib.md5(json.dumps([filtros, cursor, limite], sort_keys=True).encode()).hexdigest()
+    try:
+        datos = obtener_o_calcular(
+            clave_versionada(Usuario, 'lista', firma),
+            lambda: _pagina_usuarios(filtros, cursor, limite),
+        )
+    except ValueError:
+        return Response({'error': 'Parámetros de paginación inválidos'}, status=400)
+    return Response(datos)
+
+
+def _pagina_usuarios(filtros, cursor, limite):
+    # Solo las cuatro columnas del listado; nunca el hash de la contraseña.
+    usuarios = usuarios_lectura.valores(Usuario.objects.all())
+    if 'rol' in filtros:
+        usuarios = usuarios.filter(rol=filtros['rol'])
+    if filtros.get('is_active') is not None:
+        usuarios = usuarios.filter(is_active=filtros['is_active'])
+
+    prefijo = filtros.get('email')
+    if prefijo:
+        # Orden por email para recorrer usuario_email_prefijo_idx en vez de
+        # ordenar todas las coincidencias del prefijo.
+        usuarios = usuarios.annotate(email_min=Lower('email')).filter(email_min__startswith=prefijo.lower())
+        filas, siguiente = paginar_por_campos(usuarios, ('email_min', 'id'), cursor, limite)
+    else:
+        filas, siguiente = paginar_por_id(usuarios, cursor, limite)
+
+    return {
+        'usuarios': usuarios_lectura.representar(filas),
+        'siguiente': siguiente,
+    }
 
 
 
@@ -170,6 +221,8 @@ def eliminar_usuario(request, user_id):
 
 class UpdateUsuarioView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [LimitePorUsuario]
+    throttle_scope = 'perfil'
 
     def put(self, request):
         usuario = request.user